@@ -3,6 +3,7 @@ from importlib.metadata import version as _get_version
 from regionmask import core, defined_regions
 from regionmask.core._geopandas import from_geopandas, mask_3D_geopandas, mask_geopandas
 from regionmask.core.options import get_options, set_options
+from regionmask.core.plan import MaskPlan
 from regionmask.core.plot import plot_3D_mask
 from regionmask.core.regions import Regions, _OneRegion
 from regionmask.core.utils import flatten_3D_mask
@@ -16,6 +17,7 @@ __all__ = [
     "get_options",
     "mask_3D_geopandas",
     "mask_geopandas",
+    "MaskPlan",
     "plot_3D_mask",
     "Regions",
     "set_options",
@@ -228,6 +228,7 @@ def mask_geopandas(
     wrap_lon: None | bool | Literal[180, 360] = None,
     use_cf: bool | None = None,
     overlap: bool | None = None,
+    crs=None,
 ) -> xr.DataArray:
 
     if overlap:
@@ -248,6 +249,7 @@ def mask_geopandas(
         wrap_lon=wrap_lon,
         overlap=overlap,
         use_cf=use_cf,
+        crs=crs,
     )
 
 
@@ -265,6 +267,8 @@ def mask_3D_geopandas(
     wrap_lon: None | bool | Literal[180, 360] = None,
     use_cf: bool | None = None,
     overlap: bool | None = None,
+    output: Literal["dense", "sparse"] = "dense",
+    crs=None,
 ) -> xr.DataArray:
 
     polygons, numbers = _prepare_gdf_for_mask(geodataframe, numbers=numbers)
@@ -279,6 +283,8 @@ def mask_3D_geopandas(
         wrap_lon=wrap_lon,
         overlap=overlap,
         use_cf=use_cf,
+        crs=crs,
+        output=output,
     )
 
     return mask_3D
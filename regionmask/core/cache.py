@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+
+def _update_hash(h, item) -> None:
+
+    if isinstance(item, np.ndarray):
+        arr = np.ascontiguousarray(item)
+        h.update(f"ndarray|{arr.dtype.str}|{arr.shape}|".encode())
+        h.update(arr.data)
+    elif isinstance(item, list | tuple):
+        h.update(f"{type(item).__name__}|{len(item)}|".encode())
+        for it in item:
+            _update_hash(h, it)
+    elif isinstance(item, shapely.Geometry):
+        h.update(b"geometry|")
+        h.update(shapely.to_wkb(item, include_srid=False))
+    else:
+        h.update(f"{type(item).__name__}|{item!r}|".encode())
+
+
+def _fingerprint(*items) -> str:
+    """content-based fingerprint of arrays, geometries and scalars
+
+    Geometries are hashed via their WKB representation and arrays via their dtype,
+    shape and data. Use ``_fingerprint_polygons`` to hash a collection of polygons.
+    """
+
+    h = hashlib.blake2b(digest_size=20)
+    for item in items:
+        _update_hash(h, item)
+
+    return h.hexdigest()
+
+
+def _fingerprint_polygons(polygons, numbers) -> str:
+
+    polygons = np.asarray(polygons, dtype=object).ravel()
+    wkb = shapely.to_wkb(polygons, include_srid=False)
+
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"polygons|{len(wkb)}|".encode())
+    for w in wkb:
+        h.update(len(w).to_bytes(8, "little"))
+        h.update(w)
+
+    _update_hash(h, np.asarray(numbers))
+
+    return h.hexdigest()
+
+
+class _LRUCache:
+    """thread-safe, bounded least-recently-used cache for numpy arrays
+
+    The bounds are read from ``OPTIONS`` on every access, so they can be changed with
+    ``set_options``. Stored arrays are made read-only.
+    """
+
+    def __init__(self, max_entries_option: str, max_bytes_option: str) -> None:
+
+        self._max_entries_option = max_entries_option
+        self._max_bytes_option = max_bytes_option
+
+        self._data: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def _limits(self) -> tuple[int, int | None]:
+        from regionmask.core.options import OPTIONS
+
+        max_entries = OPTIONS[self._max_entries_option]  # type:ignore[literal-required]
+        max_bytes = OPTIONS[self._max_bytes_option]  # type:ignore[literal-required]
+
+        return max_entries, max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self._limits()[0] > 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str) -> np.ndarray | None:
+
+        with self._lock:
+            self._trim()
+
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+
+        return value
+
+    def put(self, key: str, value: np.ndarray) -> np.ndarray:
+        """store value (as read-only array) and return it
+
+        Values that are not stored (too large or the cache is disabled) are returned
+        unchanged.
+        """
+
+        max_entries, max_bytes = self._limits()
+
+        if max_entries == 0 or (max_bytes is not None and value.nbytes > max_bytes):
+            return value
+
+        value.setflags(write=False)
+
+        with self._lock:
+            if key in self._data:
+                self._nbytes -= self._data.pop(key).nbytes
+
+            self._data[key] = value
+            self._nbytes += value.nbytes
+
+            self._trim()
+
+        return value
+
+    def _trim(self) -> None:
+
+        max_entries, max_bytes = self._limits()
+
+        while self._data and (
+            len(self._data) > max_entries
+            or (max_bytes is not None and self._nbytes > max_bytes)
+        ):
+            __, value = self._data.popitem(last=False)
+            self._nbytes -= value.nbytes
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._data.clear()
+            self._nbytes = 0
+
+
+class _FileLock:
+    """exclusive inter-process lock on a lock file"""
+
+    def __init__(self, path) -> None:
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+
+        self._file = open(self._path, "a+b")
+
+        try:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except ImportError:  # pragma: no cover
+            import msvcrt
+
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+
+        return self
+
+    def __exit__(self, type, value, traceback):
+
+        try:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        except ImportError:  # pragma: no cover
+            import msvcrt
+
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+        self._file.close()
+        self._file = None
+
+
+def _save_array(file, arr: np.ndarray) -> None:
+
+    # boolean masks are stored as bits
+    if arr.dtype == bool:
+        packed = np.packbits(arr, axis=None)
+        np.savez_compressed(file, packed=packed, shape=np.array(arr.shape))
+    else:
+        np.savez_compressed(file, data=arr)
+
+
+def _load_array(file) -> np.ndarray:
+
+    with np.load(file, allow_pickle=False) as data:
+        if "packed" in data:
+            shape = tuple(data["shape"])
+            count = int(np.prod(shape))
+            arr = np.unpackbits(data["packed"], count=count).view(bool)
+            return arr.reshape(shape)
+
+        return data["data"]
+
+
+class _DiskCache:
+    """content-addressed, size-limited on-disk cache for numpy arrays
+
+    The arrays are stored compressed (boolean arrays bit-packed) in the ``masks``
+    subfolder of the regionmask cache directory (see ``set_options(cache_dir=...)``).
+    Files are written atomically and writing and eviction are guarded by a file lock
+    such that the cache can be shared by several processes. The least recently used
+    files are removed once the total size exceeds ``mask_disk_cache_max_bytes``.
+    """
+
+    suffix = ".npz"
+
+    @property
+    def enabled(self) -> bool:
+        from regionmask.core.options import OPTIONS
+
+        return OPTIONS["mask_disk_cache"]
+
+    @property
+    def path(self):
+        from regionmask.defined_regions._resources import _get_cache_dir
+
+        return _get_cache_dir() / "masks"
+
+    def _lock(self):
+
+        path = self.path
+        path.mkdir(parents=True, exist_ok=True)
+        return _FileLock(path / ".lock")
+
+    def _files(self):
+        return list(self.path.glob(f"*{self.suffix}"))
+
+    def get(self, key: str) -> np.ndarray | None:
+
+        fN = self.path / f"{key}{self.suffix}"
+
+        try:
+            arr = _load_array(fN)
+            # mark as recently used
+            os.utime(fN)
+        except (OSError, ValueError, KeyError):
+            # file does not exist, was evicted, or is corrupted
+            return None
+
+        arr.setflags(write=False)
+        return arr
+
+    def put(self, key: str, value: np.ndarray) -> None:
+
+        from regionmask.core.options import OPTIONS
+
+        max_bytes = OPTIONS["mask_disk_cache_max_bytes"]
+
+        try:
+            self._put(key, value, max_bytes)
+        except OSError as e:
+            warnings.warn(f"Could not write the mask to the disk cache: {e}")
+
+    def _put(self, key: str, value: np.ndarray, max_bytes: int | None) -> None:
+
+        with self._lock():
+
+            path = self.path
+            with tempfile.NamedTemporaryFile(
+                dir=path, suffix=".tmp", delete=False
+            ) as f:
+                tmp = Path(f.name)
+                try:
+                    _save_array(f, value)
+                except Exception:
+                    tmp.unlink(missing_ok=True)
+                    raise
+
+            if max_bytes is not None and tmp.stat().st_size > max_bytes:
+                tmp.unlink()
+                return
+
+            # atomic - readers see either no file or the complete file
+            os.replace(tmp, path / f"{key}{self.suffix}")
+
+            self._evict(max_bytes)
+
+    def _evict(self, max_bytes: int | None) -> None:
+
+        if max_bytes is None:
+            return
+
+        stats = []
+        for fN in self._files():
+            try:
+                stat = fN.stat()
+            except OSError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, fN))
+
+        total = sum(size for __, size, __ in stats)
+
+        # oldest first
+        for __, size, fN in sorted(stats, key=lambda x: x[0]):
+            if total <= max_bytes:
+                break
+            fN.unlink(missing_ok=True)
+            total -= size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(fN.stat().st_size for fN in self._files())
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def clear(self) -> None:
+
+        if not self.path.exists():
+            return
+
+        with self._lock():
+            for fN in self._files():
+                fN.unlink(missing_ok=True)
@@ -1,5 +1,7 @@
 import xarray as xr
 
+from regionmask.core.mesh import _get_face_coords, _get_mesh, _mesh_coord_names
+
 try:
     import cf_xarray  # noqa: F401
 
@@ -13,6 +15,21 @@ def _get_coords(lon_or_obj, lat, lon_name, lat_name, use_cf):
     if lat is not None:
         return lon_or_obj, lat
 
+    mesh = _get_mesh(lon_or_obj)
+
+    if mesh is None:
+        return _get_lon_lat(lon_or_obj, lon_name, lat_name, use_cf)
+
+    # UGRID: mask the faces of the mesh if no other lon and lat coords are found
+    obj = lon_or_obj.drop_vars(_mesh_coord_names(mesh), errors="ignore")
+    try:
+        return _get_lon_lat(obj, lon_name, lat_name, use_cf)
+    except (KeyError, ValueError):
+        return _get_face_coords(lon_or_obj, mesh)
+
+
+def _get_lon_lat(lon_or_obj, lon_name, lat_name, use_cf):
+
     is_xr_object = isinstance(lon_or_obj, xr.Dataset | xr.DataArray)
 
     if use_cf is None and has_cf_xarray and is_xr_object:
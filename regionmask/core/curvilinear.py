@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import numpy as np
+import shapely
+
+# cells within this distance (in cells) of the transformed region boundaries and the
+# outermost cells of the grid (seams, tripolar fold) are tested on lon and lat
+_BAND = 2
+_FRAME = 3
+
+
+def _to_xyz(lon, lat):
+    """lon and lat (in degree) to cartesian coordinates on the unit sphere"""
+
+    lon, lat = np.deg2rad(lon), np.deg2rad(lat)
+
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), -1)
+
+
+def _chord(a, b):
+    return np.sqrt(((a - b) ** 2).sum(axis=-1))
+
+
+def _find_period(lon, lat) -> int | None:
+    """number of unique columns of a grid that is periodic along i (or None)
+
+    Detects grids where the first column is a neighbor of the last one and grids with
+    duplicated halo columns (e.g. NEMO/ORCA, where column ``ni - 2`` equals column 0).
+    """
+
+    ni = lon.shape[1]
+
+    if ni < 4:
+        return None
+
+    first = _to_xyz(lon[:, 0], lat[:, 0])
+    second = _to_xyz(lon[:, 1], lat[:, 1])
+    spacing = np.median(_chord(first, second))
+
+    # halo columns
+    for period in (ni - 2, ni - 1):
+        d = _chord(_to_xyz(lon[:, period], lat[:, period]), first)
+        if d.max() < 0.01 * spacing:
+            return period
+
+    # the first and last column are neighbors
+    last = _to_xyz(lon[:, -1], lat[:, -1])
+    second_last = _to_xyz(lon[:, -2], lat[:, -2])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = _chord(last, first) / _chord(last, second_last)
+
+    # the median as the gridpoints converge along the fold of tripolar grids
+    if 0.5 < np.median(ratio) < 2:
+        return ni
+
+    return None
+
+
+def _inverse_bilinear(A, B, C, D, q, n_iter=8):
+    """(s, t) such that the bilinear quad (A, B, C, D) passes through q
+
+    The corners are projected to the tangent plane at q (gnomonic), (s, t) are found
+    with Newton iterations. s runs from A to B and t from A to D. For points outside
+    of the quad (s, t) are extrapolated.
+    """
+
+    # tangent basis at q - avoid the axis parallel to q
+    axis = np.where(np.abs(q[:, 2:]) < 0.9, [[0.0, 0.0, 1.0]], [[1.0, 0.0, 0.0]])
+    e1 = np.cross(axis, q)
+    e1 /= np.linalg.norm(e1, axis=-1, keepdims=True)
+    e2 = np.cross(q, e1)
+
+    def _project(v):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            v = v / (v * q).sum(axis=-1, keepdims=True)
+        return (v * e1).sum(axis=-1), (v * e2).sum(axis=-1)
+
+    (ax, ay), (bx, by), (cx, cy), (dx, dy) = (_project(v) for v in (A, B, C, D))
+
+    ex, ey = bx - ax, by - ay
+    fx, fy = dx - ax, dy - ay
+    gx, gy = ax - bx + cx - dx, ay - by + cy - dy
+
+    s = np.full(ax.shape, 0.5)
+    t = np.full(ax.shape, 0.5)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        for _ in range(n_iter):
+            px = ax + s * ex + t * fx + s * t * gx
+            py = ay + s * ey + t * fy + s * t * gy
+
+            j11, j12 = ex + t * gx, fx + s * gx
+            j21, j22 = ey + t * gy, fy + s * gy
+
+            det = j11 * j22 - j12 * j21
+            s = s - (j22 * px - j12 * py) / det
+            t = t - (j11 * py - j21 * px) / det
+
+    return s, t
+
+
+def _coarse_indices(n, stride):
+    """every ``stride``-th index including the last one"""
+
+    return np.unique(np.append(np.arange(0, n, stride), n - 1))
+
+
+def _index_transform(lon, lat, *, n_coarse=2**16, n_walk=16):
+    """transform from lon and lat to the fractional indices of a 2D curvilinear grid
+
+    The grid is inverted locally: the nearest point of a coarse subset of the grid is
+    found with a KD-tree, then the cell (quad of four grid points) containing the point
+    is found by walking from cell to cell, using the fractional index extrapolated from
+    the bilinear interpolation within the current cell. Points outside of the grid are
+    NaN. Returns ``(transform, period)`` where ``period`` is the number of unique columns
+    for grids that are periodic along i and None otherwise.
+    """
+
+    from scipy.spatial import cKDTree
+
+    nj, ni = lon.shape
+
+    period = _find_period(lon, lat)
+
+    stride = max(1, int(np.ceil(np.sqrt(lon.size / n_coarse))))
+    rows, cols = _coarse_indices(nj, stride), _coarse_indices(ni, stride)
+
+    xyz = _to_xyz(lon[np.ix_(rows, cols)], lat[np.ix_(rows, cols)])
+    tree = cKDTree(xyz.reshape(-1, 3))
+
+    # points farther away from the nearest coarse grid point are outside of the grid
+    max_dist = max(
+        _chord(xyz[1:, 1:], xyz[:-1, :-1]).max(),
+        _chord(xyz[1:, :-1], xyz[:-1, 1:]).max(),
+    )
+
+    def _corner(j, i):
+        if period is not None:
+            i = i % period
+        return _to_xyz(lon[j, i], lat[j, i])
+
+    def transform(x, y):
+
+        q = _to_xyz(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        shape = q.shape[:-1]
+        q = q.reshape(-1, 3)
+
+        _, idx = tree.query(q, distance_upper_bound=max_dist)
+        found = idx < tree.n
+
+        j0, i0 = np.divmod(np.where(found, idx, 0), cols.size)
+        j0, i0 = rows[j0], cols[i0]
+
+        i_out = np.full(q.shape[0], np.nan)
+        j_out = np.full(q.shape[0], np.nan)
+
+        # walk to the cell containing the point
+        active = np.flatnonzero(found)
+        for k in range(n_walk):
+
+            if active.size == 0:
+                break
+
+            jj = np.clip(j0[active], 0, nj - 2)
+            ii = i0[active] if period is not None else np.clip(i0[active], 0, ni - 2)
+
+            A, B = _corner(jj, ii), _corner(jj, ii + 1)
+            C, D = _corner(jj + 1, ii + 1), _corner(jj + 1, ii)
+
+            s, t = _inverse_bilinear(A, B, C, D, q[active])
+
+            eps = 1e-6
+            inside = (s >= -eps) & (s <= 1 + eps) & (t >= -eps) & (t <= 1 + eps)
+
+            i_out[active[inside]] = ii[inside] + s[inside]
+            j_out[active[inside]] = jj[inside] + t[inside]
+
+            # move towards the point - the step size is reduced after every step to
+            # avoid jumping back and forth where the grid is not smooth
+            max_step = max(1, stride >> k)
+            step_i = np.clip(np.floor(s), -max_step, max_step)
+            step_j = np.clip(np.floor(t), -max_step, max_step)
+
+            valid = ~inside & np.isfinite(s) & np.isfinite(t)
+            # stop at the grid boundary
+            stuck_j = ((jj == 0) & (step_j < 0)) | ((jj == nj - 2) & (step_j > 0))
+            valid &= ~stuck_j
+            if period is None:
+                valid &= ~(((ii == 0) & (step_i < 0)) | ((ii == ni - 2) & (step_i > 0)))
+
+            active, jj, ii = active[valid], jj[valid], ii[valid]
+            j0[active] = jj + step_j[valid].astype(int)
+            i0[active] = ii + step_i[valid].astype(int)
+
+        return i_out.reshape(shape), j_out.reshape(shape)
+
+    return transform, period
+
+
+def _median_spacing(lon, lat, *, n_sample=2**16):
+    """median distance between neighboring grid points (in degree)"""
+
+    nj, ni = lon.shape
+
+    stride = max(1, int(np.ceil(np.sqrt(lon.size / n_sample))))
+    rows = np.arange(0, nj - 1, stride)
+    cols = np.arange(0, ni - 1, stride)
+
+    xyz = _to_xyz(lon[np.ix_(rows, cols)], lat[np.ix_(rows, cols)])
+    xyz_i = _to_xyz(lon[np.ix_(rows, cols + 1)], lat[np.ix_(rows, cols + 1)])
+    xyz_j = _to_xyz(lon[np.ix_(rows + 1, cols)], lat[np.ix_(rows + 1, cols)])
+
+    d = np.concatenate([_chord(xyz, xyz_i).ravel(), _chord(xyz, xyz_j).ravel()])
+
+    return np.rad2deg(np.median(d))
+
+
+def _frame_cells(nj, ni, period):
+    """flat index of the outermost cells of the grid (seams, fold, and halo)"""
+
+    frame = np.zeros((nj, ni), dtype=bool)
+    frame[:_FRAME] = frame[-_FRAME:] = True
+    frame[:, :_FRAME] = frame[:, -_FRAME:] = True
+
+    if period is not None:
+        frame[:, period - _FRAME :] = True
+
+    return np.flatnonzero(frame)
+
+
+def _band_cells(transformed, offset, nj, ni, period):
+    """flat index of the cells within ``_BAND`` of the transformed region boundary"""
+
+    boundary = shapely.segmentize(transformed.boundary, 0.5)
+    coords = shapely.get_coordinates(boundary)
+
+    if coords.size == 0:
+        return np.array([], dtype=np.intp)
+
+    col = np.round(coords[:, 0] + offset).astype(np.intp)
+    row = np.round(coords[:, 1]).astype(np.intp)
+
+    steps = np.arange(-_BAND, _BAND + 1)
+    d_row, d_col = (d.ravel() for d in np.meshgrid(steps, steps, indexing="ij"))
+
+    col = (col[:, np.newaxis] + d_col).ravel()
+    row = (row[:, np.newaxis] + d_row).ravel()
+
+    if period is not None:
+        col = col % period
+
+    sel = (row >= 0) & (row < nj) & (col >= 0) & (col < ni)
+
+    return np.unique(row[sel] * ni + col[sel])
@@ -0,0 +1,412 @@
+from __future__ import annotations
+
+import numpy as np
+import shapely
+import xarray as xr
+
+# face layout of the HEALPix base pixels (see Górski et al., 2005)
+_JRLL = np.array([2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4])
+_JPLL = np.array([1, 3, 5, 7, 0, 2, 4, 6, 1, 3, 5, 7])
+
+
+def _parse_healpix(attrs) -> tuple[int, bool] | None:
+    """nside and nest of a HEALPix grid mapping (or None)
+
+    Supports the ``grid_mapping_name="healpix"`` (with ``healpix_nside`` and
+    ``healpix_order``) and the xdggs (``grid_name="healpix"`` with ``level`` and
+    ``indexing_scheme``) conventions.
+    """
+
+    if isinstance(attrs, xr.DataArray):
+        attrs = attrs.attrs
+
+    if not isinstance(attrs, dict):
+        return None
+
+    if attrs.get("grid_mapping_name") == "healpix":
+        nside = int(attrs["healpix_nside"])
+        order = attrs.get("healpix_order", "nest")
+    elif attrs.get("grid_name") == "healpix":
+        level = attrs.get("level", attrs.get("refinement_level"))
+        if level is None:
+            raise ValueError("The HEALPix grid has no 'level' (or 'refinement_level')")
+        nside = 2 ** int(level)
+        order = attrs.get("indexing_scheme", "nested")
+    else:
+        return None
+
+    order = str(order).lower()
+    if order not in ("nest", "nested", "ring"):
+        raise ValueError(f"Unknown HEALPix order: '{order}'")
+
+    return nside, order != "ring"
+
+
+def _get_healpix_grid(obj, lon, lat, grid=None):
+    """nside, nest, and cell ids of a HEALPix grid (or None)
+
+    ``grid`` is ``(nside, nest)`` parsed from the ``crs`` keyword. Otherwise the grid
+    is found from a ``healpix`` grid mapping of ``obj`` or the attributes of the cell
+    ids (xdggs) - then None is returned if ``lon`` and ``lat`` do not match the grid.
+    The cell ids are None if ``lon`` has no integer coordinate. Only grids where nside
+    is a power of 2 are supported.
+
+    ``lon`` and ``lat`` must be 1D DataArrays along the cell dimension.
+    """
+
+    is_xarray = isinstance(obj, xr.Dataset | xr.DataArray)
+
+    explicit = grid is not None
+    if grid is None and is_xarray:
+        variables = obj.variables if isinstance(obj, xr.Dataset) else obj.coords
+        grids = [_parse_healpix(var.attrs) for var in variables.values()]
+        grids = [grid for grid in grids if grid is not None]
+
+        grid = grids[0] if len(grids) == 1 else None
+
+    if grid is None:
+        return None
+
+    nside, nest = grid
+
+    # 1D numpy coords are a regular grid
+    is_cells = all(isinstance(c, xr.DataArray) and c.ndim == 1 for c in (lon, lat))
+    if not is_cells or lon.dims != lat.dims:
+        if explicit:
+            raise ValueError(
+                "HEALPix grids require 1D ``lon`` and ``lat`` DataArrays along the "
+                "same (cell) dimension"
+            )
+        return None
+
+    cell_ids = _get_cell_ids(obj, lon) if is_xarray else None
+
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+
+    try:
+        _check_healpix_coords(lon, lat, nside, nest=nest, cell_ids=cell_ids)
+    except ValueError:
+        if explicit:
+            raise
+        return None
+
+    # the hierarchical cover requires a power of 2
+    if nside & (nside - 1):
+        return None
+
+    return nside, nest, cell_ids
+
+
+def _get_cell_ids(obj, lon):
+
+    dim = lon.dims[0]
+
+    for name in ("cell_ids", dim):
+        coord = obj.coords.get(name)
+
+        if coord is not None and coord.dims == (dim,):
+            if np.issubdtype(coord.dtype, np.integer):
+                return np.asarray(coord)
+
+    return None
+
+
+def _compress_bits(v):
+    """extract the even bits of v (for 32 bit integers)"""
+
+    v = np.asarray(v, dtype=np.int64) & 0x5555555555555555
+    v = (v | (v >> 1)) & 0x3333333333333333
+    v = (v | (v >> 2)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v >> 4)) & 0x00FF00FF00FF00FF
+    v = (v | (v >> 8)) & 0x0000FFFF0000FFFF
+    v = (v | (v >> 16)) & 0xFFFFFFFF
+
+    return v
+
+
+def _nest2xyf(pix, nside):
+
+    pix = np.asarray(pix, dtype=np.int64)
+    face, ipf = np.divmod(pix, nside * nside)
+
+    return _compress_bits(ipf), _compress_bits(ipf >> 1), face
+
+
+def _xyf2lonlat(x, y, face):
+    """lon and lat (in degree) of points given in the coordinates of the base pixels
+
+    ``x`` and ``y`` are in [0, 1] within the base pixel ``face``.
+    """
+
+    jr = _JRLL[face] - x - y
+
+    nr = np.ones_like(jr)
+    z = (2 - jr) * 2 / 3
+
+    north = jr < 1
+    nr[north] = jr[north]
+    z[north] = 1 - nr[north] ** 2 / 3
+
+    south = jr > 3
+    nr[south] = 4 - jr[south]
+    z[south] = nr[south] ** 2 / 3 - 1
+
+    tmp = _JPLL[face] * nr + x - y
+    tmp[tmp < 0] += 8 * nr[tmp < 0]
+
+    # the poles are vertices of the polar base pixels
+    with np.errstate(invalid="ignore", divide="ignore"):
+        phi = np.where(nr > 0, np.pi / 4 * tmp / nr, 0)
+
+    return np.rad2deg(phi), 90 - np.rad2deg(np.arccos(np.clip(z, -1, 1)))
+
+
+def _nest2lonlat(pix, nside):
+    """lon and lat (in degree) of the center of NESTED HEALPix pixels"""
+
+    ix, iy, face = _nest2xyf(pix, nside)
+
+    return _xyf2lonlat((ix + 0.5) / nside, (iy + 0.5) / nside, face)
+
+
+def _ring2lonlat(pix, nside):
+    """lon and lat (in degree) of the center of RING HEALPix pixels"""
+
+    pix = np.asarray(pix, dtype=np.int64)
+
+    npix = 12 * nside * nside
+    ncap = 2 * nside * (nside - 1)
+    fact2 = 4.0 / npix
+    fact1 = 2 * nside * fact2
+
+    z = np.empty(pix.shape)
+    phi = np.empty(pix.shape)
+
+    north = pix < ncap
+    iring = (1 + np.sqrt(1 + 2 * pix[north]).astype(np.int64)) >> 1
+    iphi = pix[north] + 1 - 2 * iring * (iring - 1)
+    z[north] = 1 - iring**2 * fact2
+    phi[north] = (iphi - 0.5) * np.pi / 2 / iring
+
+    south = pix >= npix - ncap
+    ip = npix - pix[south]
+    iring = (1 + np.sqrt(2 * ip - 1).astype(np.int64)) >> 1
+    iphi = 4 * iring + 1 - (ip - 2 * iring * (iring - 1))
+    z[south] = iring**2 * fact2 - 1
+    phi[south] = (iphi - 0.5) * np.pi / 2 / iring
+
+    equator = ~(north | south)
+    ip = pix[equator] - ncap
+    tmp = ip // (4 * nside)
+    iring = tmp + nside
+    iphi = ip - 4 * nside * tmp + 1
+    fodd = np.where((iring + nside) & 1, 1, 0.5)
+    z[equator] = (2 * nside - iring) * fact1
+    phi[equator] = (iphi - fodd) * np.pi * 0.75 * fact1
+
+    return np.rad2deg(phi), 90 - np.rad2deg(np.arccos(np.clip(z, -1, 1)))
+
+
+def _nest2ring(pix, nside):
+    """convert NESTED to RING pixel indices"""
+
+    ix, iy, face = _nest2xyf(pix, nside)
+
+    npix = 12 * nside * nside
+    ncap = 2 * nside * (nside - 1)
+
+    jr = _JRLL[face] * nside - ix - iy - 1
+
+    # number of pixels before the ring, pixels per ring, and shift of the ring
+    nr = np.full_like(jr, nside)
+    n_before = ncap + (jr - nside) * 4 * nside
+    kshift = (jr - nside) & 1
+
+    north = jr < nside
+    nr[north] = jr[north]
+    n_before[north] = 2 * jr[north] * (jr[north] - 1)
+    kshift[north] = 0
+
+    south = jr > 3 * nside
+    nr[south] = 4 * nside - jr[south]
+    n_before[south] = npix - 2 * nr[south] * (nr[south] + 1)
+    kshift[south] = 0
+
+    jp = (_JPLL[face] * nr + ix - iy + 1 + kshift) // 2
+    jp[jp < 1] += 4 * nside
+
+    return n_before + jp - 1
+
+
+def _perimeter(n):
+    """x and y of the corners of the sub-pixels on the perimeter of a pixel (in order)"""
+
+    i = np.arange(n)
+    x = np.concatenate([i, np.full(n, n), n - i, np.zeros(n)])
+    y = np.concatenate([np.zeros(n), i, np.full(n, n), n - i])
+
+    return x, y
+
+
+def _healpix_cover(polygon, nside, *, is_180, leaf_size=4):
+    """NESTED pixels whose centers may be in polygon
+
+    Coarse pixels are classified using their boundary - sampled at the corners of the
+    sub-pixels at the target resolution, such that the centers of all sub-pixels lie
+    inside. Pixels within the polygon are returned as index ranges, pixels on the
+    boundary of the polygon are refined down to single pixels (which need to be
+    tested).
+
+    Returns ``(start, stop, boundary)``: ranges of pixels within the polygon and the
+    pixels that need to be tested. ``is_180`` indicates whether the longitude of the
+    cells is given as -180..180 (or as 0..360).
+    """
+
+    order = int(np.log2(nside))
+    leaf_level = max(order - int(np.log2(leaf_size)), 0)
+
+    shapely.prepare(polygon)
+    _, y_min, _, y_max = polygon.bounds
+
+    starts, stops = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+
+    pix = np.arange(12, dtype=np.int64)
+    for level in range(leaf_level):
+
+        n = 2 ** (order - level)
+        ix, iy, face = _nest2xyf(pix, 2**level)
+
+        # the boundary of the pixels
+        x, y = _perimeter(n)
+        x = (ix[:, np.newaxis] * n + x) / nside
+        y = (iy[:, np.newaxis] * n + y) / nside
+
+        lon, lat = _xyf2lonlat(x, y, face[:, np.newaxis])
+        if is_180:
+            lon[lon >= 180] -= 360
+
+        # outside in latitude - also for pixels close to the poles
+        outside = (lat.min(axis=1) > y_max) | (lat.max(axis=1) < y_min)
+
+        # pixels on the poles and the lon seam can not be represented in lon/ lat
+        valid = (np.ptp(lon, axis=1) < 180) & (np.abs(lat).max(axis=1) < 90)
+        valid &= ~outside
+
+        rings = shapely.polygons(np.stack((lon[valid], lat[valid]), axis=-1))
+
+        intersects = shapely.intersects(polygon, rings)
+        outside[valid] = ~intersects
+
+        inside = np.zeros(pix.shape, dtype=bool)
+        valid[valid] = intersects
+        inside[valid] = shapely.contains(polygon, rings[intersects])
+
+        starts.append(pix[inside] * n * n)
+        stops.append((pix[inside] + 1) * n * n)
+
+        # refine the remaining pixels
+        pix = pix[~(inside | outside)]
+        pix = (pix[:, np.newaxis] * 4 + np.arange(4)).ravel()
+
+    # all sub-pixels of the remaining pixels need to be tested
+    n = 2 ** (order - leaf_level)
+    pix = (pix[:, np.newaxis] * n * n + np.arange(n * n)).ravel()
+
+    return np.concatenate(starts), np.concatenate(stops), pix
+
+
+def _expand_ranges(start, stop):
+    """concatenate ``np.arange(start[i], stop[i])`` for all i"""
+
+    lengths = stop - start
+    total = lengths.sum()
+
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = np.repeat(start - np.cumsum(lengths) + lengths, lengths)
+
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+def _check_healpix_coords(lon, lat, nside, *, nest, cell_ids):
+    """raise if ``lon`` and ``lat`` are not the centers of the HEALPix cells"""
+
+    npix = 12 * nside * nside
+
+    if lon.ndim != 1 or lon.shape != lat.shape:
+        raise ValueError("HEALPix grids require 1D ``lon`` and ``lat``")
+
+    if cell_ids is None and lon.size != npix:
+        raise ValueError(
+            f"Expected {npix} HEALPix cells for nside={nside}, found {lon.size}"
+        )
+
+    if cell_ids is not None and (cell_ids.min() < 0 or cell_ids.max() >= npix):
+        raise ValueError(f"Found HEALPix cell ids outside of [0, {npix})")
+
+    # check a sample of the cells
+    idx = np.unique(np.linspace(0, lon.size - 1, 1000).astype(int))
+    pix = idx if cell_ids is None else cell_ids[idx]
+
+    lon_c, lat_c = (_nest2lonlat if nest else _ring2lonlat)(pix, nside)
+
+    d_lon = (lon[idx] - lon_c + 180) % 360 - 180
+    d_lon = d_lon * np.cos(np.deg2rad(lat_c))
+
+    tol = 0.05 * np.rad2deg(np.sqrt(np.pi / 3) / nside)
+
+    if np.abs(d_lon).max() > tol or np.abs(lat[idx] - lat_c).max() > tol:
+        raise ValueError("``lon`` and ``lat`` are not the centers of the HEALPix grid")
+
+
+def _healpix_pairs(lon, lat, polygons, nside, *, nest, cell_ids):
+    """(region, cell) index pairs of the HEALPix cells in the polygons
+
+    ``lon`` and ``lat`` are the (wrapped) coordinates of the cells. Only the cells close
+    to the region boundaries are tested, the pairs are sorted by region and cell.
+    """
+
+    if cell_ids is not None:
+        sorter = np.argsort(cell_ids, kind="stable")
+        sorted_ids = cell_ids[sorter]
+
+    def _to_cells(pix):
+        """NESTED pixel indices to positions along the cell dimension"""
+
+        if not nest:
+            pix = _nest2ring(pix, nside)
+
+        if cell_ids is None:
+            return pix
+
+        idx = np.searchsorted(sorted_ids, pix)
+        idx[idx == sorted_ids.size] = 0
+        return sorter[idx[sorted_ids[idx] == pix]]
+
+    # wrap the pixel rings like the cell centers
+    is_180 = np.nanmin(lon) < 0
+
+    regions, cells = [], []
+    for i, polygon in enumerate(polygons):
+
+        start, stop, boundary = _healpix_cover(polygon, nside, is_180=is_180)
+
+        # test the cells close to the boundary - add a tiny offset to get a consistent
+        # edge behaviour
+        candidates = _to_cells(boundary)
+        lon_, lat_ = lon[candidates] - 1 * 10**-8, lat[candidates] - 1 * 10**-10
+        is_inside = shapely.contains_xy(polygon, lon_, lat_)
+
+        cell = np.concatenate(
+            (_to_cells(_expand_ranges(start, stop)), candidates[is_inside])
+        )
+
+        regions.append(np.full(cell.size, i, dtype=np.intp))
+        cells.append(np.sort(cell))
+
+    if not regions:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+
+    return np.concatenate(regions), np.concatenate(cells)
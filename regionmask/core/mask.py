@@ -1,17 +1,53 @@
 from __future__ import annotations
 
+import functools
+import importlib.util
+import logging
 import warnings
-from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
 
 import numpy as np
 import shapely
 import xarray as xr
 
+from regionmask.core.cache import (
+    _DiskCache,
+    _fingerprint,
+    _fingerprint_polygons,
+    _LRUCache,
+)
 from regionmask.core.coords import _get_coords
+from regionmask.core.curvilinear import (
+    _FRAME,
+    _band_cells,
+    _frame_cells,
+    _index_transform,
+    _median_spacing,
+)
+from regionmask.core.healpix import _get_healpix_grid, _healpix_pairs, _parse_healpix
+from regionmask.core.mesh import (
+    _continuous_vertices,
+    _fill_vertices,
+    _get_face_vertices,
+    _get_mesh,
+)
+from regionmask.core.projection import (
+    _central_meridian,
+    _get_projected_grid,
+    _get_rotated_grid,
+    _has_cut,
+    _parse_crs,
+    _rotate_pole,
+    _split_at_meridian,
+    _transform_polygons,
+)
 from regionmask.core.utils import (
     _equally_spaced_on_split_lon,
     _find_splitpoint,
+    _infer_bounds,
     _is_180,
+    _is_monotonic,
     _is_numeric,
     _sample_coords,
     _total_bounds,
@@ -20,6 +56,21 @@ from regionmask.core.utils import (
     unpackbits,
 )
 
+logger = logging.getLogger(__name__)
+
+# rasterio is only used for the "rasterize" backends, without it the (pure numpy)
+# "scanline" backend is used for all 1D grids
+has_rasterio = importlib.util.find_spec("rasterio") is not None
+# numba is used for a compiled point-in-polygon test for large unstructured grids
+has_numba = importlib.util.find_spec("numba") is not None
+# scipy is used to invert large curvilinear grids (``_mask_index_space``)
+has_scipy = importlib.util.find_spec("scipy") is not None
+
+# in-memory cache for masks, configured via ``set_options(mask_cache_max_entries=...)``
+_MASK_CACHE = _LRUCache("mask_cache_max_entries", "mask_cache_max_bytes")
+# persistent cache, configured via ``set_options(mask_disk_cache=True)``
+_MASK_DISK_CACHE = _DiskCache()
+
 _MASK_DOCSTRING_TEMPLATE = """\
 create a {nd} {qualifier} mask of a set of regions for the given lat/ lon grid
 
@@ -29,7 +80,9 @@ Parameters
     Can either be a longitude array and then ``lat`` needs to be
     given. Or an object where the longitude and latitude can be
     retrieved from, either using cf_xarray or by the names "lon"
-    and "lat". See also ``use_cf``.
+    and "lat". See also ``use_cf``. If the object or the coordinates are
+    chunked, a lazy (dask-backed) mask with the same chunks is returned.
+    For a UGRID Dataset (mesh topology) the mask is created for its faces.
 
 lat : array_like, optional
     If ``lon_or_obj`` is a longitude array, the latitude needs to be
@@ -49,11 +102,11 @@ lat : array_like, optional
     - ``180``: Wraps longitude coordinates to `[-180, 180[`
     - ``360``: Wraps longitude coordinates to `[0, 360[`
 
-{overlap}{flags}use_cf : bool, default: None
+{overlap}{flags}{output}use_cf : bool, default: None
     Whether to use ``cf_xarray`` to infer the names of the x and y coordinates. If None
     uses cf_xarray if the coord names are unambiguous. If True requires cf_xarray if
     False does not use cf_xarray.
-
+{crs}{frac}
 Returns
 -------
 mask_{nd} : {dtype} xarray.DataArray
@@ -105,6 +158,52 @@ overlap : bool | None, default: None
 
 """
 
+_OUTPUT_DOCSTRING = """\
+output : "dense" | "sparse", default: "dense"
+    Array type of the mask. For "sparse" the mask is backed by a ``sparse.COO`` array
+    (requires the `sparse <https://sparse.pydata.org>`__ package). It is created without
+    creating the dense array such that its memory scales with the number of gridpoints
+    within the regions. Not supported for chunked coordinates.
+
+"""
+
+_FRAC_APPROX_DOCSTRING = """\
+n_samples : int, default: 10
+    Number of sample points per grid cell in each direction, i.e. each cell is sampled
+    with ``n_samples x n_samples`` points. Lower values are faster but less accurate.
+dtype : "float64" | "float32" | "uint8", default: "float64"
+    Data type of the mask. For "uint8" the fractions are given in percent (rounded to
+    the nearest integer).
+"""
+
+_FRAC_BOUNDS_DOCSTRING = """\
+lon_bounds, lat_bounds : array_like, optional
+    Bounds of the grid cells. For 1D ``lon`` and ``lat`` coordinates of a regular grid
+    they must have shape ``(n, 2)`` (as the CF ``lon_bnds``). Otherwise they need the
+    shape of the coordinates with an additional last dimension for the vertices (e.g.
+    ``(y, x, 4)`` for a curvilinear grid), the cells are then given by the polygon
+    through the vertices. If None (default) the bounds are read from the variables
+    named in the ``bounds`` attribute of the coordinates (if ``lon_or_obj`` is a
+    Dataset), the face nodes of a UGRID mesh, or inferred from 1D coordinates.
+"""
+
+_CRS_DOCSTRING = """\
+crs : pyproj.CRS-like or CF grid mapping, optional
+    Coordinate reference system of a grid that is regular in projected (or rotated)
+    coordinates, e.g., polar stereographic or Lambert conformal grids (where ``lon``
+    and ``lat`` are curvilinear). Anything accepted by ``pyproj.CRS.from_user_input``
+    or a CF grid mapping variable (or its attributes). The regions are transformed to
+    the crs and the mask is created on the regular x and y coordinates, which is much
+    faster than testing each grid point. Grid points exactly on the boundary between
+    two regions may be assigned to a different region than without ``crs``. The x and
+    y coordinates are taken from ``lon_or_obj`` (``projection_x_coordinate`` and
+    ``projection_y_coordinate``) or inferred from ``lon`` and ``lat``. Rotated-pole grids with a CF grid mapping are
+    detected automatically. For HEALPix grids pass a ``healpix`` grid mapping (with
+    ``healpix_nside`` and ``healpix_order``); then only the cells close to the region
+    boundaries are tested. HEALPix grid mappings of ``lon_or_obj`` are detected
+    automatically.
+"""
+
 _FLAG_DOCSTRING = """\
 flag : str, default: "abbrevs"
     Indicates if the "abbrevs" (abbreviations) or "names" should be added as
@@ -118,11 +217,18 @@ flag : str, default: "abbrevs"
 
 def _inject_mask_docstring(*, which, is_gpd):
 
-    qualifier = {"2D": "float", "3D": "boolean", "frac": "fractional"}[which]
+    qualifier = {
+        "2D": "float",
+        "3D": "boolean",
+        "frac": "fractional",
+        "frac_exact": "exact fractional",
+    }[which]
 
-    dtype = {"2D": "float", "3D": "boolean", "frac": "float"}[which]
+    dtype = {"2D": "float", "3D": "boolean", "frac": "float", "frac_exact": "float"}[
+        which
+    ]
 
-    is_3D = which in ["3D", "frac"]
+    is_3D = which in ["3D", "frac", "frac_exact"]
 
     nd = "3D" if is_3D else "2D"
     drop_doc = _DROP_DOCSTRING if is_3D else ""
@@ -130,11 +236,17 @@ def _inject_mask_docstring(*, which, is_gpd):
     gp_doc = _GP_DOCSTRING if is_gpd else ""
     overlap = _OVERLAP_DOCSTRING if is_gpd else ""
     flags = _FLAG_DOCSTRING if not (is_gpd or is_3D) else ""
+    output = _OUTPUT_DOCSTRING if is_3D else ""
+    crs = _CRS_DOCSTRING if which in ["2D", "3D"] else ""
+    frac = {"frac": _FRAC_APPROX_DOCSTRING, "frac_exact": _FRAC_BOUNDS_DOCSTRING}.get(
+        which, ""
+    )
 
     see_also = {
-        "2D": "Regions.mask_3D, Regions.mask_3D_frac_approx",
-        "3D": "Regions.mask, Regions.mask_3D_frac_approx",
-        "frac": "Regions.mask, Regions.mask_3D",
+        "2D": "Regions.mask_3D, Regions.mask_3D_frac, Regions.mask_3D_frac_approx",
+        "3D": "Regions.mask, Regions.mask_3D_frac, Regions.mask_3D_frac_approx",
+        "frac": "Regions.mask, Regions.mask_3D, Regions.mask_3D_frac",
+        "frac_exact": "Regions.mask, Regions.mask_3D, Regions.mask_3D_frac_approx",
     }[which]
 
     mask_docstring = _MASK_DOCSTRING_TEMPLATE.format(
@@ -146,6 +258,9 @@ def _inject_mask_docstring(*, which, is_gpd):
         gp_doc=gp_doc,
         overlap=overlap,
         flags=flags,
+        output=output,
+        crs=crs,
+        frac=frac,
         see_also=see_also,
     )
 
@@ -161,7 +276,9 @@ def _mask(
     method=None,
     wrap_lon: None | bool | Literal[180, 360] = None,
     as_3D: bool = False,
+    as_sparse: bool = False,
     use_cf: bool | None = None,
+    crs=None,
 ) -> xr.DataArray:
     """
     internal function to create a mask
@@ -174,12 +291,9 @@ def _mask(
 
     # determine whether unstructured grid
     # have to do this before np.asarray
-    is_unstructured = False
-    if isinstance(lon, xr.DataArray) and isinstance(lat, xr.DataArray):
-        if lon.ndim == 1 and lat.ndim == 1:
-            if lon.name != lon.dims[0] and lat.name != lat.dims[0]:
-                is_unstructured = True
+    is_unstructured = _is_unstructured(lon, lat)
 
+    if isinstance(lon, xr.DataArray) and isinstance(lat, xr.DataArray):
         has_radians = any(c.attrs.get("units") == "radian" for c in (lon, lat))
         if has_radians and wrap_lon is not False:
             warnings.warn(
@@ -187,26 +301,6 @@ def _mask(
                 "be converted to degree?"
             )
 
-    lon_arr = np.asarray(lon, dtype=float)
-    lat_arr = np.asarray(lat, dtype=float)
-
-    # automatically detect whether wrapping is necessary
-    wrap_lon_: Literal[180, 360] | bool
-    if wrap_lon is None:
-
-        lon_bounds = _total_bounds(polygons)[::2]
-
-        regions_is_180 = _is_180(
-            *lon_bounds, msg_add="Set `wrap_lon=False` to skip this check."
-        )
-
-        wrap_lon_ = 180 if regions_is_180 else 360
-    else:
-        wrap_lon_ = wrap_lon
-
-    if wrap_lon_:
-        lon_arr = _wrapAngle(lon_arr, wrap_lon_, is_unstructured=is_unstructured)
-
     if method == "pygeos":
         raise ValueError("pygeos is no longer supported")
 
@@ -224,30 +318,290 @@ def _mask(
             stacklevel=5,
         )
 
-    if method is None:
-        method = _determine_method(lon_arr, lat_arr)
+    chunks = _get_chunks(lon_or_obj, lon, lat)
+    if chunks and as_sparse:
+        raise ValueError("``output='sparse'`` is not supported for chunked coordinates")
+
+    healpix = None
+    if crs is not None:
+        if chunks:
+            raise ValueError("``crs`` is not supported for chunked coordinates")
+
+        # HEALPix grid mappings are not supported by pyproj
+        healpix = _parse_healpix(crs)
+        crs = _parse_crs(crs) if healpix is None else None
+
+    # chunks are only found for DataArray coordinates
+    if chunks and isinstance(lon, xr.DataArray) and isinstance(lat, xr.DataArray):
+        mask = _mask_lazy(
+            polygons,
+            numbers,
+            lon,
+            lat,
+            chunks,
+            method=method,
+            wrap_lon=wrap_lon,
+            as_3D=as_3D,
+            is_unstructured=is_unstructured,
+        )
+        return _mask_to_dataarray(mask, lon, lat)
+
+    lon_arr = np.asarray(lon, dtype=float)
+    lat_arr = np.asarray(lat, dtype=float)
+
+    # HEALPix grids: only test the cells close to the region boundaries
+    if method == "shapely" or crs is not None:
+        healpix = None
+    else:
+        healpix = _get_healpix_grid(lon_or_obj, lon, lat, grid=healpix)
+
+    # rotated-pole grids are detected from the grid mapping of lon_or_obj
+    rotated = None
+    if crs is None and method != "shapely":
+        rotated = _get_rotated_grid(lon_or_obj, lon, lat)
+
+    # all arguments that determine the mask must be part of the key - sparse masks
+    # are not cached
+    cache_key = disk_cache_key = None
+    use_cache = _MASK_CACHE.enabled or _MASK_DISK_CACHE.enabled
+    if use_cache and not as_sparse:
+        cache_key = _fingerprint(
+            _fingerprint_polygons(polygons, numbers),
+            lon_arr,
+            lat_arr,
+            wrap_lon,
+            as_3D,
+            method,
+            is_unstructured,
+            _get_mesh(lon_or_obj) is not None,
+            None if crs is None else crs.to_wkt(),
+            None if healpix is None else healpix[:2],
+            None if rotated is None else _rotated_key(*rotated),
+        )
+
+        mask = _MASK_CACHE.get(cache_key)
+        if mask is not None:
+            return _mask_to_dataarray(mask, lon, lat)
+
+    if cache_key is not None and _MASK_DISK_CACHE.enabled:
+        import regionmask
+
+        # the disk cache may outlive the regionmask version - include it in the key
+        disk_cache_key = _fingerprint(cache_key, regionmask.__version__)
+
+        mask = _MASK_DISK_CACHE.get(disk_cache_key)
+        if mask is not None:
+            mask = _MASK_CACHE.put(cache_key, mask)
+            return _mask_to_dataarray(mask, lon, lat)
+
+    mask = None
+
+    # regular grids in projected or rotated coords: mask the 1D x and y coords instead
+    # of the 2D lon and lat
+    if crs is not None and method != "shapely":
+        mask = _mask_projected(
+            polygons,
+            numbers,
+            lon_or_obj,
+            lon_arr,
+            lat_arr,
+            crs,
+            method=method,
+            as_3D=as_3D,
+            as_sparse=as_sparse,
+        )
+
+    if rotated is not None:
+        mask = _mask_rotated(
+            polygons,
+            numbers,
+            *rotated,
+            method=method,
+            as_3D=as_3D,
+            as_sparse=as_sparse,
+        )
+
+    # treat the points at -180°E/0°E and -90°N (not for wrap_lon=False)
+    if mask is not None and wrap_lon is not False:
+        mask = _mask_native_edgepoints(
+            mask,
+            polygons,
+            numbers,
+            lon_arr,
+            lat_arr,
+            wrap_lon=_resolve_wrap_lon(wrap_lon, polygons),
+            as_3D=as_3D,
+            as_sparse=as_sparse,
+        )
+
+    if mask is None:
+        mask = _mask_numpy(
+            polygons,
+            numbers,
+            lon_arr,
+            lat_arr,
+            method=method,
+            wrap_lon=_resolve_wrap_lon(wrap_lon, polygons),
+            edgepoints=wrap_lon is not False,
+            as_3D=as_3D,
+            as_sparse=as_sparse,
+            is_unstructured=is_unstructured,
+            healpix=healpix,
+        )
+
+    if disk_cache_key is not None:
+        _MASK_DISK_CACHE.put(disk_cache_key, mask)
+
+    if cache_key is not None:
+        mask = _MASK_CACHE.put(cache_key, mask)
+
+    return _mask_to_dataarray(mask, lon, lat)
+
+
+def _resolve_wrap_lon(
+    wrap_lon: None | bool | Literal[180, 360], polygons, lon=None
+) -> bool | Literal[180, 360]:
+    """automatically detect whether wrapping is necessary
+
+    ``wrap_lon=True`` is only resolved if ``lon`` is passed (otherwise this is done in
+    ``_wrapAngle``).
+    """
+
+    if wrap_lon is None:
+
+        lon_bounds = _total_bounds(polygons)[::2]
+
+        regions_is_180 = _is_180(
+            *lon_bounds, msg_add="Set `wrap_lon=False` to skip this check."
+        )
+
+        return 180 if regions_is_180 else 360
+
+    if wrap_lon is True and lon is not None:
+        mn, mx = np.nanmin(lon), np.nanmax(lon)
+        msg = "Cannot infer the transformation."
+        return 360 if _is_180(mn, mx, msg_add=msg) else 180
+
+    return wrap_lon
+
+
+def _mask_numpy(
+    polygons,
+    numbers,
+    lon_arr: np.ndarray,
+    lat_arr: np.ndarray,
+    *,
+    method=None,
+    wrap_lon: bool | Literal[180, 360],
+    edgepoints: bool,
+    as_3D: bool = False,
+    as_sparse: bool = False,
+    is_unstructured: bool = False,
+    lon_min: float | None = None,
+    healpix: tuple | None = None,
+):
+    """create a mask for numpy coordinates, for internal use
+
+    ``wrap_lon`` must be resolved (see ``_resolve_wrap_lon``) and ``method`` must be
+    validated. ``lon_min`` is the minimum of the (wrapped) longitude of the whole grid
+    and must be passed if only a chunk of the grid is masked. For ``as_sparse=True`` a
+    3D ``sparse.COO`` mask is returned. ``healpix`` is ``(nside, nest, cell_ids)`` of
+    HEALPix grids (see ``_get_healpix_grid``).
+    """
+
+    if wrap_lon:
+        lon_arr = _wrapAngle(lon_arr, wrap_lon, is_unstructured=is_unstructured)
+
+    # 2D coords that are a meshgrid of 1D axes: mask the axes and broadcast back
+    axes = None
+    if not is_unstructured and method != "shapely" and healpix is None:
+        axes = _separable_axes(lon_arr, lat_arr)
+
+    if axes is not None:
+        lon_1D, lat_1D, transpose = axes
+
+        mask = _mask_numpy(
+            polygons,
+            numbers,
+            lon_1D,
+            lat_1D,
+            method=method,
+            wrap_lon=False,
+            edgepoints=edgepoints,
+            as_3D=as_3D,
+            as_sparse=as_sparse,
+            lon_min=lon_min,
+        )
+
+        return _transpose_mask(mask, as_sparse=as_sparse) if transpose else mask
+
+    if healpix is not None:
+        method = "healpix"
+    elif method is None:
+        method = _determine_method(lon_arr, lat_arr, is_unstructured=is_unstructured)
+
+        # large curvilinear grids: mask in the index space of the grid
+        if method == "shapely" and _use_index_space(lon_arr, lat_arr, is_unstructured):
+            method = "index_space"
     elif method == "rasterize":
         method = _determine_method(lon_arr, lat_arr)
+        # shuffled axes or several split points: rasterize the sorted axes
+        if method == "scanline" and _is_permuted_equally_spaced(lon_arr, lat_arr):
+            method = "rasterize_permuted"
         if "rasterize" not in method:
             msg = "`lat` and `lon` must be equally spaced to use `method='rasterize'`"
             raise ValueError(msg)
 
-    kwargs = {}
+    # the scanline backend handles all equally spaced grids and wrapped lons
+    if "rasterize" in method and not has_rasterio:
+        method = "scanline"
+
+    # very large grids: classify blocks of gridpoints hierarchically (3D masks are
+    # faster when rasterizing the regions on their bounding box windows)
+    if method in ("rasterize", "scanline") and not (as_3D or as_sparse):
+        if lon_arr.size * lat_arr.size >= _QUADTREE_MIN_CELLS:
+            if _is_monotonic(lon_arr, lat_arr):
+                method = "quadtree"
+
+    if as_sparse:
+        return _mask_sparse(
+            lon_arr,
+            lat_arr,
+            polygons,
+            numbers,
+            method=method,
+            edgepoints=edgepoints,
+            is_unstructured=is_unstructured,
+            lon_min=lon_min,
+            healpix=healpix,
+        )
+
+    kwargs: dict[str, Any] = {}
     if method == "rasterize":
         mask_func = _mask_rasterize
     elif method == "rasterize_flip":
         mask_func = _mask_rasterize_flip
     elif method == "rasterize_split":
         mask_func = _mask_rasterize_split
+    elif method == "rasterize_permuted":
+        mask_func = _mask_rasterize_permuted
+    elif method == "scanline":
+        mask_func = _mask_scanline  # type:ignore[assignment]
+    elif method == "quadtree":
+        mask_func = _mask_quadtree  # type:ignore[assignment]
+    elif method == "healpix":
+        mask_func = _mask_healpix  # type:ignore[assignment]
+        kwargs = {"healpix": healpix}
+    elif method == "index_space":
+        mask_func = _mask_index_space  # type:ignore[assignment]
     elif method == "shapely":
         mask_func = _mask_shapely  # type:ignore[assignment]
         kwargs = {"is_unstructured": is_unstructured}
 
     mask = mask_func(lon_arr, lat_arr, polygons, numbers=numbers, as_3D=as_3D, **kwargs)
 
-    # not False required
-    if wrap_lon is not False:
-        # treat the points at -180°E/0°E and -90°N
+    # treat the points at -180°E/0°E and -90°N (not for wrap_lon=False)
+    if edgepoints:
         mask = _mask_edgepoints_shapely(
             mask,
             lon_arr,
@@ -256,420 +610,3093 @@ def _mask(
             numbers,
             is_unstructured=is_unstructured,
             as_3D=as_3D,
+            lon_min=lon_min,
         )
 
-    return _mask_to_dataarray(mask, lon, lat)
-
+    return mask
 
-class InvalidCoordsError(ValueError):
-    pass
 
+def _transpose_mask(mask, *, as_sparse):
+    """swap the two grid dimensions of a 2D or 3D mask"""
 
-def _mask_3D_frac_approx(
-    polygons,
-    numbers,
-    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
-    lat: np.typing.ArrayLike | xr.DataArray | None = None,
-    *,
-    drop=True,
-    wrap_lon: None | bool | Literal[180, 360] = None,
-    overlap: bool | None = None,
-    use_cf: bool | None = None,
-) -> xr.DataArray:
+    ndim = mask.ndim
+    mask = mask.transpose(tuple(range(ndim - 2)) + (ndim - 1, ndim - 2))
 
-    # directly creating 3D masks seems to be faster in general (strangely due to the
-    # memory layout of the reshaped mask)
-    as_3D = True
-    n = 10
+    return mask if as_sparse else np.ascontiguousarray(mask)
 
-    lon_, lat_ = _get_coords(lon_or_obj, lat, "lon", "lat", use_cf)
-    backend = _determine_method(lon_, lat_)
 
-    if backend not in ("rasterize", "rasterize_flip"):
-        raise InvalidCoordsError("'lon' and 'lat' must be 1D and equally spaced.")
+def _mask_rotated(polygons, numbers, rlon, rlat, pole, transpose, **kwargs):
+    """mask a rotated-pole grid on its 1D rotated coords (or None)"""
 
-    if np.nanmin(lat_) < -90 or np.nanmax(lat_) > 90:
-        raise InvalidCoordsError("lat must be between -90 and +90")
+    rlon = np.asarray(rlon, dtype=float)
+    rlat = np.asarray(rlat, dtype=float)
 
-    lon_sampled, lat_sampled = _sample_coords(lon_), _sample_coords(lat_)
+    if rlon.size < 2 or rlat.size < 2:
+        return None
 
-    ds = xr.Dataset(coords={"lon": lon_sampled, "lat": lat_sampled})
+    spacing = min(np.abs(np.diff(rlon)).min(), np.abs(np.diff(rlat)).min())
 
-    mask_sampled = _mask(
+    return _mask_native(
         polygons,
         numbers,
-        ds.lon,
-        ds.lat,
-        wrap_lon=wrap_lon,
-        as_3D=as_3D,
-        use_cf=use_cf,
-    ).values
+        rlon,
+        rlat,
+        functools.partial(_rotate_pole, **pole),
+        period=360,
+        transpose=transpose,
+        max_segment_length=spacing,
+        **kwargs,
+    )
 
-    mask_reshaped = mask_sampled.reshape(-1, lat_.size, n, lon_.size, n)
-    mask = mask_reshaped.mean(axis=(2, 4))
 
-    # maybe fix edges as 90°N/ S
-    sel = np.abs(lat_sampled) <= 90
-    if wrap_lon is not False and sel.any():
+def _rotated_key(rlon, rlat, pole, transpose):
+    """the parameters of a rotated-pole grid for the cache key"""
 
-        e1 = mask_reshaped[:, 0].mean(axis=(1, 3), where=sel[:n].reshape(-1, 1, 1))
-        e2 = mask_reshaped[:, -1].mean(axis=(1, 3), where=sel[-n:].reshape(-1, 1, 1))
+    rlon, rlat = np.asarray(rlon, dtype=float), np.asarray(rlat, dtype=float)
 
-        mask[:, 0] = e1
-        mask[:, -1] = e2
+    return rlon, rlat, tuple(sorted(pole.items())), transpose
 
-    mask = _mask_to_dataarray(mask, lon_, lat_)
 
-    mask_3D = _3D_to_3D_mask(mask, numbers, drop=drop)
+def _mask_projected(polygons, numbers, lon_or_obj, lon, lat, crs, **kwargs):
+    """mask a grid that is regular in ``crs`` on its 1D x and y coords (or None)"""
 
-    mask_3D.attrs = {"standard_name": "region"}
+    x, y, transpose, transform, period = _get_projected_grid(lon_or_obj, lon, lat, crs)
 
-    return mask_3D
+    spacing = min(np.abs(np.diff(x)).min(), np.abs(np.diff(y)).min())
 
+    # the polygons are segmentized in degree
+    if period is None:
+        spacing = spacing * crs.axis_info[0].unit_conversion_factor / 111_000
 
-def _mask_2D(
+    # the regions are only needed for the latitudes of the grid - this also removes
+    # the far pole, which cannot be transformed for many projections
+    lat_min = max(np.nanmin(lat) - 1, -90)
+    lat_max = min(np.nanmax(lat) + 1, 90)
+
+    if lat_min > -90 or lat_max < 90:
+        polygons = np.asarray(polygons, dtype=object)
+        polygons = shapely.clip_by_rect(polygons, -1000, lat_min, 1000, lat_max)
+
+    # regions crossing the cut of the projection must be split
+    lon_0 = _central_meridian(crs)
+    if period is None and _has_cut(transform, lon_0 + 180):
+        polygons = _split_at_meridian(polygons, lon_0)
+
+    return _mask_native(
+        polygons,
+        numbers,
+        x,
+        y,
+        transform,
+        period=period,
+        transpose=transpose,
+        max_segment_length=max(spacing, 0.01),
+        **kwargs,
+    )
+
+
+def _mask_native(
     polygons,
     numbers,
-    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
-    lat: np.typing.ArrayLike | xr.DataArray | None = None,
+    x,
+    y,
+    transform,
     *,
-    method=None,
-    wrap_lon: None | bool | Literal[180, 360] = None,
-    use_cf: bool | None = None,
-    overlap: bool | None = None,
-) -> xr.DataArray:
+    period,
+    transpose,
+    max_segment_length,
+    method,
+    as_3D,
+    as_sparse,
+):
+    """mask a grid on its native 1D coords after transforming the polygons
 
-    # NOTE: this is already checked in Regions.mask, and mask_geopandas
-    # double check here if this method is ever made public
-    # if overlap:
-    #     raise ValueError(
-    #         "Creating a 2D mask with overlapping regions yields wrong results. "
-    #         "Please use ``region.mask_3D(...)`` instead. "
-    #         "To create a 2D mask anyway, set ``overlap=False``."
-    #     )
+    Returns None if the polygons cannot be transformed (e.g. if a region encloses the
+    pole of rotated coordinates).
+    """
 
-    # if as_3D is not explicitly given - set it to True
-    as_3D = overlap is None
+    transformed = _transform_polygons(
+        polygons, transform, max_segment_length=max_segment_length, period=period
+    )
 
-    mask = _mask(
-        polygons=polygons,
-        numbers=numbers,
-        lon_or_obj=lon_or_obj,
-        lat=lat,
+    if transformed is None:
+        return None
+
+    # empty regions (e.g. after clipping) are replaced by a polygon outside of the grid
+    # such that all backends get valid geometries
+    d_x, d_y = np.abs(x[1] - x[0]), np.abs(y[1] - y[0])
+    x_max, y_max = x.max(), y.max()
+    outside = shapely.box(x_max + d_x, y_max + d_y, x_max + 2 * d_x, y_max + 2 * d_y)
+    transformed = [outside if p.is_empty else p for p in transformed]
+
+    mask = _mask_numpy(
+        transformed,
+        numbers,
+        x,
+        y,
         method=method,
-        wrap_lon=wrap_lon,
-        use_cf=use_cf,
+        wrap_lon=False,
+        edgepoints=False,
         as_3D=as_3D,
+        as_sparse=as_sparse,
     )
 
-    # only happens for (overlap == None)
-    if as_3D:
-        mask = _3D_to_2D_mask(mask, numbers)
+    return _transpose_mask(mask, as_sparse=as_sparse) if transpose else mask
 
-    if np.all(np.isnan(mask)):
-        msg = "No gridpoint belongs to any region. Returning an all-NaN mask."
-        warnings.warn(msg, UserWarning, stacklevel=3)
 
-    mask.attrs = {"standard_name": "region"}
+def _mask_native_edgepoints(
+    mask, polygons, numbers, lon, lat, *, wrap_lon, as_3D, as_sparse
+):
+    """treat the edge points of a mask created on the native coords of the grid
 
-    return mask
+    The points at -180°E/0°E and -90°N lie on the boundary of the transformed regions
+    and may be assigned to the regions on either side. They are unassigned and then
+    assigned as for masks created on lon and lat.
+    """
 
+    if wrap_lon:
+        lon = _wrapAngle(lon, wrap_lon)
 
-def _mask_3D(
-    polygons,
-    numbers,
-    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
-    lat: np.typing.ArrayLike | xr.DataArray | None = None,
-    *,
-    drop: bool = True,
-    method=None,
-    wrap_lon: None | bool | Literal[180, 360] = None,
-    overlap: bool | None = None,
-    use_cf: bool | None = None,
-) -> xr.DataArray:
+    lon_min = np.nanmin(lon)
 
-    as_3D = overlap or overlap is None
+    cells, __, __ = _edgepoints(lon, lat, lon_min)
+    mask = _unassign_cells(mask, cells, as_3D=as_3D, as_sparse=as_sparse)
 
-    mask = _mask(
-        polygons=polygons,
-        numbers=numbers,
-        lon_or_obj=lon_or_obj,
-        lat=lat,
-        method=method,
-        wrap_lon=wrap_lon,
-        as_3D=as_3D,
-        use_cf=use_cf,
-    )
+    if not as_sparse:
+        return _mask_edgepoints_shapely(mask, lon, lat, polygons, numbers, as_3D=as_3D)
 
-    if as_3D:
-        mask_3D = _3D_to_3D_mask(mask, numbers, drop=drop)
-    else:
-        mask_3D = _2D_to_3D_mask(mask, numbers, drop=drop)
+    import sparse
 
-    if overlap is None and (mask_3D.sum("region") > 1).any():
-        warnings.warn(
-            "Detected overlapping regions. As of v0.11.0 these are correctly taken into"
-            " account. Note, however, that a different mask is returned than with older"
-            " versions of regionmask. To suppress this warning, set `overlap=True` (to"
-            " restore the old, incorrect, behaviour, set `overlap=False`)."
+    region, cell = _edgepoints_contained(lon, lat, polygons, lon_min)
+
+    if cell.size == 0:
+        return mask
+
+    coords = np.vstack((region, *np.unravel_index(cell, lon.shape)))
+    coords = np.hstack((mask.coords, coords))
+
+    # duplicates are combined (logical or)
+    data = np.ones(coords.shape[1], dtype=bool)
+    return sparse.COO(coords, data, shape=mask.shape, fill_value=False)
+
+
+def _unassign_cells(mask, cells, *, as_3D, as_sparse):
+    """remove the gridpoints given by their flat index from a 2D, 3D or sparse mask"""
+
+    if cells.size == 0:
+        return mask
+
+    shape = mask.shape[-2:]
+
+    if as_sparse:
+        import sparse
+
+        flat = np.ravel_multi_index(tuple(mask.coords[1:]), shape)
+        keep = ~np.isin(flat, cells)
+
+        return sparse.COO(
+            mask.coords[:, keep], mask.data[keep], shape=mask.shape, fill_value=False
+        )
+
+    idx = np.unravel_index(cells, shape)
+
+    if as_3D:
+        mask[(slice(None),) + idx] = False
+    else:
+        mask[idx] = np.nan
+
+    return mask
+
+
+def _mask_sparse(
+    lon,
+    lat,
+    polygons,
+    numbers,
+    *,
+    method,
+    edgepoints,
+    is_unstructured,
+    lon_min,
+    healpix=None,
+):
+    """create a 3D sparse mask from the (region, cell) pairs of the backends"""
+
+    import sparse
+
+    if method == "rasterize":
+        regions, cells = _mask_rasterize_pairs(lon, lat, polygons)
+    elif method == "rasterize_flip":
+        regions, cells = _mask_rasterize_flip_pairs(lon, lat, polygons)
+    elif method == "rasterize_split":
+        regions, cells = _mask_rasterize_split_pairs(lon, lat, polygons)
+    elif method == "rasterize_permuted":
+        regions, cells = _mask_rasterize_permuted_pairs(lon, lat, polygons)
+    elif method == "scanline":
+        regions, cells = _mask_scanline_pairs(lon, lat, polygons)
+    elif method == "healpix":
+        regions, cells = _mask_healpix_pairs(lon, lat, polygons, healpix=healpix)
+    elif method == "index_space":
+        regions, cells = _mask_index_space_pairs(lon, lat, polygons)
+    elif method == "shapely":
+        regions, cells = _mask_shapely_pairs(
+            lon, lat, polygons, is_unstructured=is_unstructured
+        )
+
+    shape = _get_shape(lon, lat, numbers, is_unstructured=is_unstructured)
+
+    # treat the points at -180°E/0°E and -90°N (not for wrap_lon=False)
+    if edgepoints:
+        if lon_min is None:
+            lon_min = np.nanmin(lon)
+
+        region, cell = _edgepoints_contained(
+            lon, lat, polygons, lon_min, is_unstructured=is_unstructured
+        )
+
+        regions = np.concatenate((regions, region))
+        cells = np.concatenate((cells, cell))
+
+    n_cells = np.prod(shape).item()
+
+    # remove duplicates (from the edgepoints) and sort
+    key = np.unique(regions.astype(np.int64) * n_cells + cells)
+    region, cell = np.divmod(key, n_cells)
+
+    coords = np.vstack((region, *np.unravel_index(cell, shape)))
+
+    return sparse.COO(
+        coords,
+        np.ones(key.size, dtype=bool),
+        shape=(len(numbers),) + shape,
+        has_duplicates=False,
+        sorted=True,
+        fill_value=False,
+    )
+
+
+def _get_chunks(lon_or_obj, lon, lat) -> dict[str, tuple[int, ...]]:
+    """get the dask chunks along the dimensions of lon and lat
+
+    Returns an empty dict if neither ``lon_or_obj``, nor ``lon`` or ``lat`` are chunked.
+    """
+
+    chunks: dict[str, tuple[int, ...]] = {}
+
+    if not all(isinstance(c, xr.DataArray) for c in (lon, lat)):
+        return chunks
+
+    dims = set(lon.dims) | set(lat.dims)
+
+    for obj in (lon, lat, lon_or_obj):
+        if not isinstance(obj, xr.DataArray | xr.Dataset):
+            continue
+        chunksizes: dict[Any, tuple[int, ...]]
+        try:
+            chunksizes = dict(obj.chunksizes)
+        except ValueError:
+            # inconsistent chunks in a Dataset
+            chunksizes = {}
+            for var in obj.variables.values():
+                chunksizes.update(var.chunksizes)
+
+        chunks.update({dim: c for dim, c in chunksizes.items() if dim in dims})
+
+    return chunks
+
+
+def _coord_to_dask(coord: xr.DataArray, chunks):
+    import dask.array as da
+
+    chunks_ = tuple(chunks.get(dim, -1) for dim in coord.dims)
+
+    data = coord.data
+    if not isinstance(data, da.Array):
+        data = np.asarray(data)
+
+    return da.asarray(data).astype(float).rechunk(chunks_)
+
+
+def _mask_lazy(
+    polygons,
+    numbers,
+    lon: xr.DataArray,
+    lat: xr.DataArray,
+    chunks,
+    *,
+    method=None,
+    wrap_lon: None | bool | Literal[180, 360] = None,
+    as_3D: bool = False,
+    is_unstructured: bool = False,
+):
+    """create a dask-backed mask where each chunk is masked independently"""
+
+    import dask.array as da
+
+    edgepoints = wrap_lon is not False
+
+    if lon.ndim != lat.ndim or lon.ndim > 2:
+        # raise the appropriate error
+        _get_LON_LAT_shape(lon, lat, numbers)
+
+    if is_unstructured or lon.ndim == 2:
+        if lon.dims != lat.dims:
+            raise ValueError("lon and lat must have the same dimensions")
+        lon_ind = lat_ind = out_ind = tuple(range(lon.ndim))
+    else:
+        lon_ind, lat_ind, out_ind = (1,), (0,), (0, 1)
+
+    lon_arr = _coord_to_dask(lon, chunks)
+    lat_arr = _coord_to_dask(lat, chunks)
+
+    wrap_lon = _resolve_wrap_lon(wrap_lon, polygons)
+    if wrap_lon is True:
+        mn, mx = da.compute(da.nanmin(lon_arr), da.nanmax(lon_arr))
+        wrap_lon = _resolve_wrap_lon(wrap_lon, polygons, lon=[mn, mx])
+
+    if lon.ndim == 1 and not is_unstructured:
+        # the checks of rectilinear grids need the whole (1D) lon coordinate
+        lon_wrapped = lon_arr.compute()
+        if wrap_lon:
+            lon_wrapped = _wrapAngle(lon_wrapped, wrap_lon)
+
+        lon_min = np.nanmin(lon_wrapped)
+
+        if method == "rasterize":
+            lat_ = lat_arr.compute()
+            is_equally_spaced = "rasterize" in _determine_method(lon_wrapped, lat_)
+            if not (
+                is_equally_spaced or _is_permuted_equally_spaced(lon_wrapped, lat_)
+            ):
+                msg = (
+                    "`lat` and `lon` must be equally spaced to use `method='rasterize'`"
+                )
+                raise ValueError(msg)
+            # the chunks are not necessarily equally spaced
+            method = None
+    elif wrap_lon:
+        lon_wrapped = lon_arr.map_blocks(_wrapAngle, wrap_lon, is_unstructured=True)
+        lon_min = da.nanmin(lon_wrapped).compute()
+    else:
+        lon_min = da.nanmin(lon_arr).compute()
+
+    new_axes = {}
+    if as_3D:
+        out_ind = (-1,) + out_ind
+        new_axes = {-1: len(numbers)}
+
+    dtype = bool if as_3D else float
+
+    return da.blockwise(
+        _mask_block,
+        out_ind,
+        lon_arr,
+        lon_ind,
+        lat_arr,
+        lat_ind,
+        polygons=polygons,
+        numbers=numbers,
+        method=method,
+        wrap_lon=wrap_lon,
+        edgepoints=edgepoints,
+        as_3D=as_3D,
+        is_unstructured=is_unstructured,
+        lon_min=lon_min,
+        new_axes=new_axes,
+        dtype=dtype,
+        meta=np.empty((0,) * len(out_ind), dtype=dtype),
+        concatenate=True,
+    )
+
+
+def _mask_block(lon, lat, *, polygons, numbers, **kwargs):
+
+    return _mask_numpy(polygons, numbers, lon, lat, **kwargs)
+
+
+def _is_lazy(obj) -> bool:
+
+    return obj.chunks is not None
+
+
+class InvalidCoordsError(ValueError):
+    pass
+
+
+def _mask_3D_frac_approx(
+    polygons,
+    numbers,
+    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+    lat: np.typing.ArrayLike | xr.DataArray | None = None,
+    *,
+    drop=True,
+    wrap_lon: None | bool | Literal[180, 360] = None,
+    overlap: bool | None = None,
+    use_cf: bool | None = None,
+    output: Literal["dense", "sparse"] = "dense",
+    n_samples: int = 10,
+    dtype: Literal["float64", "float32", "uint8"] = "float64",
+) -> xr.DataArray:
+
+    as_sparse = _parse_output(output)
+    np_dtype = _parse_frac_dtype(dtype)
+
+    if not (isinstance(n_samples, int | np.integer) and n_samples > 0):
+        raise ValueError(f"'n_samples' must be a positive integer, got '{n_samples}'")
+
+    lon_, lat_ = _get_coords(lon_or_obj, lat, "lon", "lat", use_cf)
+    backend = _determine_method(lon_, lat_)
+
+    if backend not in ("rasterize", "rasterize_flip"):
+        raise InvalidCoordsError("'lon' and 'lat' must be 1D and equally spaced.")
+
+    if np.nanmin(lat_) < -90 or np.nanmax(lat_) > 90:
+        raise InvalidCoordsError("lat must be between -90 and +90")
+
+    lon_arr = np.asarray(lon_, dtype=float)
+    lat_arr = np.asarray(lat_, dtype=float)
+
+    kwargs = {
+        "polygons": polygons,
+        "numbers": numbers,
+        "wrap_lon": _resolve_wrap_lon(wrap_lon, polygons),
+        "edgepoints": wrap_lon is not False,
+        "d_lon": lon_arr[1] - lon_arr[0],
+        "d_lat": lat_arr[1] - lat_arr[0],
+        "n": n_samples,
+        "frac_dtype": np_dtype,
+    }
+
+    chunks = _get_chunks(lon_or_obj, lon_, lat_)
+    if chunks and as_sparse:
+        raise ValueError("``output='sparse'`` is not supported for chunked coordinates")
+
+    if chunks:
+        import dask.array as da
+
+        # the chunks must be wrapped consistently
+        lon_sampled = _sample_coords(lon_arr, n=n_samples)
+        kwargs["wrap_lon"] = _resolve_wrap_lon(
+            kwargs["wrap_lon"], polygons, lon=lon_sampled
+        )
+        if kwargs["wrap_lon"]:
+            lon_sampled = _wrapAngle(lon_sampled, kwargs["wrap_lon"])
+        kwargs["lon_min"] = np.nanmin(lon_sampled)
+
+        mask = da.blockwise(
+            _mask_3D_frac_approx_block,
+            (-1, 0, 1),
+            _coord_to_dask(lon_, chunks),
+            (1,),
+            _coord_to_dask(lat_, chunks),
+            (0,),
+            new_axes={-1: len(numbers)},
+            dtype=np_dtype,
+            meta=np.empty((0, 0, 0), dtype=np_dtype),
+            concatenate=True,
+            **kwargs,
         )
+    else:
+        mask = _mask_3D_frac_approx_block(
+            lon_arr, lat_arr, as_sparse=as_sparse, **kwargs
+        )
+
+    mask = _mask_to_dataarray(mask, lon_, lat_)
+
+    mask_3D = _3D_to_3D_mask(mask, numbers, drop=drop)
 
     mask_3D.attrs = {"standard_name": "region"}
 
     return mask_3D
 
 
-def _2D_to_3D_mask(mask: xr.DataArray, numbers, *, drop: bool) -> xr.DataArray:
-    # TODO: unify with _3D_to_3D_mask
+def _mask_3D_frac_approx_block(
+    lon,
+    lat,
+    *,
+    polygons,
+    numbers,
+    wrap_lon,
+    edgepoints,
+    d_lon,
+    d_lat,
+    n=10,
+    frac_dtype=np.dtype("float64"),
+    lon_min=None,
+    as_sparse=False,
+):
+    """fractional mask for (a chunk of) 1D coords with spacing d_lon and d_lat
 
-    isnan = np.isnan(mask.values)
+    Cells that are not crossed by the boundary of a region are either fully inside or
+    outside, which is determined by the mask of the cell centers. Only the cells on the
+    boundary are sampled (with n x n points), unless there are too many of them.
+    """
 
-    if drop:
-        numbers = np.unique(mask.values[~isnan])
-        numbers = numbers.astype(int)
+    # the bounds must be monotonic, unwrap lon (e.g. 0..178, -180..-2 -> 0..358)
+    lon_unwrapped = np.unwrap(lon, period=360)
+    is_unwrapped = not np.array_equal(lon, lon_unwrapped)
 
-    # if no regions are found return a `0 x lat x lon` mask
-    if len(numbers) == 0:
-        mask_3D = mask.expand_dims("region", axis=0).sel(region=slice(0, 0))
-        mask_3D = mask_3D.assign_coords(region=("region", numbers))
+    lon_bounds = np.append(lon_unwrapped - d_lon / 2, lon_unwrapped[-1] + d_lon / 2)
+    lat_bounds = np.append(lat - d_lat / 2, lat[-1] + d_lat / 2)
 
-        warnings.warn(
-            "No gridpoint belongs to any region. Returning an empty mask"
-            f" with shape {mask.shape}",
-            UserWarning,
-            stacklevel=3,
+    # the regions are shifted by ±360° instead of wrapping the grid
+    shifts = (-360, 0, 360) if edgepoints or is_unwrapped else (0,)
+
+    region, row, col = _boundary_cells_all(
+        polygons, lon_bounds, lat_bounds, shifts=shifts
+    )
+
+    kwargs = {"wrap_lon": wrap_lon, "edgepoints": edgepoints}
+
+    if _use_sampled_grid(region.size, len(polygons), lon.size * lat.size):
+        return _mask_3D_frac_approx_sampled(
+            lon,
+            lat,
+            polygons=polygons,
+            numbers=numbers,
+            d_lon=d_lon,
+            d_lat=d_lat,
+            n=n,
+            dtype=frac_dtype,
+            lon_min=lon_min,
+            as_sparse=as_sparse,
+            **kwargs,
         )
 
-        return mask_3D
+    # the edgepoints must be determined on the whole grid
+    if lon_min is None and edgepoints:
+        lon_min = _sampled_lon_min(lon, d_lon, wrap_lon, n)
 
-    lst_msk = [(mask == num) for num in numbers]
-    mask_3D = xr.concat(lst_msk, dim="region", compat="override", coords="minimal")
-    mask_3D = mask_3D.assign_coords(region=("region", numbers))
+    center_mask = _mask_numpy(
+        polygons,
+        numbers,
+        lon,
+        lat,
+        as_3D=True,
+        as_sparse=as_sparse,
+        lon_min=lon_min,
+        **kwargs,
+    )
 
-    if np.all(isnan):
-        warnings.warn(
-            "No gridpoint belongs to any region. Returning an all-False mask.",
-            UserWarning,
-            stacklevel=3,
+    frac = _frac_approx_boundary_cells(
+        lon,
+        lat,
+        region,
+        row,
+        col,
+        polygons=polygons,
+        numbers=numbers,
+        d_lon=d_lon,
+        d_lat=d_lat,
+        n=n,
+        lon_min=lon_min,
+        **kwargs,
+    )
+
+    mask = _merge_boundary_frac(center_mask, region, row, col, frac, as_sparse)
+
+    return _frac_to_dtype(mask, frac_dtype)
+
+
+def _parse_frac_dtype(dtype) -> np.dtype:
+
+    dtype = np.dtype(dtype)
+
+    if dtype not in (np.float64, np.float32, np.uint8):
+        msg = f"'dtype' must be one of 'float64', 'float32', and 'uint8', got '{dtype}'"
+        raise ValueError(msg)
+
+    return dtype
+
+
+def _frac_to_dtype(mask, dtype):
+    """convert the fractional mask to dtype - fractions are converted to percent for
+    integer dtypes"""
+
+    if mask.dtype == dtype:
+        return mask
+
+    if not np.issubdtype(dtype, np.integer):
+        return mask.astype(dtype)
+
+    if not _is_sparse(mask):
+        return np.round(mask * 100).astype(dtype)
+
+    import sparse
+
+    data = np.round(mask.data * 100).astype(dtype)
+    nonzero = data > 0
+
+    return sparse.COO(
+        mask.coords[:, nonzero],
+        data[nonzero],
+        shape=mask.shape,
+        has_duplicates=False,
+        sorted=True,
+        fill_value=dtype.type(0),
+    )
+
+
+def _use_sampled_grid(n_boundary_cells, n_polygons, n_cells) -> bool:
+    """whether to sample the full grid instead of only the boundary cells
+
+    Sampling a boundary cell (with shapely) is roughly 4 times more expensive than
+    sampling a cell of the full grid (rasterizing 32 regions at once).
+    """
+
+    cost_full = np.ceil(n_polygons / 32) * n_cells
+    cost_boundary = n_boundary_cells * 4
+
+    return cost_boundary > cost_full
+
+
+def _mask_3D_frac_approx_sampled(
+    lon,
+    lat,
+    *,
+    polygons,
+    numbers,
+    wrap_lon,
+    edgepoints,
+    d_lon,
+    d_lat,
+    n,
+    dtype,
+    lon_min=None,
+    as_sparse=False,
+):
+    """fractional mask from sampling the full grid with n x n points per cell
+
+    The grid is sampled in latitude bands (see ``set_options(frac_approx_band_size)``)
+    such that the memory is bounded by the size of the band. The bands are processed
+    by ``mask_num_threads`` threads.
+    """
+
+    from regionmask.core.options import OPTIONS
+
+    band_size = OPTIONS["frac_approx_band_size"]
+    if band_size is None:
+        band_size = _frac_approx_band_size(len(polygons), lon.size, n)
+
+    kwargs = {
+        "polygons": polygons,
+        "numbers": numbers,
+        "wrap_lon": wrap_lon,
+        "edgepoints": edgepoints,
+        "d_lon": d_lon,
+        "d_lat": d_lat,
+        "n": n,
+        "as_sparse": as_sparse,
+    }
+
+    if lat.size <= band_size:
+        mask = _mask_3D_frac_approx_band(lon, lat, lon_min=lon_min, **kwargs)
+        return _frac_to_dtype(mask, dtype)
+
+    # the edgepoints must be determined on the whole grid
+    if lon_min is None and edgepoints:
+        lon_min = _sampled_lon_min(lon, d_lon, wrap_lon, n)
+
+    bands = [lat[i : i + band_size] for i in range(0, lat.size, band_size)]
+
+    func = functools.partial(_mask_3D_frac_approx_band, lon, lon_min=lon_min, **kwargs)
+
+    num_threads = min(OPTIONS["mask_num_threads"], len(bands))
+
+    with ThreadPoolExecutor(num_threads) as executor, warnings.catch_warnings():
+        # rasterio sporadically warns when rasterizing in several threads (the
+        # results are correct)
+        warnings.filterwarnings("ignore", "Dataset has no geotransform")
+
+        masks = executor.map(func, bands)
+
+        if as_sparse:
+            import sparse
+
+            masks = [_frac_to_dtype(mask, dtype) for mask in masks]
+            return sparse.concatenate(masks, axis=1)
+
+        mask = np.empty((len(polygons), lat.size, lon.size), dtype=dtype)
+        for i, mask_band in zip(range(0, lat.size, band_size), masks, strict=True):
+            mask[:, i : i + band_size] = _frac_to_dtype(mask_band, dtype)
+
+    return mask
+
+
+def _frac_approx_band_size(n_polygons, n_lon, n) -> int:
+    """number of rows such that the sampled mask of a band requires about 64 MB"""
+
+    bytes_per_row = n_polygons * n * n * n_lon
+
+    return max(1, 2**26 // bytes_per_row)
+
+
+def _sampled_lon_min(lon, d_lon, wrap_lon, n) -> float:
+    """minimum of the sampled (and wrapped) longitude"""
+
+    lon_sampled = _sample_coords(lon, d_coord=d_lon, n=n)
+
+    if wrap_lon:
+        lon_sampled = _wrapAngle(lon_sampled, wrap_lon)
+
+    return np.nanmin(lon_sampled)
+
+
+def _mask_3D_frac_approx_band(
+    lon,
+    lat,
+    *,
+    polygons,
+    numbers,
+    wrap_lon,
+    edgepoints,
+    d_lon,
+    d_lat,
+    n,
+    lon_min=None,
+    as_sparse=False,
+):
+    """fractional mask from sampling a band of the grid with n x n points per cell"""
+
+    # directly creating 3D masks seems to be faster in general (strangely due to the
+    # memory layout of the reshaped mask)
+    as_3D = True
+
+    lon_sampled = _sample_coords(lon, d_coord=d_lon, n=n)
+    lat_sampled = _sample_coords(lat, d_coord=d_lat, n=n)
+
+    mask_sampled = _mask_numpy(
+        polygons,
+        numbers,
+        lon_sampled,
+        lat_sampled,
+        wrap_lon=wrap_lon,
+        edgepoints=edgepoints,
+        as_3D=as_3D,
+        as_sparse=as_sparse,
+        lon_min=lon_min,
+    )
+
+    if as_sparse:
+        return _frac_from_sparse_samples(
+            mask_sampled, lat_sampled, (lat.size, lon.size), n, edgepoints=edgepoints
         )
 
-    return mask_3D
+    mask_reshaped = mask_sampled.reshape(-1, lat.size, n, lon.size, n)
+    mask = mask_reshaped.mean(axis=(2, 4))
 
+    # maybe fix edges as 90°N/ S
+    sel = np.abs(lat_sampled) <= 90
+    if edgepoints and sel.any():
 
-def _3D_to_3D_mask(mask_3D: xr.DataArray, numbers, *, drop: bool) -> xr.DataArray:
-    # TODO: unify with _2D_to_3D_mask
+        e1 = mask_reshaped[:, 0].mean(axis=(1, 3), where=sel[:n].reshape(-1, 1, 1))
+        e2 = mask_reshaped[:, -1].mean(axis=(1, 3), where=sel[-n:].reshape(-1, 1, 1))
+
+        mask[:, 0] = e1
+        mask[:, -1] = e2
 
-    any_masked = mask_3D.any(mask_3D.dims[1:])
+    return mask
+
+
+def _frac_approx_boundary_cells(
+    lon,
+    lat,
+    region,
+    row,
+    col,
+    *,
+    polygons,
+    numbers,
+    wrap_lon,
+    edgepoints,
+    d_lon,
+    d_lat,
+    n,
+    lon_min,
+):
+    """fraction of n x n sample points per cell within the region (for the given cells)
+
+    The samples are at the same location as for ``_mask_3D_frac_approx_sampled``.
+    """
+
+    offset = (np.arange(n) + 0.5) / n - 0.5
+
+    frac = np.zeros(region.size)
+
+    # region is sorted
+    regions, start = np.unique(region, return_index=True)
+    stop = np.append(start[1:], region.size)
+
+    for i, sel in zip(regions, map(slice, start, stop), strict=True):
+
+        LON = lon[col[sel], np.newaxis, np.newaxis] + offset * d_lon
+        LAT = lat[row[sel], np.newaxis, np.newaxis] + offset[:, np.newaxis] * d_lat
+        LON, LAT = np.broadcast_arrays(LON, LAT)
+
+        mask = _mask_numpy(
+            polygons[i : i + 1],
+            numbers[i : i + 1],
+            LON.ravel(),
+            LAT.ravel(),
+            method="shapely",
+            wrap_lon=wrap_lon,
+            edgepoints=edgepoints,
+            as_3D=True,
+            is_unstructured=True,
+            lon_min=lon_min,
+        )
+        mask = mask.reshape(LON.shape)
+
+        # maybe fix edges as 90°N/ S - only use samples within -90..90
+        if edgepoints:
+            valid = np.abs(LAT) <= 90
+            frac[sel] = (mask & valid).sum(axis=(1, 2)) / valid.sum(axis=(1, 2))
+        else:
+            frac[sel] = mask.mean(axis=(1, 2))
+
+    return frac
+
+
+def _frac_from_sparse_samples(mask_sampled, lat_sampled, shape, n, *, edgepoints):
+    """aggregate a sparse mask of n x n samples per gridcell to a fractional mask"""
+
+    import sparse
+
+    region, row, col = mask_sampled.coords
+    row_cell, col_cell = row // n, col // n
+
+    # number of samples per grid cell
+    n_samples = np.full(shape[0], n * n, dtype=float)
+
+    # maybe fix edges as 90°N/ S - only use samples within -90..90
+    sel = np.abs(lat_sampled) <= 90
+    if edgepoints and sel.any():
+        n_samples[0] = n * sel[:n].sum()
+        n_samples[-1] = n * sel[-n:].sum()
+
+        valid = sel[row]
+        region, row_cell, col_cell = region[valid], row_cell[valid], col_cell[valid]
+
+    n_cells = shape[0] * shape[1]
+    key = region * n_cells + row_cell * shape[1] + col_cell
+    key, counts = np.unique(key, return_counts=True)
+
+    region, cell = np.divmod(key, n_cells)
+    row_cell, col_cell = np.divmod(cell, shape[1])
+
+    return sparse.COO(
+        np.vstack((region, row_cell, col_cell)),
+        counts / n_samples[row_cell],
+        shape=(mask_sampled.shape[0],) + shape,
+        has_duplicates=False,
+        sorted=True,
+        fill_value=0.0,
+    )
+
+
+def _mask_3D_frac(
+    polygons,
+    numbers,
+    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+    lat: np.typing.ArrayLike | xr.DataArray | None = None,
+    *,
+    drop=True,
+    wrap_lon: None | bool | Literal[180, 360] = None,
+    overlap: bool | None = None,
+    use_cf: bool | None = None,
+    output: Literal["dense", "sparse"] = "dense",
+    lon_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+    lat_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+) -> xr.DataArray:
+
+    as_sparse = _parse_output(output)
+
+    lon_, lat_ = _get_coords(lon_or_obj, lat, "lon", "lat", use_cf)
+
+    lon_bounds, lat_bounds = _get_bounds(lon_or_obj, lon_, lat_, lon_bounds, lat_bounds)
+
+    chunks = _get_chunks(lon_or_obj, lon_, lat_)
+    if chunks and as_sparse:
+        raise ValueError("``output='sparse'`` is not supported for chunked coordinates")
+
+    if lon_bounds is not None and not _is_rectilinear(lon_, lat_, lon_bounds):
+        mask = _mask_3D_frac_cells(
+            polygons,
+            numbers,
+            lon_,
+            lat_,
+            lon_bounds,
+            lat_bounds,
+            chunks,
+            wrap_lon=wrap_lon,
+            as_sparse=as_sparse,
+        )
+    else:
+        mask = _mask_3D_frac_rectilinear(
+            polygons,
+            numbers,
+            lon_,
+            lat_,
+            lon_bounds,
+            lat_bounds,
+            chunks,
+            wrap_lon=wrap_lon,
+            as_sparse=as_sparse,
+        )
+
+    mask = _mask_to_dataarray(mask, lon_, lat_)
+
+    mask_3D = _3D_to_3D_mask(mask, numbers, drop=drop)
+
+    mask_3D.attrs = {"standard_name": "region"}
+
+    return mask_3D
+
+
+def _get_bounds(lon_or_obj, lon, lat, lon_bounds, lat_bounds):
+    """get the cell bounds - passed explicitly, via the CF ``bounds`` attribute, or the
+    face_node_connectivity of a UGRID mesh"""
+
+    if (lon_bounds is None) != (lat_bounds is None):
+        raise ValueError("Either pass both 'lon_bounds' and 'lat_bounds' or none")
+
+    if lon_bounds is None and isinstance(lon_or_obj, xr.Dataset):
+
+        lon_name = lon.attrs.get("bounds")
+        lat_name = lat.attrs.get("bounds")
+
+        if lon_name in lon_or_obj.variables and lat_name in lon_or_obj.variables:
+            lon_bounds = lon_or_obj[lon_name]
+            lat_bounds = lon_or_obj[lat_name]
+
+    # UGRID: the faces of the mesh are given by their nodes
+    mesh = _get_mesh(lon_or_obj)
+    if lon_bounds is None and mesh is not None:
+        lon_v, lat_v, face_dim = _get_face_vertices(lon_or_obj, mesh)
+
+        # only if the faces are masked (and not lon and lat found on the Dataset)
+        if getattr(lon, "dims", None) == (face_dim,):
+            lon_bounds, lat_bounds = lon_v, lat_v
+
+    return lon_bounds, lat_bounds
+
+
+def _is_rectilinear(lon, lat, lon_bounds) -> bool:
+    """whether lon and lat describe a regular grid (and lon_bounds has shape n x 2)"""
+
+    if _is_unstructured(lon, lat) or np.ndim(lon) != 1 or np.ndim(lat) != 1:
+        return False
+
+    if np.shape(lon_bounds) != (np.size(lon), 2):
+        raise InvalidCoordsError(
+            "The bounds of 1D 'lon' and 'lat' coordinates must have shape (n, 2)"
+        )
+
+    return True
+
+
+def _is_unstructured(lon, lat) -> bool:
+    """1D coords of an unstructured grid share a dimension that is not their name"""
+
+    if isinstance(lon, xr.DataArray) and isinstance(lat, xr.DataArray):
+        if lon.ndim == 1 and lat.ndim == 1:
+            return lon.name != lon.dims[0] and lat.name != lat.dims[0]
+
+    return False
+
+
+def _contiguous_bounds(bounds) -> np.ndarray | None:
+    """convert (n, 2) bounds to n + 1 monotonic bounds, None if they are not contiguous"""
+
+    bounds = np.asarray(bounds, dtype=float)
+
+    if not np.allclose(bounds[1:, 0], bounds[:-1, 1]):
+        return None
+
+    bounds = np.append(bounds[:, 0], bounds[-1, 1])
+
+    return bounds if _is_monotonic(bounds) else None
+
+
+def _mask_3D_frac_rectilinear(
+    polygons,
+    numbers,
+    lon,
+    lat,
+    lon_bounds,
+    lat_bounds,
+    chunks,
+    *,
+    wrap_lon,
+    as_sparse,
+):
+    """exact fractional mask for regular grids, given by 1D coords and (n, 2) bounds"""
+
+    if not _is_monotonic(lon, lat):
+        raise InvalidCoordsError("'lon' and 'lat' must be 1D and monotonic.")
+
+    lon_arr = np.asarray(lon, dtype=float)
+    lat_arr = np.asarray(lat, dtype=float)
+
+    if np.nanmin(lat_arr) < -90 or np.nanmax(lat_arr) > 90:
+        raise InvalidCoordsError("lat must be between -90 and +90")
+
+    if lon_bounds is None:
+        lon_bounds = _infer_bounds(lon_arr)
+        lat_bounds = _infer_bounds(lat_arr)
+    else:
+        lon_bounds_, lat_bounds_ = lon_bounds, lat_bounds
+        lon_bounds = _contiguous_bounds(lon_bounds_)
+        lat_bounds = _contiguous_bounds(lat_bounds_)
+
+        # non-contiguous bounds - treat as individual cells
+        if lon_bounds is None or lat_bounds is None:
+            LON_V, LAT_V = _rectilinear_vertices(lon_bounds_, lat_bounds_)
+            return _mask_3D_frac_cells_numpy(
+                LON_V,
+                LAT_V,
+                polygons=polygons,
+                edgepoints=wrap_lon is not False,
+                as_sparse=as_sparse,
+            )
+
+    lat_bounds = np.clip(lat_bounds, -90, 90)
+
+    # wrap all chunks consistently
+    wrap_lon_ = _resolve_wrap_lon(wrap_lon, polygons, lon=lon_arr)
+    lon_min = np.nanmin(_wrapAngle(lon_arr, wrap_lon_) if wrap_lon_ else lon_arr)
+
+    kwargs = {
+        "polygons": polygons,
+        "numbers": numbers,
+        "wrap_lon": wrap_lon_,
+        "edgepoints": wrap_lon is not False,
+        "lon_min": lon_min,
+    }
+
+    if chunks:
+        import dask.array as da
+
+        # pass the lower and upper bounds chunked like the coords
+        args = []
+        for coord, bounds, ind in ((lon, lon_bounds, 1), (lat, lat_bounds, 0)):
+            lower = coord.copy(data=bounds[:-1])
+            upper = coord.copy(data=bounds[1:])
+            for arr in (coord, lower, upper):
+                args += [_coord_to_dask(arr, chunks), (ind,)]
+
+        return da.blockwise(
+            _mask_3D_frac_block,
+            (-1, 0, 1),
+            *args,
+            new_axes={-1: len(numbers)},
+            dtype=float,
+            meta=np.empty((0, 0, 0), dtype=float),
+            concatenate=True,
+            **kwargs,
+        )
+
+    return _mask_3D_frac_numpy(
+        lon_arr, lat_arr, lon_bounds, lat_bounds, as_sparse=as_sparse, **kwargs
+    )
+
+
+def _rectilinear_vertices(lon_bounds, lat_bounds):
+    """vertices (counterclockwise) of the cells of a regular grid with (n, 2) bounds"""
+
+    lon_bounds = np.asarray(lon_bounds, dtype=float)
+    lat_bounds = np.asarray(lat_bounds, dtype=float)
+
+    lon_v = lon_bounds[:, [0, 1, 1, 0]]
+    lat_v = lat_bounds[:, [0, 0, 1, 1]]
+
+    LON_V = np.broadcast_to(lon_v, (lat_v.shape[0],) + lon_v.shape)
+    LAT_V = np.broadcast_to(lat_v[:, np.newaxis], (lat_v.shape[0],) + lon_v.shape)
+
+    return LON_V, LAT_V
+
+
+def _mask_3D_frac_cells(
+    polygons,
+    numbers,
+    lon,
+    lat,
+    lon_bounds,
+    lat_bounds,
+    chunks,
+    *,
+    wrap_lon,
+    as_sparse,
+):
+    """exact fractional mask for grid cells given by their vertices
+
+    ``lon_bounds`` and ``lat_bounds`` must have the shape of the coords with an
+    additional last dimension for the vertices (e.g. the CF ``lon_bnds`` of a
+    curvilinear grid with shape ``(y, x, 4)``).
+    """
+
+    shape = np.shape(lon)
+
+    for name, bounds in (("lon_bounds", lon_bounds), ("lat_bounds", lat_bounds)):
+        if np.shape(bounds)[:-1] != shape or np.shape(bounds)[-1] < 3:
+            msg = (
+                f"'{name}' must have the shape of the coordinates ({shape}) with an "
+                "additional last dimension for the vertices (at least 3)"
+            )
+            raise InvalidCoordsError(msg)
+
+    if np.nanmin(lat) < -90 or np.nanmax(lat) > 90:
+        raise InvalidCoordsError("lat must be between -90 and +90")
+
+    kwargs = {"polygons": polygons, "edgepoints": wrap_lon is not False}
+
+    if not chunks:
+        lon_bounds = np.asarray(lon_bounds, dtype=float)
+        lat_bounds = np.asarray(lat_bounds, dtype=float)
+        return _mask_3D_frac_cells_numpy(
+            lon_bounds, lat_bounds, as_sparse=as_sparse, **kwargs
+        )
+
+    import dask.array as da
+
+    # the vertex dimension is not chunked
+    ind = tuple(range(len(shape)))
+
+    args = []
+    for coord, bounds in ((lon, lon_bounds), (lat, lat_bounds)):
+        data = bounds.data if isinstance(bounds, xr.DataArray) else bounds
+        bounds = xr.DataArray(data, dims=coord.dims + ("__vertex__",))
+        args += [_coord_to_dask(bounds, chunks), ind + (len(shape),)]
+
+    return da.blockwise(
+        _mask_3D_frac_cells_numpy,
+        (-1,) + ind,
+        *args,
+        new_axes={-1: len(numbers)},
+        dtype=float,
+        meta=np.empty((0,) * (len(shape) + 1), dtype=float),
+        concatenate=True,
+        **kwargs,
+    )
+
+
+def _mask_3D_frac_cells_numpy(
+    lon_bounds, lat_bounds, *, polygons, edgepoints, as_sparse=False
+):
+    """exact fractional mask for (a chunk of) cells given by their vertices"""
+
+    shape = lon_bounds.shape[:-1]
+    n_vertices = lon_bounds.shape[-1]
+
+    lon_v = lon_bounds.reshape(-1, n_vertices)
+    lat_v = lat_bounds.reshape(-1, n_vertices)
+
+    # cells with fewer vertices are padded with NaN
+    lon_v, lat_v = _fill_vertices(lon_v, lat_v)
+
+    if edgepoints:
+        # make the longitude of the vertices continuous (for cells across the
+        # dateline and the poles) - the regions are shifted by ±360° instead
+        lon_v, lat_v = _continuous_vertices(lon_v, lat_v)
+
+    shifts = (-360, 0, 360) if edgepoints else (0,)
+
+    region, cell, frac = _frac_cells(polygons, lon_v, lat_v, shifts=shifts)
+
+    out_shape = (len(polygons),) + shape
+
+    if not as_sparse:
+        mask = np.zeros((len(polygons), lon_v.shape[0]))
+        mask[region, cell] = frac
+        return mask.reshape(out_shape)
+
+    import sparse
+
+    nonzero = frac > 0
+    coords = np.vstack(
+        (region[nonzero],) + np.unravel_index(cell[nonzero], shape), dtype=int
+    )
+
+    return sparse.COO(
+        coords,
+        frac[nonzero],
+        shape=out_shape,
+        has_duplicates=False,
+        sorted=True,
+        fill_value=0.0,
+    )
+
+
+def _frac_cells(polygons, lon_v, lat_v, *, shifts=(0,), chunk_size=2**16):
+    """exact area fraction of the cells (given by their vertices) within the regions
+
+    The regions are subdivided into pieces with few vertices (see ``_subdivide``) such
+    that the intersection with a cell is cheap. Candidate cells are found by looking up
+    their center in a coarse grid over the bounds of the pieces (enlarged by the typical
+    size of the cells), and only these cells are converted to polygons. Candidate
+    (piece, cell) pairs are then found with an STRtree over the pieces. Cells that are
+    fully within a piece are not intersected. The cells are processed in chunks using
+    ``mask_num_threads`` threads. Returns the region and cell index and the fraction,
+    sorted by region and cell.
+    """
+
+    from regionmask.core.options import OPTIONS
+
+    n_polygons = len(polygons)
+    n_cells = lon_v.shape[0]
+
+    shifted = np.array(
+        [
+            shapely.transform(polygon, lambda x: x + [shift, 0])
+            for shift in shifts
+            for polygon in polygons
+        ],
+        dtype=object,
+    )
+
+    pieces, owner = _subdivide(shifted)
+    shapely.prepare(pieces)
+
+    tree = shapely.STRtree(pieces)
+
+    # the bounds of the pieces enlarged by the typical half size of the cells
+    _, _, half_x, half_y = _cell_extents(lon_v, lat_v)
+    radius = 2 * np.nan_to_num(np.nanmedian(half_x)), 2 * np.nan_to_num(
+        np.nanmedian(half_y)
+    )
+    bounds = shapely.bounds(pieces) + [-radius[0], -radius[1], radius[0], radius[1]]
+    grid, shape, cell_start, _ = _bounds_grid(bounds)
+
+    func = functools.partial(
+        _frac_cells_chunk,
+        lon_v,
+        lat_v,
+        pieces,
+        tree,
+        bounds_grid=(grid, shape, cell_start),
+        radius=radius,
+        chunk_size=chunk_size,
+    )
+    starts = range(0, n_cells, chunk_size)
+    num_threads = max(1, min(OPTIONS["mask_num_threads"], len(starts)))
+
+    regions, cells, areas, cell_areas = [], [], [], []
+    with ThreadPoolExecutor(num_threads) as executor:
+        for c, p, area, cell_area in executor.map(func, starts):
+            regions.append(owner[p] % n_polygons)
+            cells.append(c)
+            areas.append(area)
+            cell_areas.append(cell_area)
+
+    if not regions:
+        empty = np.array([], dtype=int)
+        return empty, empty, np.array([], dtype=float)
+
+    # sum the areas of the pieces and the shifted regions
+    key = np.concatenate(regions) * n_cells + np.concatenate(cells)
+    key, index, inverse = np.unique(key, return_index=True, return_inverse=True)
+    area = np.bincount(inverse, weights=np.concatenate(areas))
+    cell_area = np.concatenate(cell_areas)[index]
+
+    region, cell = np.divmod(key, n_cells)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(cell_area > 0, area / cell_area, 0.0)
+
+    return region, cell, np.clip(frac, 0, 1)
+
+
+def _cell_extents(lon_v, lat_v):
+    """center and half size of the bounding box of the cells"""
+
+    with warnings.catch_warnings():
+        # cells without vertices
+        warnings.simplefilter("ignore", RuntimeWarning)
+        x_min, x_max = np.nanmin(lon_v, axis=1), np.nanmax(lon_v, axis=1)
+        y_min, y_max = np.nanmin(lat_v, axis=1), np.nanmax(lat_v, axis=1)
+
+    return (
+        (x_min + x_max) / 2,
+        (y_min + y_max) / 2,
+        (x_max - x_min) / 2,
+        (y_max - y_min) / 2,
+    )
+
+
+def _frac_cells_chunk(
+    lon_v, lat_v, pieces, tree, start, *, bounds_grid, radius, chunk_size
+):
+    """intersection area of the candidate (cell, piece) pairs for a chunk of cells
+
+    Returns the cell and piece index, the area of the intersection and of the cell.
+    """
+
+    sel = slice(start, start + chunk_size)
+    lon_v, lat_v = lon_v[sel], lat_v[sel]
+
+    # candidate cells: the center of small cells is in a grid cell of ``bounds_grid``
+    # (the enlarged bounds of the pieces), large cells (e.g. around the poles) are
+    # always candidates
+    x, y, half_x, half_y = _cell_extents(lon_v, lat_v)
+    is_small = (half_x <= radius[0]) & (half_y <= radius[1])
+    is_candidate = ~is_small & np.isfinite(x) & np.isfinite(y)
+
+    (x_min, y_min, dx, dy), (nx, ny), cell_start = bounds_grid
+    ix = np.floor((x - x_min) / dx)
+    iy = np.floor((y - y_min) / dy)
+    # include the upper edge of the grid
+    within = is_small & (ix >= 0) & (ix <= nx) & (iy >= 0) & (iy <= ny)
+
+    k = np.minimum(iy[within], ny - 1) * nx + np.minimum(ix[within], nx - 1)
+    k = k.astype(np.intp)
+    is_candidate[within] = cell_start[k + 1] > cell_start[k]
+    candidates = np.flatnonzero(is_candidate)
+
+    cells = shapely.polygons(np.stack([lon_v[candidates], lat_v[candidates]], axis=-1))
+
+    # e.g. cells with vertices in the wrong order
+    invalid = ~shapely.is_valid(cells)
+    cells[invalid] = shapely.make_valid(cells[invalid])
+
+    # the predicates are evaluated with the prepared pieces - much faster than
+    # passing a predicate to query (which prepares the cells)
+    c, p = tree.query(cells)
+
+    inside = shapely.contains_properly(pieces[p], cells[c])
+    boundary = ~inside
+    boundary[boundary] = shapely.intersects(pieces[p[boundary]], cells[c[boundary]])
+
+    c, p = c[inside | boundary], p[inside | boundary]
+    boundary = boundary[inside | boundary]
+
+    cell_area = shapely.area(cells[c])
+    area = cell_area.copy()
+
+    # only intersect cells on the boundary of the pieces
+    cb, pb = c[boundary], p[boundary]
+    area[boundary] = shapely.area(shapely.intersection(pieces[pb], cells[cb]))
+
+    return candidates[c] + start, p, area, cell_area
+
+
+def _subdivide(geoms, max_vertices=64, max_depth=16):
+    """split geometries into pieces with at most ``max_vertices`` vertices
+
+    The geometries are recursively split in halves (along the longer side of their
+    bounds). Returns the pieces and the index of the geometry they belong to.
+    """
+
+    pieces, owner = [], []
+
+    geoms = np.asarray(geoms, dtype=object)
+    index = np.arange(geoms.size)
+
+    for _ in range(max_depth):
+
+        is_small = shapely.get_num_coordinates(geoms) <= max_vertices
+        pieces.append(geoms[is_small])
+        owner.append(index[is_small])
+
+        geoms, index = geoms[~is_small], index[~is_small]
+        if geoms.size == 0:
+            break
+
+        x_min, y_min, x_max, y_max = shapely.bounds(geoms).T
+        split_x = (x_max - x_min) >= (y_max - y_min)
+        x_mid = np.where(split_x, (x_min + x_max) / 2, x_max)
+        y_mid = np.where(split_x, y_max, (y_min + y_max) / 2)
+
+        # clip_by_rect is much faster than intersection (but may return invalid
+        # geometries, which are fixed below)
+        lower = [
+            shapely.clip_by_rect(*args)
+            for args in zip(geoms, x_min, y_min, x_mid, y_mid)
+        ]
+        x_mid = np.where(split_x, x_mid, x_min)
+        y_mid = np.where(split_x, y_min, y_mid)
+        upper = [
+            shapely.clip_by_rect(*args)
+            for args in zip(geoms, x_mid, y_mid, x_max, y_max)
+        ]
+
+        geoms = np.array(lower + upper, dtype=object)
+        index = np.concatenate([index, index])
+
+        # remove empty pieces and lines
+        keep = shapely.area(geoms) > 0
+        geoms, index = geoms[keep], index[keep]
+
+    pieces.append(geoms)
+    owner.append(index)
+
+    pieces = np.concatenate(pieces)
+
+    invalid = ~shapely.is_valid(pieces)
+    pieces[invalid] = shapely.make_valid(pieces[invalid])
+
+    return pieces, np.concatenate(owner)
+
+
+def _mask_3D_frac_block(
+    lon, lon_lower, lon_upper, lat, lat_lower, lat_upper, **kwargs
+) -> np.ndarray:
+
+    lon_bounds = np.append(lon_lower, lon_upper[-1])
+    lat_bounds = np.append(lat_lower, lat_upper[-1])
+
+    return _mask_3D_frac_numpy(lon, lat, lon_bounds, lat_bounds, **kwargs)
+
+
+def _mask_3D_frac_numpy(
+    lon,
+    lat,
+    lon_bounds,
+    lat_bounds,
+    *,
+    polygons,
+    numbers,
+    wrap_lon,
+    edgepoints,
+    lon_min=None,
+    as_sparse=False,
+):
+    """exact fractional mask for (a chunk of) monotonic 1D coords
+
+    Cells that are not crossed by the boundary of a region are either fully inside or
+    outside, which is determined by the mask of the cell centers. The fraction is only
+    computed for the cells on the boundary of the regions.
+    """
+
+    center_mask = _mask_numpy(
+        polygons,
+        numbers,
+        lon,
+        lat,
+        wrap_lon=wrap_lon,
+        edgepoints=edgepoints,
+        as_3D=True,
+        as_sparse=as_sparse,
+        lon_min=lon_min,
+    )
+
+    # the regions are shifted by ±360° instead of wrapping the grid
+    shifts = (-360, 0, 360) if edgepoints else (0,)
+
+    region, row, col, frac = _frac_boundary_cells(
+        polygons, lon_bounds, lat_bounds, shifts=shifts
+    )
+
+    return _merge_boundary_frac(center_mask, region, row, col, frac, as_sparse)
+
+
+def _merge_boundary_frac(center_mask, region, row, col, frac, as_sparse):
+    """replace the center mask by the fraction for cells on the boundary"""
+
+    if not as_sparse:
+        mask = center_mask.astype(float)
+        mask[region, row, col] = frac
+        return mask
+
+    import sparse
+
+    shape = center_mask.shape
+
+    key_center = np.ravel_multi_index(center_mask.coords, shape)
+    key_boundary = np.ravel_multi_index((region, row, col), shape)
+    key_center = key_center[~np.isin(key_center, key_boundary)]
+
+    nonzero = frac > 0
+    key = np.concatenate([key_center, key_boundary[nonzero]])
+    data = np.concatenate([np.ones(key_center.size), frac[nonzero]])
+
+    order = np.argsort(key)
+
+    return sparse.COO(
+        np.unravel_index(key[order], shape),
+        data[order],
+        shape=shape,
+        has_duplicates=False,
+        sorted=True,
+        fill_value=0.0,
+    )
+
+
+def _frac_boundary_cells(polygons, lon_bounds, lat_bounds, *, shifts=(0,)):
+    """exact area fraction of the grid cells crossed by the region boundaries
+
+    Returns the region, row, and column index and the fraction of each boundary cell.
+    The area is computed on the lat/ lon plane (as for ``mask_3D_frac_approx``).
+    """
+
+    d_lon = np.abs(np.diff(lon_bounds))
+    d_lat = np.abs(np.diff(lat_bounds))
+
+    n_cols = lon_bounds.size - 1
+
+    regions, cells, areas = [], [], []
+    for i, geom, row, col in _iter_boundary_cells(
+        polygons, lon_bounds, lat_bounds, shifts=shifts
+    ):
+
+        area = _intersection_areas(geom, row, col, lon_bounds, lat_bounds)
+
+        regions.append(np.full(row.size, i))
+        cells.append(row * n_cols + col)
+        areas.append(area)
+
+    if not regions:
+        empty = np.array([], dtype=int)
+        return empty, empty, empty, np.array([], dtype=float)
+
+    # sum the areas of the shifted regions
+    key = np.concatenate(regions) * (n_cols * (lat_bounds.size - 1))
+    key += np.concatenate(cells)
+    key, inverse = np.unique(key, return_inverse=True)
+    area = np.bincount(inverse, weights=np.concatenate(areas))
+
+    region, cell = np.divmod(key, n_cols * (lat_bounds.size - 1))
+    row, col = np.divmod(cell, n_cols)
+
+    cell_area = d_lat[row] * d_lon[col]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(cell_area > 0, area / cell_area, 0.0)
+
+    return region, row, col, np.clip(frac, 0, 1)
+
+
+def _boundary_cells_all(polygons, lon_bounds, lat_bounds, *, shifts=(0,)):
+    """region, row, and column index of all cells crossed by the region boundaries"""
+
+    n_cells = (lon_bounds.size - 1) * (lat_bounds.size - 1)
+    n_cols = lon_bounds.size - 1
+
+    keys = [
+        i * n_cells + row * n_cols + col
+        for i, __, row, col in _iter_boundary_cells(
+            polygons, lon_bounds, lat_bounds, shifts=shifts
+        )
+    ]
+
+    key = np.unique(np.concatenate(keys)) if keys else np.array([], dtype=int)
+
+    region, cell = np.divmod(key, n_cells)
+    row, col = np.divmod(cell, n_cols)
+
+    return region, row, col
+
+
+def _iter_boundary_cells(polygons, lon_bounds, lat_bounds, *, shifts=(0,)):
+    """yield the index, the (shifted) geometry and the cells crossed by its boundary"""
+
+    d_lon = np.abs(np.diff(lon_bounds))
+    d_lat = np.abs(np.diff(lat_bounds))
+
+    # consecutive boundary points lie in the same or in neighboring cells
+    d_min = min(d_lon.min(), d_lat[d_lat > 0].min())
+    max_segment_length = d_min / 2
+
+    lon_min, lon_max = np.min(lon_bounds), np.max(lon_bounds)
+
+    for i, polygon in enumerate(polygons):
+        for shift in shifts:
+
+            xmin, __, xmax, __ = polygon.bounds
+            if xmax + shift < lon_min or xmin + shift > lon_max:
+                continue
+
+            geom = shapely.transform(polygon, lambda x: x + [shift, 0])
+
+            row, col = _boundary_cells(geom, lon_bounds, lat_bounds, max_segment_length)
+
+            yield i, geom, row, col
+
+
+def _locate_in_bounds(bounds, values) -> np.ndarray:
+    """index of the cell containing the values, -1 or n_cells for values outside"""
+
+    n_cells = bounds.size - 1
+
+    if bounds[0] > bounds[-1]:
+        return n_cells - 1 - _locate_in_bounds(bounds[::-1], values)
+
+    idx = np.searchsorted(bounds, values, side="right") - 1
+    # values on the upper bound belong to the last cell
+    idx[values == bounds[-1]] = n_cells - 1
+
+    return idx
+
+
+def _boundary_cells(geom, lon_bounds, lat_bounds, max_segment_length):
+    """find all cells crossed by the boundary of geom"""
+
+    boundary = shapely.segmentize(shapely.boundary(geom), max_segment_length)
+    coords = shapely.get_coordinates(boundary)
+
+    col = _locate_in_bounds(lon_bounds, coords[:, 0])
+    row = _locate_in_bounds(lat_bounds, coords[:, 1])
+
+    # the segment between consecutive points can cross a corner of the neighboring
+    # cells - add them as well (pairs across rings only add a few candidates)
+    row = np.concatenate([row, row[:-1], row[1:]])
+    col = np.concatenate([col, col[1:], col[:-1]])
+
+    n_rows, n_cols = lat_bounds.size - 1, lon_bounds.size - 1
+    sel = (row >= 0) & (row < n_rows) & (col >= 0) & (col < n_cols)
+
+    cell = np.unique(row[sel] * n_cols + col[sel])
+
+    return np.divmod(cell, n_cols)
+
+
+def _intersection_areas(geom, row, col, lon_bounds, lat_bounds) -> np.ndarray:
+    """area of the intersection of geom and the cells - integrated along its edges
+
+    The area of a polygon clipped to a cell equals the (signed) integral of its edges
+    clipped to the vertical strip of the cell, where the height of each edge is clipped
+    to the latitude range of the cell. This is exact for planar polygons and avoids
+    intersecting each cell with the polygon.
+    """
+
+    if row.size == 0:
+        return np.zeros(row.size)
+
+    lon_lower = np.minimum(lon_bounds[:-1], lon_bounds[1:])[col]
+    lon_upper = np.maximum(lon_bounds[:-1], lon_bounds[1:])[col]
+    lat_lower = np.minimum(lat_bounds[:-1], lat_bounds[1:])[row]
+    lat_upper = np.maximum(lat_bounds[:-1], lat_bounds[1:])[row]
+
+    x0, y0, x1, y1 = _oriented_polygon_edges(geom)
+
+    # vertical edges do not contribute
+    sel = x0 != x1
+    x0, y0, x1, y1 = x0[sel], y0[sel], x1[sel], y1[sel]
+    x_min, x_max = np.minimum(x0, x1), np.maximum(x0, x1)
+
+    # group the cells by column, sorted by lon
+    __, first, inverse = np.unique(col, return_index=True, return_inverse=True)
+    rank = np.empty_like(first)
+    rank[np.argsort(lon_lower[first], kind="stable")] = np.arange(first.size)
+    rank = rank[inverse]
+
+    cell_order = np.argsort(rank, kind="stable")
+    n_cells = np.bincount(rank, minlength=first.size)
+    cell_start = np.cumsum(n_cells) - n_cells
+
+    col_lower = np.sort(lon_lower[first])
+    col_upper = np.sort(lon_upper[first])
+
+    # columns overlapping each edge
+    start = np.searchsorted(col_upper, x_min, side="right")
+    stop = np.searchsorted(col_lower, x_max, side="left")
+    n = np.maximum(stop - start, 0)
+
+    edge = np.repeat(np.arange(n.size), n)
+    column = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + start[edge]
+
+    # expand to the cells of these columns
+    n = n_cells[column]
+    pair = np.repeat(np.arange(n.size), n)
+    cell = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    cell = cell_order[cell + cell_start[column][pair]]
+    edge = edge[pair]
+
+    lower, upper = lat_lower[cell], lat_upper[cell]
+    x0, y0, x1, y1 = x0[edge], y0[edge], x1[edge], y1[edge]
+
+    # clip the edge to the strip of the cell
+    xa = np.maximum(x_min[edge], lon_lower[cell])
+    xb = np.minimum(x_max[edge], lon_upper[cell])
+    slope = (y1 - y0) / (x1 - x0)
+    ya = y0 + slope * (xa - x0)
+    yb = y0 + slope * (xb - x0)
+
+    # fraction of the clipped edge below the cell, within and above it
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_lower = np.clip((lower - ya) / (yb - ya), 0, 1)
+        s_upper = np.clip((upper - ya) / (yb - ya), 0, 1)
+
+    is_flat = ya == yb
+    is_inside = (ya > lower) & (ya < upper)
+    increasing = yb > ya
+
+    s0 = np.where(increasing, s_lower, s_upper)
+    s1 = np.where(increasing, s_upper, s_lower)
+    s0 = np.where(is_flat, 0.0, s0)
+    s1 = np.where(is_flat, 1.0 * is_inside, s1)
+    above = np.where(increasing, 1 - s_upper, s_upper)
+    above = np.where(is_flat, 1.0 * (ya >= upper), above)
+
+    # mean height of the clipped edge above the lower bound of the cell
+    height = (s1 - s0) * (ya - lower) + (yb - ya) * (s1**2 - s0**2) / 2
+    height += above * (upper - lower)
+
+    # shells are counter-clockwise - edges pointing west add area
+    area = -np.sign(x1 - x0) * (xb - xa) * height
+
+    return np.bincount(cell, weights=area, minlength=row.size)
+
+
+def _oriented_polygon_edges(polygon):
+    """edges (x0, y0, x1, y1) of a (multi)polygon - shells ccw and holes cw"""
+
+    parts = shapely.get_parts(polygon)
+    rings, part = shapely.get_rings(parts, return_index=True)
+    is_shell = np.diff(part, prepend=-1) != 0
+
+    coords, ring = shapely.get_coordinates(rings, return_index=True)
+
+    # rings are closed - consecutive coordinates of the same ring form an edge
+    is_edge = ring[1:] == ring[:-1]
+    x0, y0 = coords[:-1][is_edge].T
+    x1, y1 = coords[1:][is_edge].T
+    ring = ring[:-1][is_edge]
+
+    # orientation of the rings (shoelace formula)
+    signed_area = np.bincount(ring, weights=x0 * y1 - x1 * y0, minlength=rings.size)
+    flip = ((signed_area > 0) != is_shell)[ring]
+
+    x0, x1 = np.where(flip, x1, x0), np.where(flip, x0, x1)
+    y0, y1 = np.where(flip, y1, y0), np.where(flip, y0, y1)
+
+    return x0, y0, x1, y1
+
+
+def _mask_2D(
+    polygons,
+    numbers,
+    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+    lat: np.typing.ArrayLike | xr.DataArray | None = None,
+    *,
+    method=None,
+    wrap_lon: None | bool | Literal[180, 360] = None,
+    use_cf: bool | None = None,
+    overlap: bool | None = None,
+    crs=None,
+) -> xr.DataArray:
+
+    # NOTE: this is already checked in Regions.mask, and mask_geopandas
+    # double check here if this method is ever made public
+    # if overlap:
+    #     raise ValueError(
+    #         "Creating a 2D mask with overlapping regions yields wrong results. "
+    #         "Please use ``region.mask_3D(...)`` instead. "
+    #         "To create a 2D mask anyway, set ``overlap=False``."
+    #     )
+
+    # if as_3D is not explicitly given - set it to True
+    as_3D = overlap is None
+
+    mask = _mask(
+        polygons=polygons,
+        numbers=numbers,
+        lon_or_obj=lon_or_obj,
+        lat=lat,
+        method=method,
+        wrap_lon=wrap_lon,
+        use_cf=use_cf,
+        crs=crs,
+        as_3D=as_3D,
+    )
+
+    # only happens for (overlap == None)
+    if as_3D:
+        mask = _3D_to_2D_mask(mask, numbers)
+
+    # lazy masks are not computed here
+    if not _is_lazy(mask) and np.all(np.isnan(mask)):
+        msg = "No gridpoint belongs to any region. Returning an all-NaN mask."
+        warnings.warn(msg, UserWarning, stacklevel=3)
+
+    mask.attrs = {"standard_name": "region"}
+
+    return mask
+
+
+def _mask_3D(
+    polygons,
+    numbers,
+    lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+    lat: np.typing.ArrayLike | xr.DataArray | None = None,
+    *,
+    drop: bool = True,
+    method=None,
+    wrap_lon: None | bool | Literal[180, 360] = None,
+    overlap: bool | None = None,
+    use_cf: bool | None = None,
+    output: Literal["dense", "sparse"] = "dense",
+    crs=None,
+) -> xr.DataArray:
+
+    as_3D = overlap or overlap is None
+    as_sparse = _parse_output(output)
+
+    mask = _mask(
+        polygons=polygons,
+        numbers=numbers,
+        lon_or_obj=lon_or_obj,
+        lat=lat,
+        method=method,
+        wrap_lon=wrap_lon,
+        as_3D=as_3D,
+        as_sparse=as_sparse and as_3D,
+        use_cf=use_cf,
+        crs=crs,
+    )
+
+    if as_3D:
+        mask_3D = _3D_to_3D_mask(mask, numbers, drop=drop)
+    else:
+        mask_3D = _2D_to_3D_mask(mask, numbers, drop=drop, as_sparse=as_sparse)
+
+    is_overlapping = overlap is None and not _is_lazy(mask_3D)
+    if is_overlapping and _densify((mask_3D.sum("region") > 1).any()):
+        warnings.warn(
+            "Detected overlapping regions. As of v0.11.0 these are correctly taken into"
+            " account. Note, however, that a different mask is returned than with older"
+            " versions of regionmask. To suppress this warning, set `overlap=True` (to"
+            " restore the old, incorrect, behaviour, set `overlap=False`)."
+        )
+
+    mask_3D.attrs = {"standard_name": "region"}
+
+    return mask_3D
+
+
+def _parse_output(output) -> bool:
+    """validate ``output`` and return if a sparse mask is requested"""
+
+    if output not in ("dense", "sparse"):
+        raise ValueError("'output' must be one of 'dense' and 'sparse'")
+
+    return output == "sparse"
+
+
+def _is_sparse(obj: xr.DataArray) -> bool:
+
+    return type(obj.data).__module__.split(".")[0] == "sparse"
+
+
+def _densify(obj: xr.DataArray) -> xr.DataArray:
+    """convert a DataArray backed by a sparse array to a dense one"""
+
+    if _is_sparse(obj):
+        return obj.copy(data=obj.data.todense())
+
+    return obj
+
+
+def _2D_to_3D_mask(
+    mask: xr.DataArray, numbers, *, drop: bool, as_sparse: bool = False
+) -> xr.DataArray:
+    # TODO: unify with _3D_to_3D_mask
+
+    # for lazy masks this computes the mask, but only if required
+    isnan: np.ndarray | None = None
+    if drop or not _is_lazy(mask):
+        isnan = np.isnan(mask.values)
+
+        if drop:
+            numbers = np.unique(mask.values[~isnan])
+            numbers = numbers.astype(int)
+
+    # if no regions are found return a `0 x lat x lon` mask
+    if len(numbers) == 0:
+        mask_3D = mask.expand_dims("region", axis=0).sel(region=slice(0, 0))
+        mask_3D = mask_3D.assign_coords(region=("region", numbers))
+
+        warnings.warn(
+            "No gridpoint belongs to any region. Returning an empty mask"
+            f" with shape {mask.shape}",
+            UserWarning,
+            stacklevel=3,
+        )
+
+        if as_sparse:
+            mask_3D = mask_3D.copy(data=_2D_to_sparse(mask.values, numbers))
+
+        return mask_3D
+
+    if as_sparse:
+        data = _2D_to_sparse(mask.values, numbers)
+        mask_3D = xr.DataArray(
+            data, coords=mask.coords, dims=("region",) + mask.dims, name=mask.name
+        )
+    else:
+        lst_msk = [(mask == num) for num in numbers]
+        mask_3D = xr.concat(lst_msk, dim="region", compat="override", coords="minimal")
+    mask_3D = mask_3D.assign_coords(region=("region", numbers))
+
+    if isnan is not None and np.all(isnan):
+        warnings.warn(
+            "No gridpoint belongs to any region. Returning an all-False mask.",
+            UserWarning,
+            stacklevel=3,
+        )
+
+    return mask_3D
+
+
+def _2D_to_sparse(mask: np.ndarray, numbers):
+    """convert a 2D mask to a 3D sparse mask with one slice per number"""
+
+    import sparse
+
+    numbers = np.asarray(numbers)
+    order = np.argsort(numbers)
+
+    (cell,) = np.nonzero(~np.isnan(mask.ravel()))
+    values = mask.ravel()[cell]
+
+    # all values are in numbers
+    region = order[np.searchsorted(numbers, values, sorter=order)]
+
+    coords = np.vstack((region, *np.unravel_index(cell, mask.shape)))
+
+    return sparse.COO(
+        coords,
+        np.ones(cell.size, dtype=bool),
+        shape=(numbers.size,) + mask.shape,
+        fill_value=False,
+    )
+
+
+def _3D_to_3D_mask(mask_3D: xr.DataArray, numbers, *, drop: bool) -> xr.DataArray:
+    # TODO: unify with _2D_to_3D_mask
+
+    # for lazy masks this computes the mask, but only if required
+    any_masked: xr.DataArray | None = None
+    if drop or not _is_lazy(mask_3D):
+        any_masked = _densify(mask_3D.any(mask_3D.dims[1:])).compute()
+
+        if drop:
+            mask_3D = mask_3D.isel(region=any_masked)
+
+            numbers = np.asarray(numbers)[any_masked.values]
+
+    if len(numbers) == 0:
+
+        mask_3D = mask_3D.assign_coords(region=("region", numbers))
+
+        warnings.warn(
+            "No gridpoint belongs to any region. Returning an empty mask"
+            f" with shape {mask_3D.shape}",
+            UserWarning,
+            stacklevel=3,
+        )
+        return mask_3D
+
+    mask_3D = mask_3D.assign_coords(region=("region", numbers))
+
+    if any_masked is not None and not np.any(any_masked):
+        warnings.warn(
+            "No gridpoint belongs to any region. Returning an all-False mask.",
+            UserWarning,
+            stacklevel=3,
+        )
+
+    return mask_3D
+
+
+def _3D_to_2D_mask(mask_3D: xr.DataArray, numbers) -> xr.DataArray:
+
+    # NOTE: very similar to regionmask.core.utils.flatten_3D_mask
+
+    is_masked = mask_3D.sum("region")
+
+    if _is_lazy(is_masked):
+        # raise the error when the mask is computed
+        data = is_masked.data.map_blocks(_raise_if_overlapping, dtype=is_masked.dtype)
+        is_masked = is_masked.copy(data=data)
+    else:
+        _raise_if_overlapping(is_masked.values)
+
+    # reshape because region is the first dim
+    numbers = np.asarray(numbers)
+
+    # I transform so it broadcasts (mask_3D can actually be 2D for unstructured grids,
+    # so reshape would need some logic)
+    mask_2D = (mask_3D.T * numbers).T.sum("region")
+
+    # mask all gridpoints not belonging to any region
+
+    # older xarray versions do not have `keep_attrs` argument (needed to keep the name)
+    # mask_2D = xr.where(is_masked, mask_2D, np.nan, keep_attrs=True)
+
+    mask_2D = mask_2D.where(is_masked > 0)
+
+    return mask_2D
+
+
+def _raise_if_overlapping(is_masked: np.ndarray) -> np.ndarray:
+
+    if (is_masked > 1).any():
+        raise ValueError(
+            "Found overlapping regions for ``overlap=None``. Please create a 3D mask. "
+            "You may want to explicitly set ``overlap`` to ``True`` or ``False``."
+        )
+
+    return is_masked
+
+
+def _separable_axes(lon, lat):
+    """1D axes of 2D coords that are a meshgrid of 1D lon and lat axes
+
+    Returns ``(lon_1D, lat_1D, transpose)`` or None if the coords are not separable.
+    ``transpose`` is True if lon varies along the first dimension, i.e., if the mask of
+    the 1D axes needs to be transposed.
+    """
+
+    lon, lat = np.asarray(lon), np.asarray(lat)
+
+    if lon.ndim != 2 or lon.shape != lat.shape or lon.size == 0:
+        return None
+
+    # lat along the rows (lat, lon)
+    if (lon == lon[:1, :]).all() and (lat == lat[:, :1]).all():
+        return lon[0, :], lat[:, 0], False
+
+    # lon along the rows (lon, lat)
+    if (lon == lon[:, :1]).all() and (lat == lat[:1, :]).all():
+        return lon[:, 0], lat[0, :], True
+
+    return None
+
+
+def _determine_method(
+    lon, lat, *, is_unstructured=False
+) -> Literal["rasterize", "rasterize_flip", "rasterize_split", "scanline", "shapely"]:
+    """find method to be used -> prefers faster methods"""
+
+    if is_unstructured:
+        return "shapely"
+
+    if equally_spaced(lon, lat):
+        return "rasterize"
+
+    if _equally_spaced_on_split_lon(lon) and equally_spaced(lat):
+
+        split_point = _find_splitpoint(lon)
+        flipped_lon = np.hstack((lon[split_point:], lon[:split_point]))
+
+        if equally_spaced(flipped_lon):
+            return "rasterize_flip"
+        else:
+            return "rasterize_split"
+
+    lon, lat = np.asarray(lon), np.asarray(lat)
+    if lon.ndim == 1 and lat.ndim == 1 and np.isfinite(lon).all():
+        if np.isfinite(lat).all():
+            return "scanline"
+
+    return "shapely"
+
+
+def _is_permuted_equally_spaced(*args) -> bool:
+    """check if all args are permutations of equally spaced axes (without duplicates)"""
+
+    for arg in args:
+        arg = np.sort(arg)
+
+        if not equally_spaced(arg) or arg[0] == arg[-1]:
+            return False
+
+    return True
+
+
+def _mask_to_dataarray(mask, lon, lat) -> xr.DataArray:
+
+    if sum(isinstance(c, xr.DataArray) for c in (lon, lat)) == 1:
+        raise ValueError("Cannot handle coordinates with mixed types!")
+
+    if not isinstance(lon, xr.DataArray) or not isinstance(lat, xr.DataArray):
+        lon, lat = _numpy_coords_to_dataarray(lon, lat)
+
+    ds = lat.coords.merge(lon.coords)
+
+    dims = xr.broadcast(lat, lon)[0].dims
+
+    # unstructured grids are 1D
+    if mask.ndim - 1 == len(dims):
+        dims = ("region",) + dims
+
+    return ds.assign(mask=(dims, mask)).mask
+
+
+def _numpy_coords_to_dataarray(lon, lat) -> tuple[xr.DataArray, xr.DataArray]:
+
+    lon_name, lat_name = "lon", "lat"
+
+    dims2D = (f"{lat_name}_idx", f"{lon_name}_idx")
+
+    lon = np.asarray(lon)
+    dims = dims2D if lon.ndim == 2 else lon_name
+    lon_ = xr.Dataset(coords={lon_name: (dims, lon)})[lon_name]
+
+    lat = np.asarray(lat)
+    dims = dims2D if lat.ndim == 2 else lat_name
+    lat_ = xr.Dataset(coords={lat_name: (dims, lat)})[lat_name]
+
+    return lon_, lat_
+
+
+def _mask_edgepoints_shapely(
+    mask,
+    lon,
+    lat,
+    polygons,
+    numbers,
+    *,
+    is_unstructured=False,
+    as_3D=False,
+    lon_min=None,
+) -> np.ndarray:
+
+    shape = mask.shape
+
+    if as_3D:
+        mask = mask.reshape(mask.shape[0], -1)
+    else:
+        mask = mask.reshape(-1)
+
+    if lon_min is None:
+        lon_min = np.nanmin(lon)
+
+    # for 3D masks assume no points are assigned
+    region, cell = _edgepoints_contained(
+        lon,
+        lat,
+        polygons,
+        lon_min,
+        is_unstructured=is_unstructured,
+        mask=None if as_3D else mask,
+    )
+
+    # return if there are no unassigned gridpoints at -180°E/0°E and -90°N
+    if cell.size == 0:
+        return mask.reshape(shape)
+
+    if as_3D:
+        mask[region, cell] = True
+    else:
+        mask[cell] = np.asarray(numbers)[region]
+
+    return mask.reshape(shape)
+
+
+def _edgepoints(lon, lat, lon_min, *, is_unstructured=False):
+    """flat index and shifted coords of the gridpoints at -180°E/0°E and -90°N
+
+    For 1D coords the edge points are found from the axes (without a meshgrid). The
+    points at -180°E/0°E are wrapped to 180°E/360°E and points at -90°N are shifted to
+    -89.99...°N.
+    """
+
+    lon_edge = -180.0 if lon_min < 0 else 0.0
+
+    if not is_unstructured and lon.ndim == 1:
+        n_lon, n_lat = lon.size, lat.size
+
+        cols = np.flatnonzero(np.isclose(lon, lon_edge))
+        rows = np.flatnonzero(np.isclose(lat, -90))
+
+        cells = np.union1d(
+            (np.arange(n_lat)[:, np.newaxis] * n_lon + cols).ravel(),
+            (rows[:, np.newaxis] * n_lon + np.arange(n_lon)).ravel(),
+        ).astype(np.intp)
+
+        row, col = np.divmod(cells, n_lon)
+        LON, LAT = lon[col], lat[row]
+    else:
+        lon, lat = lon.ravel(), lat.ravel()
+        cells = np.flatnonzero(np.isclose(lon, lon_edge) | np.isclose(lat, -90))
+        LON, LAT = lon[cells], lat[cells]
+
+    LON_180W_or_0E = np.isclose(LON, lon_edge)
+    LAT_90S = np.isclose(LAT, -90)
+
+    # add a tiny offset to get a consistent edge behaviour
+    LON = LON - 1 * 10**-8
+    LAT = LAT - 1 * 10**-10
+
+    # wrap points LON_180W_or_0E: -180°E -> 180°E and 0°E -> 360°E
+    LON[LON_180W_or_0E] += 360
+    # shift points at -90°N to -89.99...°N
+    LAT[LAT_90S] = -90 + 1 * 10**-10
+
+    return cells, LON, LAT
+
+
+def _edgepoints_contained(
+    lon, lat, polygons, lon_min, *, is_unstructured=False, mask=None
+):
+    """(region, cell) pairs of the gridpoints at -180°E/0°E and -90°N in a region
+
+    If the flat 2D ``mask`` is passed only unassigned (NaN) gridpoints are considered.
+    Only regions whose bounds overlap the edge points are tested.
+    """
+
+    cells, LON, LAT = _edgepoints(lon, lat, lon_min, is_unstructured=is_unstructured)
+
+    if mask is not None:
+        sel = np.isnan(mask[cells])
+        cells, LON, LAT = cells[sel], LON[sel], LAT[sel]
+
+    empty = np.array([], dtype=np.intp)
+    if cells.size == 0 or len(polygons) == 0:
+        return empty, empty
+
+    polygons = np.array(polygons, dtype=object).reshape(-1)
+    bounds = shapely.bounds(polygons)
+
+    # prefilter the regions: bounds must overlap the points at the lon or lat edge
+    # (the split is only used for the prefilter, so it need not be exact)
+    at_lon_edge = LON > 179
+    overlaps = np.zeros(len(polygons), dtype=bool)
+    for sel in (at_lon_edge, ~at_lon_edge):
+        if sel.any():
+            overlaps |= (
+                (bounds[:, 0] <= LON[sel].max())
+                & (bounds[:, 2] >= LON[sel].min())
+                & (bounds[:, 1] <= LAT[sel].max())
+                & (bounds[:, 3] >= LAT[sel].min())
+            )
+
+    candidates = np.flatnonzero(overlaps)
+
+    if candidates.size == 0:
+        return empty, empty
+
+    region, idx = _contains_bbox(LON, LAT, polygons[candidates], bounds[candidates])
+
+    return candidates[region], cells[idx]
+
+
+def _mask_shapely(
+    lon, lat, polygons, numbers, *, fill=np.nan, is_unstructured=False, as_3D=False
+) -> np.ndarray:
+    """create a mask using shapely.contains_xy"""
+
+    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
+
+    shape = _get_shape(lon, lat, numbers, is_unstructured=is_unstructured, as_3D=as_3D)
+    out = _get_out(shape, fill, as_3D=as_3D)
+
+    a, b = _query_contains(lon, lat, polygons, is_unstructured=is_unstructured)
+
+    if as_3D:
+        out[a, b] = True
+    else:
+        out[b] = np.asarray(numbers)[a]
+
+    return out.reshape(shape)
+
+
+def _mask_shapely_pairs(lon, lat, polygons, *, is_unstructured=False):
+    """(region, cell) index pairs of all gridpoints in a region (using shapely)"""
+
+    return _query_contains(lon, lat, polygons, is_unstructured=is_unstructured)
+
+
+def _choose_shapely_strategy(
+    n_polygons, n_vertices, n_points, *, chunk_size=2**18
+) -> Literal["bbox", "index_polygons", "index_points"]:
+    """choose how to find the gridpoints within the polygons (shapely backend)
+
+    Rough cost model (in µs, calibrated for shapely 2.0):
+
+    - "bbox": loop over the polygons of each chunk, select the gridpoints in their
+      bounding box and test them with ``contains_xy`` - about 25 µs per polygon and
+      chunk, cheap for few (large) polygons
+    - "index_polygons": STRtree over the polygons, queried with the gridpoints of each
+      chunk - about 1 µs per gridpoint (mostly to create the points)
+    - "index_points": STRtree over the gridpoints of each chunk, queried with the
+      polygons - slower to build, but cheaper for complex polygons
+    """
+
+    n_chunks = max(1, -(-n_points // chunk_size))
+
+    cost = {
+        "bbox": 25 * n_polygons * n_chunks + 0.3 * n_points,
+        "index_polygons": 1.0 * n_points + 0.5 * n_vertices,
+        "index_points": 1.4 * n_points + 0.3 * n_vertices,
+    }
+
+    strategy = min(cost, key=cost.get)  # type:ignore[arg-type]
+
+    logger.debug(
+        "shapely backend: using strategy %r for %d polygons (%d vertices) and %d "
+        "gridpoints (estimated cost in µs: %s)",
+        strategy,
+        n_polygons,
+        n_vertices,
+        n_points,
+        cost,
+    )
+
+    return strategy  # type:ignore[return-value]
+
+
+def _query_contains(lon, lat, polygons, *, is_unstructured=False, chunk_size=2**18):
+    """(region, cell) index pairs of all gridpoints contained in the polygons
+
+    The gridpoints are processed in chunks of ``chunk_size`` cells. How the gridpoints
+    within the polygons are found is chosen by ``_choose_shapely_strategy``. For 1D
+    coords the gridpoints of each chunk are computed from the axes, such that the full
+    meshgrid is never created. The chunks are distributed over ``mask_num_threads``
+    threads. The pairs are sorted by region and cell.
+    """
+
+    from regionmask.core.options import OPTIONS
+
+    shape = _get_shape(lon, lat, [], is_unstructured=is_unstructured)
+    n_cells = np.prod(shape).item()
+
+    polygons = np.array(polygons, dtype=object).reshape(-1)
+
+    if n_cells == 0 or polygons.size == 0:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+
+    if is_unstructured and has_numba and n_cells >= _NUMBA_MIN_POINTS:
+        logger.debug(
+            "shapely backend: using the numba kernel for %d polygons and %d gridpoints",
+            polygons.size,
+            n_cells,
+        )
+        return _query_contains_numba(lon, lat, polygons)
+
+    shapely.prepare(polygons)
+
+    n_vertices = shapely.get_num_coordinates(polygons).sum().item()
+    strategy = _choose_shapely_strategy(
+        polygons.size, n_vertices, n_cells, chunk_size=chunk_size
+    )
+
+    if strategy == "bbox":
+        index = shapely.bounds(polygons)
+    elif strategy == "index_polygons":
+        index = shapely.STRtree(polygons)
+    else:
+        index = None
+
+    # for 1D coords the gridpoints are computed per chunk
+    is_1D = not is_unstructured and lon.ndim == 1
+    lon, lat = lon.ravel(), lat.ravel()
+
+    func = functools.partial(
+        _query_contains_chunk,
+        lon,
+        lat,
+        polygons,
+        index,
+        chunk_size=chunk_size,
+        n_cells=n_cells,
+        is_1D=is_1D,
+        strategy=strategy,
+    )
+
+    starts = range(0, n_cells, chunk_size)
+    num_threads = max(1, min(OPTIONS["mask_num_threads"], len(starts)))
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        pairs = list(executor.map(func, starts))
+
+    a = np.concatenate([p[0] for p in pairs])
+    b = np.concatenate([p[1] for p in pairs])
+
+    order = np.lexsort((b, a))
+
+    return a[order], b[order]
+
+
+def _query_contains_chunk(
+    lon, lat, polygons, index, start, *, chunk_size, n_cells, is_1D, strategy
+):
+
+    cells = np.arange(start, min(start + chunk_size, n_cells))
+
+    if is_1D:
+        row, col = np.divmod(cells, lon.size)
+        LON, LAT = lon[col], lat[row]
+    else:
+        LON, LAT = lon[cells], lat[cells]
+
+    # add a tiny offset to get a consistent edge behaviour
+    LON = LON - 1 * 10**-8
+    LAT = LAT - 1 * 10**-10
+
+    if strategy == "bbox":
+        a, idx = _contains_bbox(LON, LAT, polygons, index)
+    elif strategy == "index_polygons":
+        # candidates from the bounding boxes, test with the prepared polygons
+        idx, a = index.query(shapely.points(LON, LAT))
+        sel = shapely.contains_xy(polygons[a], LON[idx], LAT[idx])
+        a, idx = a[sel], idx[sel]
+    else:
+        tree = shapely.STRtree(shapely.points(LON, LAT))
+        a, idx = tree.query(polygons, predicate="contains")
+
+    return a, cells[idx]
+
+
+def _contains_bbox(LON, LAT, polygons, bounds):
+    """gridpoints in polygons - loop over the polygons and prefilter by their bounds"""
+
+    # sort by lon to select the candidates in the bounds of each polygon
+    order = np.argsort(LON, kind="stable")
+    LON_sorted = LON[order]
+
+    a, b = [], []
+    for i, (lon_min, lat_min, lon_max, lat_max) in enumerate(bounds):
+
+        lo = np.searchsorted(LON_sorted, lon_min, side="left")
+        hi = np.searchsorted(LON_sorted, lon_max, side="right")
+
+        idx = order[lo:hi]
+        lat_ = LAT[idx]
+        idx = idx[(lat_ >= lat_min) & (lat_ <= lat_max)]
+
+        idx = idx[shapely.contains_xy(polygons[i], LON[idx], LAT[idx])]
+
+        a.append(np.full(idx.size, i, dtype=np.intp))
+        b.append(idx)
+
+    return np.concatenate(a), np.concatenate(b)
+
+
+def _mask_scanline(
+    lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False
+) -> np.ndarray:
+    """create a mask for 1D coords using a scanline polygon fill (pure numpy)"""
+
+    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
+
+    shape = _get_shape(lon, lat, numbers, as_3D=as_3D)
+    out = _get_out(shape, fill, as_3D=as_3D)
+
+    for i, cells in _scanline_cells(lon, lat, polygons):
+        if as_3D:
+            out[i, cells] = True
+        else:
+            out[cells] = numbers[i]
+
+    return out.reshape(shape)
+
+
+def _mask_healpix(
+    lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False, healpix
+) -> np.ndarray:
+    """create a mask for HEALPix grids testing only cells close to the boundaries"""
+
+    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
+
+    shape = _get_shape(lon, lat, numbers, is_unstructured=True, as_3D=as_3D)
+    out = _get_out(shape, fill, as_3D=as_3D)
+
+    a, b = _mask_healpix_pairs(lon, lat, polygons, healpix=healpix)
+
+    if as_3D:
+        out[a, b] = True
+    else:
+        out[b] = np.asarray(numbers)[a]
+
+    return out.reshape(shape)
+
+
+def _mask_healpix_pairs(lon, lat, polygons, *, healpix):
+    """(region, cell) index pairs of all HEALPix cells in a region"""
+
+    nside, nest, cell_ids = healpix
+
+    return _healpix_pairs(lon, lat, polygons, nside, nest=nest, cell_ids=cell_ids)
+
+
+def _use_index_space(lon, lat, is_unstructured) -> bool:
+    """whether to mask a 2D curvilinear grid in its index space"""
+
+    if is_unstructured or not has_scipy or lon.ndim != 2:
+        return False
+
+    if lon.size < _INDEX_SPACE_MIN_CELLS or min(lon.shape) < 2 * _FRAME + 2:
+        return False
+
+    if not (np.isfinite(lon).all() and np.isfinite(lat).all()):
+        return False
+
+    # every point on the sphere must correspond to one lon
+    return bool(np.ptp(lon) <= 360)
+
+
+def _mask_index_space(
+    lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False
+) -> np.ndarray:
+    """create a mask for 2D curvilinear grids by rasterizing in their index space"""
+
+    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
+
+    shape = _get_shape(lon, lat, numbers, as_3D=as_3D)
+    out = _get_out(shape, fill, as_3D=as_3D)
+
+    a, b = _mask_index_space_pairs(lon, lat, polygons)
+
+    if as_3D:
+        out[a, b] = True
+    else:
+        out[b] = np.asarray(numbers)[a]
+
+    return out.reshape(shape)
+
+
+def _mask_index_space_pairs(lon, lat, polygons):
+    """(region, cell) index pairs of a 2D curvilinear grid, masked in index space
+
+    The regions are transformed to the fractional (i, j) indices of the grid (see
+    ``_index_transform``), where the grid is regular and can be masked with the
+    scanline backend. The cells close to the transformed region boundaries and the
+    outermost cells of the grid (seams and the fold of tripolar grids) are tested on
+    ``lon`` and ``lat``. Regions that cannot be transformed (e.g. crossing the fold of a
+    tripolar grid) are tested with shapely. The regions are clipped to the lon range of
+    the grid and simplified before the transformation, as it only depends on the
+    position on the sphere.
+    """
+
+    nj, ni = lon.shape
+
+    transform, period = _index_transform(lon, lat)
+
+    # center periodic coords such that _transform_polygons repeats the regions
+    offset = 0 if period is None else period / 2
+
+    def _transform(x, y):
+        i, j = transform(x, y)
+        return i - offset, j
+
+    x, y = np.arange(ni) - offset, np.arange(nj, dtype=float)
+
+    max_segment_length = _median_spacing(lon, lat) / 2
+    frame = _frame_cells(nj, ni, period)
+
+    lon_flat, lat_flat = lon.ravel(), lat.ravel()
+
+    bounds = (lon_flat.min(), -90, lon_flat.max(), 90)
+    clip = shapely.box(*bounds)
+
+    regions, cells = [], []
+    for i, polygon in enumerate(polygons):
+
+        x_min, y_min, x_max, y_max = polygon.bounds
+        clipped = polygon
+        if x_min < bounds[0] or y_min < -90 or x_max > bounds[2] or y_max > 90:
+            clipped = shapely.intersection(polygon, clip)
+
+        # the simplification is much smaller than the band of cells tested exactly
+        clipped = shapely.simplify(clipped, max_segment_length / 2)
+
+        transformed = _transform_polygons(
+            [clipped],
+            _transform,
+            max_segment_length=max_segment_length,
+            period=period,
+            max_step=_INDEX_SPACE_MAX_STEP,
+        )
+
+        if transformed is None:
+            _, cell = _query_contains(lon, lat, [polygon])
+        else:
+            _, cell = _mask_scanline_pairs(x, y, transformed)
+
+            # test the cells close to the transformed boundary, add a tiny offset to
+            # get a consistent edge behaviour
+            candidates = _band_cells(transformed[0], offset, nj, ni, period)
+            candidates = np.union1d(candidates, frame)
+
+            lon_ = lon_flat[candidates] - 1 * 10**-8
+            lat_ = lat_flat[candidates] - 1 * 10**-10
+            is_inside = shapely.contains_xy(polygon, lon_, lat_)
+
+            inside = np.zeros(nj * ni, dtype=bool)
+            inside[cell] = True
+            inside[candidates] = is_inside
+            cell = np.flatnonzero(inside)
+
+        regions.append(np.full(cell.size, i, dtype=np.intp))
+        cells.append(cell)
+
+    if not regions:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+
+    return np.concatenate(regions), np.concatenate(cells)
+
+
+def _mask_scanline_pairs(lon, lat, polygons):
+    """(region, cell) index pairs of all gridpoints in a region (using scanline)"""
+
+    regions, cells = [], []
+    for i, cell in _scanline_cells(lon, lat, polygons):
+        regions.append(np.full(cell.size, i, dtype=np.intp))
+        cells.append(np.sort(cell))
+
+    if not regions:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+
+    return np.concatenate(regions), np.concatenate(cells)
+
+
+def _scanline_cells(lon, lat, polygons):
+    """yield the region index and the (flat) index of the gridpoints in the region
+
+    For each row (latitude) the crossings of the polygon edges are computed and the
+    gridpoints between pairs of crossings are found using ``searchsorted`` on the lon
+    axis (even-odd rule). The 1D axes do not need to be equally spaced or sorted. The
+    same tiny offset as for the shapely backend is applied to get a consistent edge
+    behaviour.
+    """
+
+    lon_order = np.argsort(lon, kind="stable")
+    lat_order = np.argsort(lat, kind="stable")
+
+    # add a tiny offset to get a consistent edge behaviour
+    x = lon[lon_order] - 1 * 10**-8
+    y = lat[lat_order] - 1 * 10**-10
+
+    for i, polygon in enumerate(polygons):
+
+        row, start, stop = _scanline_polygon(x, y, polygon)
+
+        if row.size == 0:
+            continue
+
+        # expand the intervals to the gridpoints
+        n = stop - start
+        row = np.repeat(row, n)
+        col = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + np.repeat(start, n)
+
+        yield i, lat_order[row] * lon.size + lon_order[col]
+
+
+def _scanline_polygon(x, y, polygon):
+    """rows and column intervals [start, stop) of the gridpoints within a polygon
+
+    ``x`` and ``y`` must be sorted.
+    """
+
+    x0, y0, x1, y1 = _polygon_edges(polygon)
+
+    # rows crossed by each edge (half-open - every row crosses a ring an even number of
+    # times), horizontal edges do not cross any row
+    first = np.searchsorted(y, np.minimum(y0, y1), side="left")
+    last = np.searchsorted(y, np.maximum(y0, y1), side="left")
+    n = last - first
+
+    edge = np.repeat(np.arange(n.size), n)
+    row = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + first[edge]
+
+    x0, y0, x1, y1 = x0[edge], y0[edge], x1[edge], y1[edge]
+    x_cross = x0 + (y[row] - y0) * (x1 - x0) / (y1 - y0)
+
+    # sort the crossings by row and lon; pair them (even-odd rule)
+    order = np.lexsort((x_cross, row))
+    row, x_cross = row[order], x_cross[order]
+
+    row = row[::2]
+    start = np.searchsorted(x, x_cross[::2], side="right")
+    stop = np.searchsorted(x, x_cross[1::2], side="left")
+
+    sel = stop > start
+
+    return row[sel], start[sel], stop[sel]
+
+
+def _polygon_edges(polygon):
+    """start and end coordinates (x0, y0, x1, y1) of all edges of a (multi)polygon"""
+
+    rings = shapely.get_rings(shapely.get_parts(polygon))
+    coords, ring = shapely.get_coordinates(rings, return_index=True)
+
+    # rings are closed - consecutive coordinates of the same ring form an edge
+    is_edge = ring[1:] == ring[:-1]
+    x0, y0 = coords[:-1][is_edge].T
+    x1, y1 = coords[1:][is_edge].T
+
+    return x0, y0, x1, y1
+
+
+# minimum number of gridpoints of an unstructured grid to use the numba kernel (it
+# needs to be compiled on first use)
+_NUMBA_MIN_POINTS = 10**6
+
+
+def _query_contains_numba(lon, lat, polygons):
+    """(region, cell) index pairs of all gridpoints contained in the polygons
+
+    Uses a compiled crossing-number (even-odd) test on the edges of the polygons. Only
+    polygons whose bounds contain the gridpoint are tested and the edges of each polygon
+    are binned into latitude bands, such that only the edges of one band are tested.
+    The candidate polygons of a gridpoint are found with a coarse grid over their
+    bounds. The gridpoints are processed in parallel (see ``numba.set_num_threads``).
+    The pairs are sorted by region and cell.
+    """
+
+    kernel = _numba_kernel()
+
+    # add a tiny offset to get a consistent edge behaviour
+    x = np.ascontiguousarray(lon, dtype=float).ravel() - 1 * 10**-8
+    y = np.ascontiguousarray(lat, dtype=float).ravel() - 1 * 10**-10
 
-    if drop:
-        mask_3D = mask_3D.isel(region=any_masked)
+    bounds = shapely.bounds(polygons)
+    args = (x, y, bounds) + _bounds_grid(bounds) + _edge_bands(polygons, bounds)
 
-        numbers = np.asarray(numbers)[any_masked.values]
+    # first pass: count the regions per gridpoint
+    offsets = np.zeros(x.size + 1, dtype=np.int64)
+    empty = np.empty(0, dtype=np.intp)
+    kernel(*args, offsets, empty, empty, False)
+    np.cumsum(offsets, out=offsets)
 
-    if len(numbers) == 0:
+    # second pass: fill the pairs
+    region = np.empty(offsets[-1], dtype=np.intp)
+    cell = np.empty(offsets[-1], dtype=np.intp)
+    kernel(*args, offsets, region, cell, True)
 
-        mask_3D = mask_3D.assign_coords(region=("region", numbers))
+    # the pairs are sorted by cell
+    order = np.argsort(region, kind="stable")
 
-        warnings.warn(
-            "No gridpoint belongs to any region. Returning an empty mask"
-            f" with shape {mask_3D.shape}",
-            UserWarning,
-            stacklevel=3,
-        )
-        return mask_3D
+    return region[order], cell[order]
 
-    mask_3D = mask_3D.assign_coords(region=("region", numbers))
 
-    if not np.any(any_masked):
-        warnings.warn(
-            "No gridpoint belongs to any region. Returning an all-False mask.",
-            UserWarning,
-            stacklevel=3,
-        )
+def _bounds_grid(bounds, max_cells=2**16):
+    """coarse grid over the bounds of the polygons, listing the overlapping polygons
 
-    return mask_3D
+    Returns the origin, the spacing and the shape of the grid, the start of each grid
+    cell in the list of polygons and the list of polygons (sorted in each grid cell).
+    """
 
+    finite = np.isfinite(bounds).all(axis=1)
 
-def _3D_to_2D_mask(mask_3D: xr.DataArray, numbers) -> xr.DataArray:
+    if not finite.any():
+        bounds_ = np.zeros((1, 4))
+    else:
+        bounds_ = bounds[finite]
 
-    # NOTE: very similar to regionmask.core.utils.flatten_3D_mask
+    x_min, y_min = bounds_[:, 0].min(), bounds_[:, 1].min()
+    x_max, y_max = bounds_[:, 2].max(), bounds_[:, 3].max()
 
-    is_masked = mask_3D.sum("region")
+    # about as many grid cells as 4 x polygons (roughly square)
+    n = int(np.clip(4 * len(bounds), 1, max_cells))
+    width, height = max(x_max - x_min, 1e-9), max(y_max - y_min, 1e-9)
+    nx = int(np.clip(np.sqrt(n * width / height), 1, n))
+    ny = int(np.clip(n // nx, 1, n))
+    dx, dy = width / nx, height / ny
 
-    if (is_masked > 1).any():
-        raise ValueError(
-            "Found overlapping regions for ``overlap=None``. Please create a 3D mask. "
-            "You may want to explicitly set ``overlap`` to ``True`` or ``False``."
-        )
+    polygon = np.flatnonzero(finite)
+    b = bounds[finite]
 
-    # reshape because region is the first dim
-    numbers = np.asarray(numbers)
+    ix0 = np.clip(((b[:, 0] - x_min) // dx).astype(np.int64), 0, nx - 1)
+    ix1 = np.clip(((b[:, 2] - x_min) // dx).astype(np.int64), 0, nx - 1)
+    iy0 = np.clip(((b[:, 1] - y_min) // dy).astype(np.int64), 0, ny - 1)
+    iy1 = np.clip(((b[:, 3] - y_min) // dy).astype(np.int64), 0, ny - 1)
 
-    # I transform so it broadcasts (mask_3D can actually be 2D for unstructured grids,
-    # so reshape would need some logic)
-    mask_2D = (mask_3D.T * numbers).T.sum("region")
+    cells, polygons = [], []
+    for p, x0, x1, y0, y1 in zip(polygon, ix0, ix1, iy0, iy1, strict=True):
+        iy, ix = np.mgrid[y0 : y1 + 1, x0 : x1 + 1]
+        cells.append((iy * nx + ix).ravel())
+        polygons.append(np.full(cells[-1].size, p))
 
-    # mask all gridpoints not belonging to any region
+    cells = np.concatenate(cells) if cells else np.array([], dtype=np.int64)
+    polygons = np.concatenate(polygons) if polygons else np.array([], dtype=np.int64)
 
-    # older xarray versions do not have `keep_attrs` argument (needed to keep the name)
-    # mask_2D = xr.where(is_masked, mask_2D, np.nan, keep_attrs=True)
+    order = np.lexsort((polygons, cells))
 
-    mask_2D.values = np.where(is_masked.values, mask_2D, np.nan)
+    cell_start = np.zeros(nx * ny + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=nx * ny), out=cell_start[1:])
 
-    return mask_2D
+    grid = np.array([x_min, y_min, dx, dy])
+    shape = np.array([nx, ny])
 
+    return grid, shape, cell_start, polygons[order].astype(np.int64)
 
-def _determine_method(
-    lon, lat
-) -> Literal["rasterize", "rasterize_flip", "rasterize_split", "shapely"]:
-    """find method to be used -> prefers faster methods"""
 
-    if equally_spaced(lon, lat):
-        return "rasterize"
+def _edge_bands(polygons, bounds, edges_per_band=4, max_bands=4096):
+    """edges of the polygons, binned into latitude bands
 
-    if _equally_spaced_on_split_lon(lon) and equally_spaced(lat):
+    Returns the edge coordinates (x0, y0, x1, y1), the number and height of the bands
+    of each polygon, the index of the first band of each polygon, the start of each
+    band in the edge list, and the edge list (index into the edges). Horizontal edges
+    never cross a latitude and are omitted.
+    """
 
-        split_point = _find_splitpoint(lon)
-        flipped_lon = np.hstack((lon[split_point:], lon[:split_point]))
+    x0, y0, x1, y1, band_edges, band_counts = [], [], [], [], [], []
+    n_bands = np.ones(len(polygons), dtype=np.int64)
+    d_band = np.ones(len(polygons))
+
+    n_edges = 0
+    for i, polygon in enumerate(polygons):
+
+        edges = _polygon_edges(polygon)
+        edges = tuple(arr[edges[1] != edges[3]] for arr in edges)
+        size = edges[0].size
+
+        y_min, y_max = bounds[i, 1], bounds[i, 3]
+        if size and y_max > y_min:
+            n_bands[i] = np.clip(size // edges_per_band, 1, max_bands)
+            d_band[i] = (y_max - y_min) / n_bands[i]
+
+        # bands covered by each edge
+        first = (np.minimum(edges[1], edges[3]) - y_min) // d_band[i]
+        last = (np.maximum(edges[1], edges[3]) - y_min) // d_band[i]
+        first = np.clip(first.astype(np.int64), 0, n_bands[i] - 1)
+        last = np.clip(last.astype(np.int64), 0, n_bands[i] - 1)
+
+        count = last - first + 1
+        edge = np.repeat(np.arange(size), count)
+        band = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        band += first[edge]
+
+        order = np.argsort(band, kind="stable")
+        band_edges.append(edge[order] + n_edges)
+        band_counts.append(np.bincount(band, minlength=n_bands[i]))
+
+        for lst, arr in zip((x0, y0, x1, y1), edges, strict=True):
+            lst.append(arr)
+        n_edges += size
+
+    band_offset = np.zeros(len(polygons), dtype=np.int64)
+    np.cumsum(n_bands[:-1], out=band_offset[1:])
+
+    band_start = np.zeros(n_bands.sum() + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(band_counts), out=band_start[1:])
+
+    return (
+        np.concatenate(x0),
+        np.concatenate(y0),
+        np.concatenate(x1),
+        np.concatenate(y1),
+        n_bands,
+        d_band,
+        band_offset,
+        band_start,
+        np.concatenate(band_edges),
+    )
 
-        if equally_spaced(flipped_lon):
-            return "rasterize_flip"
-        else:
-            return "rasterize_split"
 
-    return "shapely"
+@functools.cache
+def _numba_kernel():
+    """compile the numba point-in-polygon kernel (on first use)"""
+
+    import numba
+
+    @numba.njit(parallel=True, nogil=True)
+    def kernel(
+        x,
+        y,
+        bounds,
+        grid,
+        shape,
+        cell_start,
+        cell_polygons,
+        x0,
+        y0,
+        x1,
+        y1,
+        n_bands,
+        d_band,
+        band_offset,
+        band_start,
+        band_edges,
+        offsets,
+        region,
+        cell,
+        fill,
+    ):
+        # fill=False: store the number of regions of each gridpoint in offsets[i + 1]
+        # fill=True: store the pairs, starting at offsets[i]
+        for i in numba.prange(x.size):
+            px, py = x[i], y[i]
+            n = 0
+
+            # find the candidate polygons in the coarse grid
+            gx = (px - grid[0]) / grid[2]
+            gy = (py - grid[1]) / grid[3]
+            # also excludes NaN
+            if not (0 <= gx < shape[0] + 1 and 0 <= gy < shape[1] + 1):
+                candidates = cell_polygons[:0]
+            else:
+                g = min(int(gy), shape[1] - 1) * shape[0] + min(int(gx), shape[0] - 1)
+                candidates = cell_polygons[cell_start[g] : cell_start[g + 1]]
+
+            for p in candidates:
+                if not (bounds[p, 0] <= px <= bounds[p, 2]):
+                    continue
+                if not (bounds[p, 1] <= py <= bounds[p, 3]):
+                    continue
+
+                band = int((py - bounds[p, 1]) / d_band[p])
+                band = min(band, n_bands[p] - 1) + band_offset[p]
+
+                inside = False
+                for j in range(band_start[band], band_start[band + 1]):
+                    k = band_edges[j]
+                    if (y0[k] > py) != (y1[k] > py):
+                        dx = x1[k] - x0[k]
+                        x_cross = x0[k] + (py - y0[k]) * dx / (y1[k] - y0[k])
+                        if px < x_cross:
+                            inside = not inside
+
+                if inside:
+                    if fill:
+                        region[offsets[i] + n] = p
+                        cell[offsets[i] + n] = i
+                    n += 1
+
+            if not fill:
+                offsets[i + 1] = n
+
+    return kernel
+
+
+# minimum number of gridpoints to use the quadtree backend
+_QUADTREE_MIN_CELLS = 2 * 10**7
+
+# minimum number of cells to mask curvilinear grids in their index space
+_INDEX_SPACE_MIN_CELLS = 10**7
+# larger steps between the transformed (segmentized) vertices indicate a seam or fold
+_INDEX_SPACE_MAX_STEP = 4
+
+
+def _mask_quadtree(
+    lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False, leaf_size=1024
+) -> np.ndarray:
+    """create a mask for monotonic 1D coords by recursively classifying blocks
 
+    Blocks of gridpoints that are fully inside a region are filled at once, blocks that
+    are outside are skipped, and only the remaining blocks are subdivided. The
+    gridpoints of blocks with at most ``leaf_size`` gridpoints are looked up in the
+    scanline intervals of the region. The cost scales with the length of the region
+    boundaries rather than the grid area.
+    """
 
-def _mask_to_dataarray(mask, lon, lat) -> xr.DataArray:
+    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
 
-    if sum(isinstance(c, xr.DataArray) for c in (lon, lat)) == 1:
-        raise ValueError("Cannot handle coordinates with mixed types!")
+    shape = _get_shape(lon, lat, numbers, as_3D=as_3D)
+    out = _get_out(shape, fill, as_3D=as_3D).reshape(shape)
 
-    if not isinstance(lon, xr.DataArray) or not isinstance(lat, xr.DataArray):
-        lon, lat = _numpy_coords_to_dataarray(lon, lat)
+    for i, rows, cols in _quadtree_blocks(lon, lat, polygons, leaf_size=leaf_size):
+        if as_3D:
+            out[i, rows, cols] = True
+        else:
+            out[rows, cols] = numbers[i]
 
-    ds = lat.coords.merge(lon.coords)
+    return out
 
-    dims = xr.broadcast(lat, lon)[0].dims
 
-    # unstructured grids are 1D
-    if mask.ndim - 1 == len(dims):
-        dims = ("region",) + dims
+def _quadtree_blocks(lon, lat, polygons, *, leaf_size=1024):
+    """yield the region index and the rows and cols of gridpoints in the region
 
-    return ds.assign(mask=(dims, mask)).mask
+    ``rows`` and ``cols`` are either slices (a block fully within the region) or index
+    arrays (gridpoints of a block at the boundary). ``lon`` and ``lat`` must be
+    monotonic.
+    """
 
+    lon_desc, lat_desc = lon[0] > lon[-1], lat[0] > lat[-1]
 
-def _numpy_coords_to_dataarray(lon, lat) -> tuple[xr.DataArray, xr.DataArray]:
+    # add a tiny offset to get a consistent edge behaviour
+    x = np.sort(lon) - 1 * 10**-8
+    y = np.sort(lat) - 1 * 10**-10
 
-    lon_name, lat_name = "lon", "lat"
+    def _slice(start, stop, n, desc):
+        # sorted index range to the original index range
+        return slice(n - stop, n - start) if desc else slice(start, stop)
 
-    dims2D = (f"{lat_name}_idx", f"{lon_name}_idx")
+    def _index(idx, n, desc):
+        return n - 1 - idx if desc else idx
 
-    lon = np.asarray(lon)
-    dims = dims2D if lon.ndim == 2 else lon_name
-    lon_ = xr.Dataset(coords={lon_name: (dims, lon)})[lon_name]
+    polygons = np.array(polygons, dtype=object).reshape(-1)
+    shapely.prepare(polygons)
 
-    lat = np.asarray(lat)
-    dims = dims2D if lat.ndim == 2 else lat_name
-    lat_ = xr.Dataset(coords={lat_name: (dims, lat)})[lat_name]
+    for i, polygon in enumerate(polygons):
 
-    return lon_, lat_
+        if polygon.is_empty:
+            continue
 
+        x_min, y_min, x_max, y_max = polygon.bounds
 
-def _mask_edgepoints_shapely(
-    mask,
-    lon,
-    lat,
-    polygons,
-    numbers,
-    *,
-    is_unstructured=False,
-    as_3D=False,
-) -> np.ndarray:
+        # intervals [start, stop) of the gridpoints in the polygon (sorted by row)
+        row_, start_, stop_ = _scanline_polygon(x, y, polygon)
+        key_ = row_ * (x.size + 1) + start_
 
-    LON, LAT, shape = _get_LON_LAT_shape(
-        lon, lat, numbers, is_unstructured=is_unstructured, as_3D=as_3D
-    )
+        if row_.size == 0:
+            continue
 
-    if as_3D:
-        mask = mask.reshape(mask.shape[0], -1)
-        # assume no points are assigned
-        mask_unassigned = True
-    else:
-        mask = mask.flatten()
-        mask_unassigned = np.isnan(mask)
+        # initial block: the gridpoints within the bounds of the polygon
+        c0, c1 = np.searchsorted(x, [x_min, x_max], side="left")
+        r0, r1 = np.searchsorted(y, [y_min, y_max], side="left")
 
-    # find points at -180°E/0°E
-    if np.nanmin(lon) < 0:
-        LON_180W_or_0E = np.isclose(LON, -180.0) & mask_unassigned
-    else:
-        LON_180W_or_0E = np.isclose(LON, 0.0) & mask_unassigned
+        blocks = np.array([[r0, r1, c0, c1]], dtype=np.intp)
+        blocks = blocks[(r1 > r0) & (c1 > c0)]
 
-    # find points at -90°N
-    LAT_90S = np.isclose(LAT, -90) & mask_unassigned
+        while blocks.size:
 
-    borderpoints = LON_180W_or_0E | LAT_90S
+            r0, r1, c0, c1 = blocks.T
+            boxes = shapely.box(x[c0], y[r0], x[c1 - 1], y[r1 - 1])
 
-    # return if there are no unassigned gridpoints at -180°E/0°E and -90°N
-    if not borderpoints.any():
-        return mask.reshape(shape)
+            n_rows, n_cols = r1 - r0, c1 - c0
+            # degenerate boxes (lines, points) are tested point by point
+            is_2D = (n_rows > 1) & (n_cols > 1)
 
-    # add a tiny offset to get a consistent edge behaviour
-    LON = LON[borderpoints] - 1 * 10**-8
-    LAT = LAT[borderpoints] - 1 * 10**-10
+            inside = is_2D & shapely.contains_properly(polygon, boxes)
+            outside = is_2D & ~shapely.intersects(polygon, boxes)
 
-    # wrap points LON_180W_or_0E: -180°E -> 180°E and 0°E -> 360°E
-    LON[LON_180W_or_0E[borderpoints]] += 360
-    # shift points at -90°N to -89.99...°N
-    LAT[LAT_90S[borderpoints]] = -90 + 1 * 10**-10
+            for r0_, r1_, c0_, c1_ in blocks[inside]:
+                rows = _slice(r0_, r1_, y.size, lat_desc)
+                cols = _slice(c0_, c1_, x.size, lon_desc)
+                yield i, rows, cols
 
-    # "mask[borderpoints][sel] = number" does not work, need to use np.where
-    idx = np.where(borderpoints)[0]
+            rest = ~(inside | outside)
+            is_leaf = rest & ((n_rows * n_cols <= leaf_size) | ~is_2D)
 
-    polys = np.array(polygons).reshape(-1, 1)
-    arr = shapely.contains_xy(polys, LON, LAT)
+            if is_leaf.any():
+                row, col = _expand_blocks(blocks[is_leaf])
 
-    if as_3D:
-        for i in range(len(polygons)):
-            mask[i, idx[arr[i, :]]] = True
+                # find the interval starting at or before the gridpoint
+                idx = np.searchsorted(key_, row * (x.size + 1) + col, side="right") - 1
+                sel = (idx >= 0) & (row_[idx] == row) & (col < stop_[idx])
+                rows = _index(row[sel], y.size, lat_desc)
+                cols = _index(col[sel], x.size, lon_desc)
+                yield i, rows, cols
 
-    else:
-        for i in range(len(polygons)):
-            mask[idx[arr[i, :]]] = numbers[i]
+            blocks = _split_blocks(blocks[rest & ~is_leaf])
 
-    return mask.reshape(shape)
 
+def _expand_blocks(blocks):
+    """row and col index of all gridpoints of the blocks (r0, r1, c0, c1)"""
 
-def _mask_shapely(
-    lon, lat, polygons, numbers, *, fill=np.nan, is_unstructured=False, as_3D=False
-) -> np.ndarray:
-    """create a mask using shapely.STRtree"""
+    r0, r1, c0, c1 = blocks.T
+    n_cols = c1 - c0
+    size = (r1 - r0) * n_cols
 
-    lon, lat = _parse_input(lon, lat, polygons, fill, numbers)
+    block = np.repeat(np.arange(size.size), size)
+    flat = np.arange(size.sum()) - np.repeat(np.cumsum(size) - size, size)
 
-    LON, LAT, shape = _get_LON_LAT_shape(
-        lon, lat, numbers, is_unstructured=is_unstructured, as_3D=as_3D
-    )
-    out = _get_out(shape, fill, as_3D=as_3D)
+    row, col = np.divmod(flat, n_cols[block])
 
-    # add a tiny offset to get a consistent edge behaviour
-    LON = LON - 1 * 10**-8
-    LAT = LAT - 1 * 10**-10
+    return row + r0[block], col + c0[block]
 
-    # convert to points
-    points = shapely.points(LON, LAT)
 
-    tree = shapely.STRtree(points)
-    a, b = tree.query(polygons, predicate="contains")
+def _split_blocks(blocks):
+    """split blocks (r0, r1, c0, c1) into four quadrants"""
 
-    if as_3D:
-        for i in range(len(numbers)):
-            out[i, b[a == i]] = True
-    else:
-        for i, number in enumerate(numbers):
-            out[b[a == i]] = number
+    r0, r1, c0, c1 = blocks.T
+    r_mid, c_mid = (r0 + r1) // 2, (c0 + c1) // 2
 
-    return out.reshape(shape)
+    return np.concatenate(
+        [
+            np.stack([r0, r_mid, c0, c_mid], axis=1),
+            np.stack([r0, r_mid, c_mid, c1], axis=1),
+            np.stack([r_mid, r1, c0, c_mid], axis=1),
+            np.stack([r_mid, r1, c_mid, c1], axis=1),
+        ]
+    )
 
 
 def _parse_input(lon, lat, coords, fill, numbers):
@@ -690,6 +3717,24 @@ def _parse_input(lon, lat, coords, fill, numbers):
 
 def _get_LON_LAT_shape(lon, lat, numbers, *, is_unstructured=False, as_3D=False):
 
+    shape = _get_shape(lon, lat, numbers, is_unstructured=is_unstructured)
+
+    if not is_unstructured and lon.ndim == 1:
+        LON, LAT = np.meshgrid(lon, lat)
+    else:
+        LON, LAT = lon, lat
+
+    if as_3D:
+        shape = (len(numbers),) + shape
+
+    LON, LAT = LON.ravel(), LAT.ravel()
+
+    return LON, LAT, shape
+
+
+def _get_shape(lon, lat, numbers, *, is_unstructured=False, as_3D=False):
+    """shape of the mask - without creating the meshgrid of 1D coords"""
+
     if lon.ndim != lat.ndim:
         raise ValueError(
             "Equal number of dimensions required, found "
@@ -705,31 +3750,28 @@ def _get_LON_LAT_shape(lon, lat, numbers, *, is_unstructured=False, as_3D=False)
         )
 
     if is_unstructured:
-        LON, LAT = lon, lat
+        shape = lon.shape
     elif ndim == 1:
-        LON, LAT = np.meshgrid(lon, lat)
+        shape = (lat.size, lon.size)
     elif ndim == 2:
-        LON, LAT = lon, lat
+        shape = lon.shape
     else:
         raise ValueError(
             f"1D or 2D data required - found {ndim} dimensions. Use `squeeze` to remove"
             " axes of length 1 - e.g. `mask(lon.squeeze(), lat.squeeze())`."
         )
 
-    shape = LON.shape
-
     if as_3D:
         shape = (len(numbers),) + shape
 
-    LON, LAT = LON.ravel(), LAT.ravel()
-
-    return LON, LAT, shape
+    return shape
 
 
 def _get_out(shape, fill, *, as_3D):
     # create flattened output variable
     if as_3D:
-        out = np.full(shape[:1] + (np.prod(shape[1:]).item(),), False, bool)
+        # np.zeros does not need to touch the memory of regions that are not filled
+        out = np.zeros(shape[:1] + (np.prod(shape[1:]).item(),), bool)
     else:
         out = np.full(np.prod(shape), fill, float)
 
@@ -784,6 +3826,22 @@ def _mask_rasterize_split(
     return np.concatenate((mask_l, mask_r), axis=-1)
 
 
+def _mask_rasterize_permuted(
+    lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False, **kwargs
+):
+    """rasterize on the sorted coords and apply the inverse permutation (one take)"""
+
+    idx_lon, idx_lat = np.argsort(lon), np.argsort(lat)
+
+    mask = _mask_rasterize(
+        lon[idx_lon], lat[idx_lat], polygons, numbers=numbers, as_3D=as_3D, **kwargs
+    )
+
+    # revert the sorting
+    inv_lon, inv_lat = np.argsort(idx_lon), np.argsort(idx_lat)
+    return mask[..., inv_lat[:, np.newaxis], inv_lon]
+
+
 def _mask_rasterize(lon, lat, polygons, numbers, *, fill=np.nan, as_3D=False, **kwargs):
 
     if as_3D:
@@ -801,13 +3859,42 @@ def _mask_rasterize_3D_internal(lon, lat, polygons, **kwargs):
     # 6 -> 2 & 4
     # etc
 
+    n_polygons = len(polygons)
+
+    if _use_rasterize_windows(lon, lat, polygons):
+
+        out_3D = np.zeros((n_polygons, len(lat), len(lon)), dtype=bool)
+
+        for i, rows, cols, raster in _rasterize_windows(lon, lat, polygons, **kwargs):
+            out_3D[i, rows, cols] = raster
+
+        return out_3D
+
+    out = list()
+
+    for __, result in _rasterize_bit_batches(lon, lat, polygons, **kwargs):
+
+        # disentangle the regions
+        result = unpackbits(result, 32)
+
+        # the region dim must be the first one
+        result = result.transpose([2, 0, 1])
+        out.append(result)
+
+    return np.concatenate(out, axis=0)[:n_polygons, ...]
+
+
+def _rasterize_bit_batches(lon, lat, polygons, **kwargs):
+    """rasterize the polygons in batches of 32, each region is one bit of the result
+
+    Yields the index of the first polygon of the batch and the uint32 raster.
+    """
+
     import rasterio
 
     numbers = 2 ** np.arange(32)
     n_polygons = len(polygons)
 
-    out = list()
-
     # rasterize only supports uint32 -> rasterize in batches of 32
     for i in range(np.ceil(n_polygons / 32).astype(int)):
 
@@ -824,14 +3911,184 @@ def _mask_rasterize_3D_internal(lon, lat, polygons, **kwargs):
             **kwargs,
         )
 
-        # disentangle the regions
-        result = unpackbits(result, 32)
+        yield 32 * i, result
 
-        # the region dim must be the first one
-        result = result.transpose([2, 0, 1])
-        out.append(result)
 
-    return np.concatenate(out, axis=0)[:n_polygons, ...]
+def _rasterize_window_bounds(lon, lat, polygons):
+    """grid window (row and column start and stop) covering each polygon's bbox
+
+    Empty windows have ``start == stop``.
+    """
+
+    transform = _transform_from_latlon(lon, lat)
+
+    # fractional pixel coordinates of the lower left and upper right corners
+    xmin, ymin, xmax, ymax = shapely.bounds(np.asarray(polygons)).T
+    col_a, row_a = ~transform * (xmin, ymin)
+    col_b, row_b = ~transform * (xmax, ymax)
+
+    # one extra cell on every side to be safe
+    with np.errstate(invalid="ignore"):
+        col_start = np.floor(np.fmin(col_a, col_b)) - 1
+        col_stop = np.ceil(np.fmax(col_a, col_b)) + 1
+        row_start = np.floor(np.fmin(row_a, row_b)) - 1
+        row_stop = np.ceil(np.fmax(row_a, row_b)) + 1
+
+    bounds = np.stack([row_start, row_stop, col_start, col_stop], axis=1)
+
+    # empty polygons have nan bounds
+    bounds = np.nan_to_num(bounds, nan=0)
+
+    n_rows, n_cols = len(lat), len(lon)
+    bounds[:, :2] = np.clip(bounds[:, :2], 0, n_rows)
+    bounds[:, 2:] = np.clip(bounds[:, 2:], 0, n_cols)
+
+    bounds = bounds.astype(int)
+
+    # make sure start <= stop (for polygons outside the grid)
+    bounds[:, 1] = np.maximum(bounds[:, 0], bounds[:, 1])
+    bounds[:, 3] = np.maximum(bounds[:, 2], bounds[:, 3])
+
+    return bounds
+
+
+def _use_rasterize_windows(lon, lat, polygons) -> bool:
+    """decide if rasterizing per bbox window is cheaper than in batches of 32"""
+
+    n_polygons = len(polygons)
+    n_cells = len(lon) * len(lat)
+
+    bounds = _rasterize_window_bounds(lon, lat, polygons)
+    window_cells = (bounds[:, 1] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 2])
+
+    # the batches pass over the full grid and unpack 32 bits per cell, the windows
+    # are cheap per cell but require one call to rasterize per polygon (the constants
+    # are rough estimates from timings)
+    cost_batches = np.ceil(n_polygons / 32) * n_cells
+    cost_windows = window_cells.sum() / 8 + n_polygons * 5_000
+
+    return cost_windows < cost_batches
+
+
+def _rasterize_windows(lon, lat, polygons, **kwargs):
+    """rasterize each polygon only on the grid window covering its bounding box
+
+    Yields the index of the polygon, the window (as row and column slices), and the
+    boolean raster of the window. Polygons outside of the grid are skipped.
+    """
+
+    from affine import Affine
+    from rasterio import features
+
+    lon = np.asarray(lon)
+    lat = np.asarray(lat)
+
+    # subtract a tiny offset: https://github.com/mapbox/rasterio/issues/1844
+    lon = lon - 1 * 10**-8
+    lat = lat - 1 * 10**-10
+
+    transform = _transform_from_latlon(lon, lat)
+    bounds = _rasterize_window_bounds(lon, lat, polygons)
+
+    for i, (row_start, row_stop, col_start, col_stop) in enumerate(bounds):
+
+        if row_start == row_stop or col_start == col_stop:
+            continue
+
+        raster = features.rasterize(
+            [(polygons[i], 1)],
+            out_shape=(row_stop - row_start, col_stop - col_start),
+            fill=0,
+            transform=transform * Affine.translation(col_start, row_start),
+            dtype="uint8",
+            **kwargs,
+        )
+
+        rows, cols = slice(row_start, row_stop), slice(col_start, col_stop)
+
+        yield i, rows, cols, raster.view(bool)
+
+
+def _mask_rasterize_pairs(lon, lat, polygons, **kwargs):
+    """(region, cell) index pairs of all gridpoints in a region (using rasterize)
+
+    The cell index refers to the flattened ``lat x lon`` grid. Only the cells covered
+    by a batch of regions are unpacked, the dense 3D mask is never created.
+    """
+
+    regions, cells = [], []
+
+    if _use_rasterize_windows(lon, lat, polygons):
+
+        for i, rows, cols, raster in _rasterize_windows(lon, lat, polygons, **kwargs):
+
+            row, col = np.nonzero(raster)
+
+            regions.append(np.full(row.size, i))
+            cells.append((row + rows.start) * len(lon) + col + cols.start)
+
+        if not regions:
+            return np.array([], dtype=int), np.array([], dtype=int)
+
+        return np.concatenate(regions), np.concatenate(cells)
+
+    for offset, result in _rasterize_bit_batches(lon, lat, polygons, **kwargs):
+
+        result = result.ravel()
+        (idx,) = np.nonzero(result)
+
+        bits = unpackbits(result[idx], 32)
+        cell, region = np.nonzero(bits)
+
+        regions.append(region + offset)
+        cells.append(idx[cell])
+
+    return np.concatenate(regions), np.concatenate(cells)
+
+
+def _mask_rasterize_flip_pairs(lon, lat, polygons, **kwargs):
+
+    split_point = _find_splitpoint(lon)
+    flipped_lon = np.hstack((lon[split_point:], lon[:split_point]))
+
+    regions, cells = _mask_rasterize_pairs(flipped_lon, lat, polygons, **kwargs)
+
+    # revert the flip
+    row, col = np.divmod(cells, lon.size)
+    col = (col + split_point) % lon.size
+
+    return regions, row * lon.size + col
+
+
+def _mask_rasterize_split_pairs(lon, lat, polygons, **kwargs):
+
+    split_point = _find_splitpoint(lon)
+
+    regions, cells = [], []
+    for offset, lon_part in ((0, lon[:split_point]), (split_point, lon[split_point:])):
+
+        region, cell = _mask_rasterize_pairs(lon_part, lat, polygons, **kwargs)
+
+        row, col = np.divmod(cell, lon_part.size)
+
+        regions.append(region)
+        cells.append(row * lon.size + col + offset)
+
+    return np.concatenate(regions), np.concatenate(cells)
+
+
+def _mask_rasterize_permuted_pairs(lon, lat, polygons, **kwargs):
+
+    idx_lon, idx_lat = np.argsort(lon), np.argsort(lat)
+
+    regions, cells = _mask_rasterize_pairs(
+        lon[idx_lon], lat[idx_lat], polygons, **kwargs
+    )
+
+    # revert the sorting
+    row, col = np.divmod(cells, lon.size)
+
+    return regions, idx_lat[row] * lon.size + idx_lon[col]
 
 
 def _mask_rasterize_internal(lon, lat, polygons, numbers, *, fill=np.nan, **kwargs):
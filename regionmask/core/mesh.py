@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import numpy as np
+import xarray as xr
+
+
+def _get_mesh(obj) -> dict | None:
+    """attributes of the 2D mesh topology variable of a UGRID Dataset (or None)"""
+
+    if not isinstance(obj, xr.Dataset):
+        return None
+
+    for var in obj.variables.values():
+        attrs = var.attrs
+        if (
+            attrs.get("cf_role") == "mesh_topology"
+            and int(attrs.get("topology_dimension", 0)) == 2
+            and "face_node_connectivity" in attrs
+        ):
+            return attrs
+
+    return None
+
+
+def _mesh_coord_names(mesh) -> list[str]:
+    """names of the node, edge, and face coordinates of a UGRID mesh"""
+
+    names = (mesh.get(f"{loc}_coordinates", "") for loc in ("node", "edge", "face"))
+    return [name for coords in names for name in coords.split()]
+
+
+def _lon_lat_names(obj, names):
+    """split the names of a UGRID coordinates attribute into (lon, lat)"""
+
+    names = names.split()
+
+    if len(names) != 2 or any(name not in obj.variables for name in names):
+        raise ValueError(f"Expected two coordinates of the mesh, got {names}")
+
+    def _is_lat(name):
+        attrs = obj[name].attrs
+        return (
+            attrs.get("standard_name") == "latitude"
+            or attrs.get("units") in ("degrees_north", "degree_north")
+            or attrs.get("axis") == "Y"
+        )
+
+    # the order is x, y unless indicated by the attributes
+    return names[::-1] if _is_lat(names[0]) else names
+
+
+def _get_face_coords(obj, mesh):
+    """lon and lat of the faces of a UGRID mesh
+
+    Uses the ``face_coordinates`` of the mesh or the center of the face vertices.
+    """
+
+    if "face_coordinates" in mesh:
+        lon_name, lat_name = _lon_lat_names(obj, mesh["face_coordinates"])
+        return obj[lon_name], obj[lat_name]
+
+    lon_v, lat_v, face_dim = _get_face_vertices(obj, mesh)
+
+    # mean of the vertices on the sphere - works for faces across the dateline
+    lon_v, lat_v = np.deg2rad(lon_v), np.deg2rad(lat_v)
+    x = np.nanmean(np.cos(lat_v) * np.cos(lon_v), axis=1)
+    y = np.nanmean(np.cos(lat_v) * np.sin(lon_v), axis=1)
+    z = np.nanmean(np.sin(lat_v), axis=1)
+
+    lon = np.rad2deg(np.arctan2(y, x))
+    lat = np.rad2deg(np.arctan2(z, np.hypot(x, y)))
+
+    lon = xr.DataArray(lon, dims=face_dim, name="lon")
+    lat = xr.DataArray(lat, dims=face_dim, name="lat")
+
+    return lon, lat
+
+
+def _get_face_vertices(obj, mesh):
+    """lon and lat of the vertices of each face of a UGRID mesh
+
+    Returns arrays of shape ``(n_face, n_max_face_nodes)`` and the name of the face
+    dimension. The vertices of faces with fewer nodes (fill values) are NaN.
+    """
+
+    lon_name, lat_name = _lon_lat_names(obj, mesh["node_coordinates"])
+    connectivity = obj[mesh["face_node_connectivity"]]
+
+    if connectivity.ndim != 2:
+        raise ValueError("The face_node_connectivity must be 2D")
+
+    face_dim = mesh.get("face_dimension", connectivity.dims[0])
+    connectivity = connectivity.transpose(face_dim, ...)
+
+    start_index = int(connectivity.attrs.get("start_index", 0))
+    fill_value = connectivity.attrs.get(
+        "_FillValue", connectivity.encoding.get("_FillValue")
+    )
+
+    # the fill values are NaN if the connectivity was decoded
+    index = np.asarray(connectivity)
+    valid = np.isfinite(index) & (index >= start_index)
+    if fill_value is not None:
+        valid &= index != fill_value
+
+    index = np.where(valid, index - start_index, 0).astype(np.intp)
+
+    lon_v = np.where(valid, np.asarray(obj[lon_name], dtype=float)[index], np.nan)
+    lat_v = np.where(valid, np.asarray(obj[lat_name], dtype=float)[index], np.nan)
+
+    return lon_v, lat_v, face_dim
+
+
+def _fill_vertices(lon_v, lat_v):
+    """replace missing (NaN) vertices of cells with fewer vertices by the previous one
+
+    For cells of an unstructured mesh with a variable number of vertices (e.g. MPAS),
+    which are padded with NaN. Repeated vertices do not change the polygon.
+    """
+
+    valid = np.isfinite(lon_v) & np.isfinite(lat_v)
+
+    if valid.all():
+        return lon_v, lat_v
+
+    index = np.where(valid, np.arange(valid.shape[1]), 0)
+    index = np.maximum.accumulate(index, axis=1)
+
+    lon_v = np.take_along_axis(lon_v, index, axis=1)
+    lat_v = np.take_along_axis(lat_v, index, axis=1)
+
+    return lon_v, lat_v
+
+
+def _continuous_vertices(lon_v, lat_v):
+    """make the longitude of the vertices of the cells continuous
+
+    For cells across the dateline the longitude is unwrapped. Cells enclosing a pole
+    (their longitude winds around the globe) are closed along the pole, adding three
+    vertices to all cells (the other cells repeat their last vertex).
+    """
+
+    # the steps between the vertices, including the closing one
+    d_lon = np.diff(lon_v, axis=1, append=lon_v[:, :1])
+    d_lon = (d_lon + 180) % 360 - 180
+
+    lon_v = lon_v[:, :1] + np.cumsum(d_lon, axis=1) - d_lon
+
+    winding = d_lon.sum(axis=1)
+    is_pole = np.abs(winding) > 180
+
+    if not is_pole.any():
+        return lon_v, lat_v
+
+    # the closed cells: the vertices, the first vertex shifted by ±360°, and the pole
+    pole = np.where(np.nanmean(lat_v[is_pole], axis=1) > 0, 90.0, -90.0)
+    lon_0 = lon_v[is_pole, 0]
+    lon_1 = lon_0 + np.round(winding[is_pole] / 360) * 360
+
+    lon_extra = np.repeat(lon_v[:, -1:], 3, axis=1)
+    lat_extra = np.repeat(lat_v[:, -1:], 3, axis=1)
+
+    lon_extra[is_pole] = np.stack([lon_1, lon_1, lon_0], axis=1)
+    lat_extra[is_pole] = np.stack([lat_v[is_pole, 0], pole, pole], axis=1)
+
+    lon_v = np.concatenate([lon_v, lon_extra], axis=1)
+    lat_v = np.concatenate([lat_v, lat_extra], axis=1)
+
+    return lon_v, lat_v
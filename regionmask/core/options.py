@@ -14,19 +14,51 @@ else:
 class _OPTIONS(TypedDict, total=False):
     display_max_rows: int
     cache_dir: str | None
+    mask_cache_max_entries: int
+    mask_cache_max_bytes: int | None
+    mask_disk_cache: bool
+    mask_disk_cache_max_bytes: int | None
+    frac_approx_band_size: int | None
+    mask_num_threads: int
 
 
 OPTIONS: _OPTIONS = {
     "display_max_rows": 10,
     "cache_dir": None,
+    "mask_cache_max_entries": 0,
+    "mask_cache_max_bytes": 2**28,
+    "mask_disk_cache": False,
+    "mask_disk_cache_max_bytes": 2**30,
+    "frac_approx_band_size": None,
+    "mask_num_threads": 1,
 }
 
 
+def _is_integer(value) -> bool:
+    # bool is a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
 def _optional_positive_integer(name: str, value):
-    if not (value is None or isinstance(value, int) and value > 0):
+    if not (value is None or _is_integer(value) and value > 0):
         raise ValueError(f"'{name}' must be a positive integer or None, got '{value}'")
 
 
+def _positive_integer(name: str, value):
+    if not (_is_integer(value) and value > 0):
+        raise ValueError(f"'{name}' must be a positive integer, got '{value}'")
+
+
+def _non_negative_integer(name: str, value):
+    if not (_is_integer(value) and value >= 0):
+        raise ValueError(f"'{name}' must be a non-negative integer, got '{value}'")
+
+
+def _bool(name: str, value):
+    if not isinstance(value, bool):
+        raise ValueError(f"'{name}' must be a boolean, got '{value}'")
+
+
 def _optional_str_or_path(name: str, value):
     from pathlib import Path
 
@@ -39,6 +71,12 @@ def _optional_str_or_path(name: str, value):
 _VALIDATORS = {
     "display_max_rows": _optional_positive_integer,
     "cache_dir": _optional_str_or_path,
+    "mask_cache_max_entries": _non_negative_integer,
+    "mask_cache_max_bytes": _optional_positive_integer,
+    "mask_disk_cache": _bool,
+    "mask_disk_cache_max_bytes": _optional_positive_integer,
+    "frac_approx_band_size": _optional_positive_integer,
+    "mask_num_threads": _positive_integer,
 }
 
 
@@ -53,6 +91,30 @@ class set_options:
     cache_dir : str | pathlib.Path
         Location of the cache directory. If None uses the default cache location of
         your operating system. For unix-like this would be '~/.cache/regionmask'.
+    mask_cache_max_entries : int, default: 0
+        Maximum number of masks kept in the in-memory mask cache. Masks are cached
+        based on the region outlines and numbers, the lon and lat coordinates and the
+        arguments determining the mask. Cached masks are returned as read-only
+        arrays. If 0 (default) the cache is disabled.
+    mask_cache_max_bytes : int | None, default: 2**28
+        Maximum total size (in bytes) of the masks kept in the in-memory mask cache.
+        If None, the size is only limited by ``mask_cache_max_entries``.
+    mask_disk_cache : bool, default: False
+        If True, masks are additionally stored in (and read from) the ``masks``
+        subfolder of ``cache_dir``. The on-disk cache can be shared between processes.
+        Cached masks are returned as read-only arrays.
+    mask_disk_cache_max_bytes : int | None, default: 2**30
+        Maximum size (in bytes) of the on-disk mask cache. The least recently used
+        masks are removed if it grows larger. If None, the size is not limited.
+    frac_approx_band_size : int | None, default: None
+        Number of grid rows (latitudes) sampled at once by ``mask_3D_frac_approx``
+        when sampling the full grid. The peak memory is proportional to the band size.
+        If None, the band size is chosen such that the sampled mask of one band
+        requires about 64 MB.
+    mask_num_threads : int, default: 1
+        Number of threads used to process the chunks of the ``"shapely"`` mask
+        backend, the bands of ``mask_3D_frac_approx``, and the cells of
+        ``mask_3D_frac``.
 
     Examples
     --------
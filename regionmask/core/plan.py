@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import numpy as np
+import xarray as xr
+
+from regionmask.core.cache import _fingerprint
+from regionmask.core.coords import _get_coords
+from regionmask.core.mask import _get_bounds
+
+_KINDS = ("2D", "3D", "frac")
+
+
+def _grid_key(
+    lon_or_obj, lat, use_cf, kind="3D", lon_bounds=None, lat_bounds=None
+) -> str:
+    """content-based fingerprint of the lon and lat coordinates (and their dims)
+
+    For fractional masks the cell bounds (passed explicitly, via the CF ``bounds``
+    attribute, or of a UGRID mesh) are included.
+    """
+
+    lon, lat = _get_coords(lon_or_obj, lat, "lon", "lat", use_cf)
+
+    dims = tuple(getattr(coord, "dims", None) for coord in (lon, lat))
+
+    bounds: tuple = ()
+    if kind == "frac":
+        bounds = _get_bounds(lon_or_obj, lon, lat, lon_bounds, lat_bounds)
+        bounds = tuple(b if b is None else np.asarray(b, dtype=float) for b in bounds)
+
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+
+    return _fingerprint(lon, lat, dims, *bounds)
+
+
+class MaskPlan:
+    """mask of a set of regions planned for one grid
+
+    Holds the mask created by :py:meth:`Regions.plan_mask` and a fingerprint of the
+    grid it was created for. Use :py:meth:`MaskPlan.apply` to obtain the mask for data
+    on the same grid (e.g. every file or ensemble member) without masking again. A
+    MaskPlan can be pickled, boolean masks are stored as bits.
+
+    Do not create a MaskPlan directly, use :py:meth:`Regions.plan_mask`.
+    """
+
+    def __init__(self, mask: xr.DataArray, *, kind: str, grid_key: str, use_cf=None):
+
+        if kind not in _KINDS:
+            raise ValueError(f"'kind' must be one of {_KINDS}, found {kind!r}")
+
+        mask = mask.compute()
+
+        # the mask is shared by all calls to ``apply``
+        if isinstance(mask.data, np.ndarray):
+            mask.data.setflags(write=False)
+
+        self._mask = mask
+        self.kind = kind
+        self.grid_key = grid_key
+        self.use_cf = use_cf
+
+    @property
+    def mask(self) -> xr.DataArray:
+        """the planned mask"""
+        return self._mask.copy(deep=False)
+
+    def matches(
+        self,
+        lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+        lat: np.typing.ArrayLike | xr.DataArray | None = None,
+        *,
+        lon_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+        lat_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+    ) -> bool:
+        """check if a grid is equal to the planned grid
+
+        Parameters
+        ----------
+        lon_or_obj : object or array_like
+            Longitude array or an object where the longitude and latitude can be
+            retrieved from (as for :py:meth:`Regions.mask`).
+        lat : array_like, optional
+            If ``lon_or_obj`` is a longitude array, the latitude needs to be passed.
+        lon_bounds, lat_bounds : array_like, optional
+            Bounds of the grid cells (as for :py:meth:`Regions.mask_3D_frac`). Only
+            compared for fractional masks (``kind="frac"``).
+
+        Returns
+        -------
+        bool
+            True if the values and dimensions of lon and lat (and the bounds for
+            fractional masks) are equal to the ones of the planned grid.
+        """
+
+        grid_key = _grid_key(
+            lon_or_obj,
+            lat,
+            self.use_cf,
+            kind=self.kind,
+            lon_bounds=lon_bounds,
+            lat_bounds=lat_bounds,
+        )
+
+        return grid_key == self.grid_key
+
+    def apply(
+        self,
+        lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+        lat: np.typing.ArrayLike | xr.DataArray | None = None,
+        *,
+        lon_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+        lat_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+        check: bool = True,
+    ) -> xr.DataArray:
+        """return the planned mask for a grid
+
+        Equivalent to creating the mask for ``lon_or_obj`` with the method and
+        arguments passed to :py:meth:`Regions.plan_mask` - without masking again.
+
+        Parameters
+        ----------
+        lon_or_obj : object or array_like
+            Longitude array or an object where the longitude and latitude can be
+            retrieved from (as for :py:meth:`Regions.mask`).
+        lat : array_like, optional
+            If ``lon_or_obj`` is a longitude array, the latitude needs to be passed.
+        lon_bounds, lat_bounds : array_like, optional
+            Bounds of the grid cells (as for :py:meth:`Regions.mask_3D_frac`). Only
+            compared for fractional masks (``kind="frac"``).
+        check : bool, default: True
+            Whether to check that the grid is equal to the planned grid. Comparing the
+            grids requires hashing lon and lat. If False the mask is returned directly.
+
+        Returns
+        -------
+        mask : xarray.DataArray
+
+        Raises
+        ------
+        ValueError
+            If ``check`` is True and the grid does not match the planned grid.
+        """
+
+        if check and not self.matches(
+            lon_or_obj, lat, lon_bounds=lon_bounds, lat_bounds=lat_bounds
+        ):
+            raise ValueError(
+                "The grid does not match the grid of the MaskPlan. Create a new plan "
+                "with ``Regions.plan_mask``."
+            )
+
+        return self.mask
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        mask = state.pop("_mask")
+
+        data = mask.data
+        packed = isinstance(data, np.ndarray) and data.dtype == bool
+        if packed:
+            data = np.packbits(data, axis=None)
+
+        # the coords without the data of the mask
+        template = mask.coords.to_dataset()
+
+        state["_mask_state"] = (
+            data,
+            packed,
+            mask.shape,
+            mask.dims,
+            mask.name,
+            mask.attrs,
+        )
+        state["_template"] = template
+
+        return state
+
+    def __setstate__(self, state):
+
+        data, packed, shape, dims, name, attrs = state.pop("_mask_state")
+        template = state.pop("_template")
+
+        if packed:
+            count = int(np.prod(shape))
+            data = np.unpackbits(data, count=count).view(bool).reshape(shape)
+
+        mask = xr.DataArray(data, dims=dims, coords=template.coords, name=name)
+        mask.attrs = attrs
+
+        if isinstance(mask.data, np.ndarray):
+            mask.data.setflags(write=False)
+
+        self.__dict__.update(state)
+        self._mask = mask
+
+    def __repr__(self) -> str:
+
+        dims = ", ".join(f"{dim}: {size}" for dim, size in self._mask.sizes.items())
+        return f"<regionmask.MaskPlan (kind={self.kind!r}, {dims})>"
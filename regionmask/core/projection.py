@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import numpy as np
+import shapely
+import xarray as xr
+
+_ROTATED_POLE = "rotated_latitude_longitude"
+
+# names of the longitude of the origin in the parameters of pyproj operations
+_CENTRAL_MERIDIAN = (
+    "Longitude of natural origin",
+    "Longitude of origin",
+    "Longitude of false origin",
+    "Longitude of projection centre",
+)
+
+
+def _rotate_pole(lon, lat, *, pole_lon, pole_lat, north_pole_grid_lon=0.0):
+    """transform geographic lon and lat to rotated-pole coordinates
+
+    The parameters follow the CF conventions for ``rotated_latitude_longitude`` grid
+    mappings (``grid_north_pole_longitude``, ``grid_north_pole_latitude``, and
+    ``north_pole_grid_longitude``).
+    """
+
+    lon = np.deg2rad(np.asarray(lon, dtype=float) - pole_lon)
+    lat = np.deg2rad(np.asarray(lat, dtype=float))
+    pole_lat = np.deg2rad(pole_lat)
+
+    x = np.cos(lat) * np.cos(lon)
+    y = np.cos(lat) * np.sin(lon)
+    z = np.sin(lat)
+
+    # rotate around the y-axis such that the pole ends up at the north pole
+    x_rot = x * np.sin(pole_lat) - z * np.cos(pole_lat)
+    z_rot = x * np.cos(pole_lat) + z * np.sin(pole_lat)
+
+    rlon = np.rad2deg(np.arctan2(-y, -x_rot)) + north_pole_grid_lon
+    rlat = np.rad2deg(np.arcsin(np.clip(z_rot, -1, 1)))
+
+    return (rlon + 180) % 360 - 180, rlat
+
+
+def _get_rotated_grid(obj, lon, lat):
+    """1D rotated coords and the pole of CF rotated-pole grids (or None)
+
+    Returns ``(rlon, rlat, pole, transpose)`` if ``obj`` has exactly one
+    ``rotated_latitude_longitude`` grid mapping and 1D ``grid_longitude`` and
+    ``grid_latitude`` coords along the dimensions of the 2D ``lon`` and ``lat``.
+    ``transpose`` is True if ``rlon`` varies along the first dimension of ``lon``.
+    """
+
+    if not isinstance(obj, xr.Dataset | xr.DataArray):
+        return None
+
+    if not isinstance(lon, xr.DataArray) or not isinstance(lat, xr.DataArray):
+        return None
+
+    if lon.ndim != 2 or lon.dims != lat.dims:
+        return None
+
+    variables = obj.variables if isinstance(obj, xr.Dataset) else obj.coords
+    mappings = [
+        var
+        for var in variables.values()
+        if var.attrs.get("grid_mapping_name") == _ROTATED_POLE
+    ]
+
+    if len(mappings) != 1:
+        return None
+
+    attrs = mappings[0].attrs
+
+    try:
+        pole = {
+            "pole_lon": float(attrs["grid_north_pole_longitude"]),
+            "pole_lat": float(attrs["grid_north_pole_latitude"]),
+            "north_pole_grid_lon": float(attrs.get("north_pole_grid_longitude", 0.0)),
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    rlon = _get_grid_coord(obj, "grid_longitude", "rlon")
+    rlat = _get_grid_coord(obj, "grid_latitude", "rlat")
+
+    if rlon is None or rlat is None:
+        return None
+
+    if lon.dims == (rlat.dims[0], rlon.dims[0]):
+        return rlon, rlat, pole, False
+
+    if lon.dims == (rlon.dims[0], rlat.dims[0]):
+        return rlon, rlat, pole, True
+
+    return None
+
+
+def _parse_crs(crs):
+    """pyproj CRS from any input accepted by pyproj or a CF grid mapping"""
+
+    import pyproj
+
+    if isinstance(crs, xr.DataArray):
+        crs = crs.attrs
+
+    if isinstance(crs, dict) and "grid_mapping_name" in crs:
+        return pyproj.CRS.from_cf(crs)
+
+    return pyproj.CRS.from_user_input(crs)
+
+
+def _get_projected_grid(obj, lon, lat, crs):
+    """1D x and y coords of a grid that is regular in ``crs``
+
+    The coords are taken from ``obj`` (``projection_x_coordinate`` and
+    ``projection_y_coordinate`` or ``grid_longitude`` and ``grid_latitude`` for rotated
+    grids) and checked against ``lon`` and ``lat`` or, if not available, inferred from
+    ``lon`` and ``lat``. Returns ``(x, y, transpose, transform, period)`` where
+    ``transform`` transforms lon and lat to x and y, and ``period`` is 360 for
+    geographic (e.g. rotated) crs and None otherwise.
+    """
+
+    import pyproj
+
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+
+    if lon.ndim != 2 or lon.shape != lat.shape:
+        raise ValueError("``crs`` can only be used for 2D ``lon`` and ``lat``")
+
+    transformer = pyproj.Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+    transform = transformer.transform
+    period = 360 if crs.is_geographic else None
+
+    axes = None
+    if isinstance(obj, xr.Dataset | xr.DataArray):
+        axes = _get_projected_coords(obj, lon.shape, crs)
+
+    if axes is None:
+        X, Y = transform(lon, lat)
+        axes = _regular_axes(X, Y)
+    else:
+        x, y, transpose = axes
+        idx = [np.unique(np.linspace(0, n - 1, 10).astype(int)) for n in lon.shape]
+        X, Y = transform(lon[np.ix_(*idx)], lat[np.ix_(*idx)])
+
+        if transpose:
+            X, Y = X.T, Y.T
+            idx = idx[::-1]
+
+        axes = _regular_axes(X, Y, x=x[idx[1]], y=y[idx[0]], period=period)
+        axes = None if axes is None else (x, y, transpose)
+
+    if axes is None:
+        raise ValueError(
+            "``lon`` and ``lat`` do not form a regular grid in the passed ``crs``"
+        )
+
+    return *axes, transform, period
+
+
+def _central_meridian(crs) -> float:
+    """longitude of the origin of a projected crs (0 if not defined)"""
+
+    operation = crs.coordinate_operation
+
+    if operation is not None:
+        for param in operation.params:
+            if param.name in _CENTRAL_MERIDIAN:
+                return float(np.rad2deg(param.value * param.unit_conversion_factor))
+
+    return 0.0
+
+
+def _has_cut(transform, lon) -> bool:
+    """whether the meridian ``lon`` is cut by the projection
+
+    The meridian is cut if points on either side of it are far apart in the projected
+    coordinates (e.g. ``lon_0 ± 180`` for cylindrical but not for azimuthal
+    projections).
+    """
+
+    x, y = transform(np.array([lon - 1e-3, lon + 1e-3, lon - 2e-3]), np.zeros(3))
+
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        return False
+
+    across = np.hypot(x[0] - x[1], y[0] - y[1])
+    along = np.hypot(x[0] - x[2], y[0] - y[2])
+
+    return bool(across > 100 * along)
+
+
+def _split_at_meridian(polygons, lon_0, *, eps=1e-9):
+    """split the polygons at the meridian opposite of ``lon_0``
+
+    Most projections are cut at ``lon_0 ± 180``, polygons crossing it would span the
+    whole map after the transformation. The polygons are shifted by ±360° and clipped
+    to ``[lon_0 - 180, lon_0 + 180]``, shrunk by ``eps`` such that no vertex lies on
+    the cut (which may be projected to either side of the map).
+    """
+
+    polygons = np.asarray(polygons, dtype=object)
+    box = shapely.box(lon_0 - 180 + eps, -90, lon_0 + 180 - eps, 90)
+
+    parts = [
+        shapely.intersection(shapely.transform(polygons, lambda xy: xy + [s, 0]), box)
+        for s in (-360, 0, 360)
+    ]
+
+    return shapely.union_all(np.stack(parts), axis=0)
+
+
+def _get_projected_coords(obj, shape, crs):
+
+    if crs.is_geographic:
+        x = _get_grid_coord(obj, "grid_longitude", "rlon")
+        y = _get_grid_coord(obj, "grid_latitude", "rlat")
+    else:
+        x = _get_grid_coord(obj, "projection_x_coordinate", "x")
+        y = _get_grid_coord(obj, "projection_y_coordinate", "y")
+
+    if x is None or y is None:
+        return None
+
+    if shape == (y.size, x.size):
+        transpose = False
+    elif shape == (x.size, y.size):
+        transpose = True
+    else:
+        return None
+
+    x, y = (_to_crs_units(coord, crs) for coord in (x, y))
+
+    return x, y, transpose
+
+
+def _to_crs_units(coord, crs):
+
+    values = np.asarray(coord, dtype=float)
+
+    # e.g. sea ice products are often given in km
+    unit = coord.attrs.get("units", "")
+    if unit in ("km", "kilometre", "kilometer", "kilometres", "kilometers"):
+        if not crs.is_geographic:
+            values = values * 1000 / crs.axis_info[0].unit_conversion_factor
+
+    return values
+
+
+def _regular_axes(X, Y, *, x=None, y=None, period=None, rtol=0.05):
+    """1D axes of 2D projected coords that are (almost) a meshgrid (or None)
+
+    The deviation from the 1D axes must be smaller than ``rtol`` times the grid spacing.
+    Returns ``(x, y, transpose)``, if ``x`` and ``y`` are not passed they are inferred
+    (as the mean of the 2D coords).
+    """
+
+    if not (np.isfinite(X).all() and np.isfinite(Y).all()):
+        return None
+
+    for transpose in (False, True):
+
+        X_, Y_ = (X.T, Y.T) if transpose else (X, Y)
+
+        x_ = X_.mean(axis=0) if x is None else x
+        y_ = Y_.mean(axis=1) if y is None else y
+
+        if x_.size < 2 or y_.size < 2:
+            continue
+
+        atol = rtol * min(np.abs(np.diff(x_)).min(), np.abs(np.diff(y_)).min())
+
+        d_x = X_ - x_
+        if period is not None:
+            d_x = (d_x + period / 2) % period - period / 2
+
+        if np.abs(d_x).max() <= atol and np.abs(Y_ - y_[:, None]).max() <= atol:
+            return x_, y_, transpose
+
+        # only infer the orientation if the axes are not given
+        if x is not None:
+            return None
+
+    return None
+
+
+def _get_grid_coord(obj, standard_name, name):
+    """1D coord with the given standard_name (or name) of obj"""
+
+    candidates = [
+        coord
+        for coord in obj.coords.values()
+        if coord.attrs.get("standard_name") == standard_name
+    ]
+
+    if not candidates and name in obj.coords:
+        candidates = [obj.coords[name]]
+
+    if len(candidates) != 1 or candidates[0].ndim != 1:
+        return None
+
+    return candidates[0]
+
+
+def _transform_polygons(
+    polygons, transform, *, max_segment_length, period=None, max_step=None
+):
+    """transform polygons to the coordinates of a grid
+
+    The polygons are segmentized before the transformation such that their edges
+    follow the curved lines in the target coordinates. For periodic target coordinates
+    (e.g. rotated longitudes, ``period=360``) the rings are unwrapped and the polygons
+    are repeated such that they cover ``[-period / 2, period / 2]``. Returns None if a
+    ring can not be transformed (e.g. if it encloses the pole of the target
+    coordinates) or if the transformed vertices are more than ``max_step`` apart.
+    """
+
+    polygons = shapely.segmentize(
+        np.asarray(polygons, dtype=object), max_segment_length
+    )
+
+    out = []
+    for polygon in polygons:
+
+        parts = []
+        for part in shapely.get_parts(polygon):
+
+            # e.g. lines from clipping the polygons
+            if not isinstance(part, shapely.Polygon) or part.is_empty:
+                continue
+
+            shell = _transform_ring(part.exterior.coords, transform, period, max_step)
+            if shell is None:
+                return None
+
+            holes = []
+            for interior in part.interiors:
+                hole = _transform_ring(interior.coords, transform, period, max_step)
+                if hole is None:
+                    return None
+
+                # unwrapping may place the hole one period away from the shell
+                if period is not None:
+                    shift = np.round((hole[0, 0] - shell[:, 0].mean()) / period)
+                    hole[:, 0] -= shift * period
+
+                holes.append(hole)
+
+            part = shapely.Polygon(shell, holes)
+            parts.append(part)
+
+            if period is not None:
+                x_min, _, x_max, _ = part.bounds
+                if x_min < -period / 2:
+                    parts.append(shapely.transform(part, lambda xy: xy + [period, 0]))
+                if x_max > period / 2:
+                    parts.append(shapely.transform(part, lambda xy: xy - [period, 0]))
+
+        out.append(shapely.MultiPolygon(parts))
+
+    return out
+
+
+def _transform_ring(coords, transform, period, max_step=None):
+
+    coords = np.asarray(coords, dtype=float)
+    x, y = transform(coords[:, 0], coords[:, 1])
+
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        return None
+
+    if period is not None:
+        x = np.unwrap(x, period=period)
+
+        # rings around the pole of the target coordinates can not be unwrapped
+        if not np.isclose(x[0], x[-1]):
+            return None
+
+    if max_step is not None:
+        if max(np.abs(np.diff(x)).max(), np.abs(np.diff(y)).max()) > max_step:
+            return None
+
+    return np.column_stack((x, y))
@@ -16,8 +16,10 @@ from regionmask.core.mask import (
     _inject_mask_docstring,
     _mask_2D,
     _mask_3D,
+    _mask_3D_frac,
     _mask_3D_frac_approx,
 )
+from regionmask.core.plan import _KINDS, MaskPlan, _grid_key
 from regionmask.core.plot import _plot, _plot_regions
 from regionmask.core.utils import (
     _is_180,
@@ -357,6 +359,7 @@ class Regions:
         wrap_lon: None | bool | Literal[180, 360] = None,
         flag: Literal["abbrevs", "names"] | None = "abbrevs",
         use_cf: bool | None = None,
+        crs=None,
     ) -> xr.DataArray:
 
         if self.overlap:
@@ -374,6 +377,7 @@ class Regions:
             method=method,
             wrap_lon=wrap_lon,
             use_cf=use_cf,
+            crs=crs,
             overlap=self.overlap,
         )
 
@@ -385,10 +389,14 @@ class Regions:
         if flag is not None:
             # see http://cfconventions.org/Data/cf-conventions/cf-conventions-1.8/cf-conventions.html#flags
 
-            # find detected regions (assign ALL regions?)
-            isnan = np.isnan(mask_2D.values)
-            numbers = np.unique(mask_2D.values[~isnan])
-            numbers = numbers.astype(int)
+            # find detected regions - assign all regions for lazy masks to avoid
+            # computing them
+            if mask_2D.chunks is None:
+                isnan = np.isnan(mask_2D.values)
+                numbers = np.unique(mask_2D.values[~isnan])
+                numbers = numbers.astype(int)
+            else:
+                numbers = np.asarray(self.numbers)
 
             flag_meanings = getattr(self[numbers], flag)
             # TODO: check for invalid characters
@@ -410,6 +418,8 @@ class Regions:
         method=None,
         wrap_lon: None | bool | Literal[180, 360] = None,
         use_cf: bool | None = None,
+        output: Literal["dense", "sparse"] = "dense",
+        crs=None,
     ) -> xr.DataArray:
 
         mask_3D = _mask_3D(
@@ -422,6 +432,8 @@ class Regions:
             wrap_lon=wrap_lon,
             overlap=self.overlap,
             use_cf=use_cf,
+            crs=crs,
+            output=output,
         )
 
         numbers = mask_3D.region.values
@@ -444,6 +456,9 @@ class Regions:
         drop: bool = True,
         wrap_lon: None | bool | Literal[180, 360] = None,
         use_cf: bool | None = None,
+        output: Literal["dense", "sparse"] = "dense",
+        n_samples: int = 10,
+        dtype: Literal["float64", "float32", "uint8"] = "float64",
     ) -> xr.DataArray:
 
         mask_3D = _mask_3D_frac_approx(
@@ -455,6 +470,9 @@ class Regions:
             wrap_lon=wrap_lon,
             overlap=self.overlap,  # as_3D is always True
             use_cf=use_cf,
+            output=output,
+            n_samples=n_samples,
+            dtype=dtype,
         )
 
         numbers = mask_3D.region.values
@@ -469,6 +487,117 @@ class Regions:
 
     mask_3D_frac_approx.__doc__ = _inject_mask_docstring(which="frac", is_gpd=False)
 
+    def mask_3D_frac(
+        self,
+        lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+        lat: np.typing.ArrayLike | xr.DataArray | None = None,
+        *,
+        drop: bool = True,
+        wrap_lon: None | bool | Literal[180, 360] = None,
+        use_cf: bool | None = None,
+        output: Literal["dense", "sparse"] = "dense",
+        lon_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+        lat_bounds: np.typing.ArrayLike | xr.DataArray | None = None,
+    ) -> xr.DataArray:
+
+        mask_3D = _mask_3D_frac(
+            polygons=self.polygons,
+            numbers=self.numbers,
+            lon_or_obj=lon_or_obj,
+            lat=lat,
+            drop=drop,
+            wrap_lon=wrap_lon,
+            overlap=self.overlap,  # as_3D is always True
+            use_cf=use_cf,
+            output=output,
+            lon_bounds=lon_bounds,
+            lat_bounds=lat_bounds,
+        )
+
+        numbers = mask_3D.region.values
+        abbrevs = self[numbers].abbrevs
+        names = self[numbers].names
+
+        mask_3D = mask_3D.assign_coords(
+            abbrevs=("region", abbrevs), names=("region", names)
+        )
+
+        return mask_3D
+
+    mask_3D_frac.__doc__ = _inject_mask_docstring(which="frac_exact", is_gpd=False)
+
+    def plan_mask(
+        self,
+        lon_or_obj: np.typing.ArrayLike | xr.DataArray | xr.Dataset,
+        lat: np.typing.ArrayLike | xr.DataArray | None = None,
+        *,
+        kind: Literal["2D", "3D", "frac"] = "3D",
+        **kwargs,
+    ) -> MaskPlan:
+        """create a mask once and reuse it for data on the same grid
+
+        Parameters
+        ----------
+        lon_or_obj : object or array_like
+            Longitude array or an object where the longitude and latitude can be
+            retrieved from (see :py:meth:`Regions.mask`).
+        lat : array_like, optional
+            If ``lon_or_obj`` is a longitude array, the latitude needs to be passed.
+        kind : "2D" | "3D" | "frac", default: "3D"
+            Which mask to create: :py:meth:`Regions.mask` ("2D"),
+            :py:meth:`Regions.mask_3D` ("3D"), or :py:meth:`Regions.mask_3D_frac`
+            ("frac").
+        **kwargs
+            Passed to the mask method, e.g. ``drop``, ``wrap_lon``, or ``output``.
+
+        Returns
+        -------
+        plan : MaskPlan
+            Holds the mask and a fingerprint of the grid. ``plan.apply(ds)`` returns
+            the mask after checking that the grid of ``ds`` is unchanged and
+            ``plan.matches(ds)`` only checks the grid.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from regionmask import Regions
+
+        >>> r = Regions([((0, 0), (0, 10), (10, 10), (10, 0))])
+        >>> lon, lat = np.arange(-5, 15, 2.5), np.arange(-5, 15, 2.5)
+
+        >>> plan = r.plan_mask(lon, lat)
+        >>> plan
+        <regionmask.MaskPlan (kind='3D', region: 1, lat: 8, lon: 8)>
+        >>> plan.matches(lon, lat)
+        True
+        >>> plan.matches(lon + 1, lat)
+        False
+        >>> mask = plan.apply(lon, lat)
+        """
+
+        if kind not in _KINDS:
+            raise ValueError(f"'kind' must be one of {_KINDS}, found {kind!r}")
+
+        mask: xr.DataArray
+        if kind == "2D":
+            mask = self.mask(lon_or_obj, lat, **kwargs)
+        elif kind == "3D":
+            mask = self.mask_3D(lon_or_obj, lat, **kwargs)
+        else:
+            mask = self.mask_3D_frac(lon_or_obj, lat, **kwargs)
+
+        use_cf = kwargs.get("use_cf")
+        grid_key = _grid_key(
+            lon_or_obj,
+            lat,
+            use_cf,
+            kind=kind,
+            lon_bounds=kwargs.get("lon_bounds"),
+            lat_bounds=kwargs.get("lat_bounds"),
+        )
+
+        return MaskPlan(mask, kind=kind, grid_key=grid_key, use_cf=use_cf)
+
     def to_dataframe(self) -> pd.DataFrame:
         """Convert this region into a pandas.DataFrame, excluding polygons.
 
@@ -194,6 +194,31 @@ def equally_spaced(*args) -> bool:
     return all(np.allclose(d_arg[0], d_arg) for d_arg in d_args)
 
 
+def _is_monotonic(*args) -> bool:
+    """check if all args are 1D and strictly increasing or decreasing"""
+
+    args_ = [np.asarray(arg) for arg in args]
+
+    if any(arg.ndim != 1 or arg.size < 2 for arg in args_):
+        return False
+
+    d_args = (np.diff(arg) for arg in args_)
+
+    return all((d_arg > 0).all() or (d_arg < 0).all() for d_arg in d_args)
+
+
+def _infer_bounds(coord: ArrayLike) -> np.ndarray:
+    """infer the cell bounds of monotonic 1D coords (midpoints between the coords)"""
+
+    coord = np.asarray(coord, dtype=float)
+
+    mid = (coord[:-1] + coord[1:]) / 2
+    first = coord[0] - (mid[0] - coord[0])
+    last = coord[-1] + (coord[-1] - mid[-1])
+
+    return np.concatenate([[first], mid, [last]])
+
+
 def _equally_spaced_on_split_lon(lon) -> bool:
 
     lon = np.asarray(lon)
@@ -223,21 +248,35 @@ def _find_splitpoint(lon: ArrayLike) -> int:
     return split_point.item() + 1
 
 
-def _sample_coords(coord: ArrayLike) -> np.ndarray:
-    """Sample coords for percentage overlap."""
+def _sample_coords(
+    coord: ArrayLike, *, d_coord: float | None = None, n: int = 10
+) -> np.ndarray:
+    """Sample coords for percentage overlap.
 
-    n = 10
+    ``d_coord`` is the spacing of the coordinates, inferred from ``coord`` if not given
+    (must be passed for a single coordinate). Each cell is sampled with ``n`` points.
+    """
 
     coord = np.asarray(coord)
 
-    d_coord = coord[1] - coord[0]
+    # the longitude may be wrapped (e.g. 0..178, -180..-2) - sample the unwrapped
+    # coords and undo the unwrapping afterwards (does not change latitudes)
+    coord_unwrapped = np.unwrap(coord, period=360)
+
+    if d_coord is None:
+        d_coord = coord_unwrapped[1] - coord_unwrapped[0]
 
     n_cells = coord.size
 
-    left = coord[0] - d_coord / 2 + d_coord / (n * 2)
-    right = coord[-1] + d_coord / 2 - d_coord / (n * 2)
+    left = coord_unwrapped[0] - d_coord / 2 + d_coord / (n * 2)
+    right = coord_unwrapped[-1] + d_coord / 2 - d_coord / (n * 2)
+
+    sampled = np.linspace(left, right, n_cells * n)
+
+    if np.array_equal(coord, coord_unwrapped):
+        return sampled
 
-    return np.linspace(left, right, n_cells * n)
+    return sampled + np.repeat(coord - coord_unwrapped, n)
 
 
 def unpackbits(numbers: np.ndarray, num_bits: int) -> np.ndarray:
@@ -29,4 +29,9 @@ def assert_no_warnings():
 
 has_cartopy, requires_cartopy = _importorskip("cartopy")
 has_cf_xarray, requires_cf_xarray = _importorskip("cf_xarray")
+has_dask, requires_dask = _importorskip("dask")
 has_matplotlib, requires_matplotlib = _importorskip("matplotlib")
+has_numba, requires_numba = _importorskip("numba")
+has_rasterio, requires_rasterio = _importorskip("rasterio")
+has_scipy, requires_scipy = _importorskip("scipy")
+has_sparse, requires_sparse = _importorskip("sparse")
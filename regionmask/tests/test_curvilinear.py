@@ -0,0 +1,203 @@
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.curvilinear import _find_period, _index_transform
+from regionmask.core.mask import _use_index_space
+from regionmask.tests import requires_scipy, requires_sparse
+
+# regions crossing the antimeridian, the fold, and with a hole
+POLYGONS = [
+    shapely.box(-180, 60, 180, 90),
+    shapely.box(-30, -40, 40, 40).difference(shapely.box(-5, -5, 5, 5)),
+    shapely.MultiPolygon(
+        [shapely.box(100, 40, 180, 70), shapely.box(-180, 40, -120, 70)]
+    ),
+    shapely.box(50, 70, 100, 85),
+    shapely.Point(-150, -20).buffer(45),
+    shapely.Polygon([(60, -30), (90, -20), (85, 20), (65, 10)]),
+]
+
+
+def _tripolar(ni=180, dlat=2.0, lat_join=60.0, n_cap=15, halo=True):
+    """tripolar grid, the northern cap uses elliptic coordinates (poles over land)"""
+
+    nu = np.arange(ni) * 2 * np.pi / ni
+    lat = np.arange(-78, lat_join, dlat)
+
+    lon_south = np.broadcast_to(np.rad2deg(nu), (lat.size, ni))
+    lat_south = np.broadcast_to(lat[:, np.newaxis], (lat.size, ni))
+
+    # stereographic plane
+    radius = 2 * np.tan(np.deg2rad(90 - lat_join) / 2)
+    mu_max = 2.5
+    a = radius / np.cosh(mu_max)
+    mu = mu_max * (1 - np.arange(n_cap + 1) / n_cap)
+
+    x = a * np.cosh(mu[:, np.newaxis]) * np.cos(nu)
+    y = a * np.sinh(mu[:, np.newaxis]) * np.sin(nu)
+
+    lon_north = np.rad2deg(np.arctan2(y, x))
+    lat_north = 90 - np.rad2deg(2 * np.arctan(np.hypot(x, y) / 2))
+
+    lon = np.vstack([lon_south, lon_north]) + 73
+    lat = np.vstack([lat_south, lat_north])
+
+    if halo:
+        lon = np.hstack([lon, lon[:, :2]])
+        lat = np.hstack([lat, lat[:, :2]])
+
+    lon = (lon + 180) % 360 - 180
+
+    return xr.Dataset(coords={"lon": (("y", "x"), lon), "lat": (("y", "x"), lat)})
+
+
+def _rotated(n=120, d=0.5):
+    """regional grid on rotated coordinates"""
+
+    r = (np.arange(n) - n / 2) * d + 0.013
+    lon_rot, lat_rot = np.deg2rad(np.meshgrid(r, r))
+
+    xyz = np.stack(
+        [
+            np.cos(lat_rot) * np.cos(lon_rot),
+            np.cos(lat_rot) * np.sin(lon_rot),
+            np.sin(lat_rot),
+        ]
+    )
+
+    # rotate the equator to 50°N, 10°E
+    alpha, beta = np.deg2rad(50), np.deg2rad(10)
+    rot_y = np.array(
+        [
+            [np.cos(alpha), 0, -np.sin(alpha)],
+            [0, 1, 0],
+            [np.sin(alpha), 0, np.cos(alpha)],
+        ]
+    )
+    rot_z = np.array(
+        [[np.cos(beta), -np.sin(beta), 0], [np.sin(beta), np.cos(beta), 0], [0, 0, 1]]
+    )
+
+    x, y, z = np.einsum("ij,jkl->ikl", rot_z @ rot_y, xyz)
+
+    lon = np.rad2deg(np.arctan2(y, x))
+    lat = np.rad2deg(np.arcsin(z))
+
+    return xr.Dataset(coords={"lon": (("y", "x"), lon), "lat": (("y", "x"), lat)})
+
+
+def test_find_period() -> None:
+
+    ds = _tripolar(halo=True)
+    assert _find_period(ds.lon.values, ds.lat.values) == 180
+
+    ds = _tripolar(halo=False)
+    assert _find_period(ds.lon.values, ds.lat.values) == 180
+
+    ds = _rotated()
+    assert _find_period(ds.lon.values, ds.lat.values) is None
+
+
+@requires_scipy
+def test_index_transform() -> None:
+
+    ds = _tripolar()
+    lon, lat = ds.lon.values, ds.lat.values
+
+    transform, period = _index_transform(lon, lat)
+    assert period == 180
+
+    # cell centers between the gridpoints
+    lon_c = (lon[1:-1, 10:20] + lon[1:-1, 11:21]) / 2
+    lat_c = (lat[1:-1, 10:20] + lat[1:-1, 11:21]) / 2
+
+    i, j = transform(lon_c, lat_c)
+
+    jj, ii = np.mgrid[1 : lon.shape[0] - 1, 10:20]
+    np.testing.assert_allclose(i, ii + 0.5, atol=0.05)
+    np.testing.assert_allclose(j, jj, atol=0.05)
+
+
+@requires_scipy
+def test_index_transform_outside() -> None:
+
+    ds = _rotated()
+
+    transform, period = _index_transform(ds.lon.values, ds.lat.values)
+    assert period is None
+
+    i, j = transform(np.array([10.0, -100.0]), np.array([50.0, -40.0]))
+
+    assert np.isfinite(i[0]) and np.isfinite(j[0])
+    assert np.isnan(i[1]) and np.isnan(j[1])
+
+
+def test_use_index_space(monkeypatch) -> None:
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 0)
+
+    ds = _tripolar()
+    lon, lat = ds.lon.values, ds.lat.values
+
+    assert _use_index_space(lon, lat, False) is regionmask.core.mask.has_scipy
+    assert not _use_index_space(lon, lat, True)
+    assert not _use_index_space(lon[0], lat[0], False)
+
+    # small grids
+    assert not _use_index_space(lon[:5], lat[:5], False)
+
+    lon_ = lon.copy()
+    lon_[0, 0] = np.nan
+    assert not _use_index_space(lon_, lat, False)
+
+    # lon spans more than 360°
+    assert not _use_index_space(lon + np.arange(lon.shape[1]), lat, False)
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 10**12)
+    assert not _use_index_space(lon, lat, False)
+
+
+@requires_scipy
+@pytest.mark.parametrize(
+    "ds", [_tripolar(halo=True), _tripolar(halo=False), _rotated()]
+)
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("mask", {}),
+        ("mask_3D", {}),
+        pytest.param("mask_3D", {"output": "sparse"}, marks=requires_sparse),
+    ],
+)
+def test_mask_index_space(ds, method, kwargs, monkeypatch) -> None:
+
+    regions = regionmask.Regions(POLYGONS, overlap=method == "mask_3D")
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 10**12)
+    expected = getattr(regions, method)(ds, **kwargs)
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 0)
+    result = getattr(regions, method)(ds, **kwargs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@requires_scipy
+def test_mask_index_space_gridpoints_on_edges(monkeypatch) -> None:
+
+    ds = _tripolar(halo=False)
+
+    # region boundaries along gridlines
+    regions = regionmask.Regions([shapely.box(-37, -40, 13, 20)], overlap=True)
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 10**12)
+    expected = regions.mask_3D(ds)
+
+    monkeypatch.setattr("regionmask.core.mask._INDEX_SPACE_MIN_CELLS", 0)
+    result = regions.mask_3D(ds)
+
+    xr.testing.assert_equal(result, expected)
+    assert result.sum() > 0
@@ -0,0 +1,216 @@
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.healpix import (
+    _get_healpix_grid,
+    _nest2lonlat,
+    _nest2ring,
+    _parse_healpix,
+    _ring2lonlat,
+)
+from regionmask.tests import requires_sparse
+
+# regions crossing the antimeridian, including the poles, and with a hole
+POLYGONS = [
+    shapely.box(-180, 60, 180, 90),
+    shapely.MultiPolygon(
+        [shapely.box(100, 40, 180, 70), shapely.box(-180, 40, -120, 70)]
+    ),
+    shapely.Polygon([(10, -30), (60, -10), (40, 30), (0, 10)]),
+    shapely.box(-180, -90, 180, -85.3),
+    shapely.box(-20, -20, 20, 20).difference(shapely.box(-5, -5, 5, 5)),
+    shapely.Point(100, -87).buffer(2.3),
+]
+
+
+def _healpix_ds(nside, nest=True, cell_ids=None):
+
+    npix = 12 * nside * nside
+    cell_ids = np.arange(npix) if cell_ids is None else cell_ids
+
+    lon, lat = (_nest2lonlat if nest else _ring2lonlat)(cell_ids, nside)
+
+    attrs = {
+        "grid_mapping_name": "healpix",
+        "healpix_nside": nside,
+        "healpix_order": "nest" if nest else "ring",
+    }
+
+    coords = {
+        "cell": ("cell", cell_ids),
+        "lon": ("cell", lon),
+        "lat": ("cell", lat),
+        "crs": ((), 0, attrs),
+    }
+
+    return xr.Dataset(coords=coords)
+
+
+def _drop_grid_mapping(ds):
+
+    ds = ds.copy()
+    ds["crs"].attrs = {}
+
+    return ds
+
+
+def _raise(*args, **kwargs):
+    raise AssertionError("all gridpoints were tested")
+
+
+@pytest.mark.parametrize("nside", [1, 2, 16])
+def test_nest_ring(nside) -> None:
+
+    pix = np.arange(12 * nside * nside)
+
+    ring = _nest2ring(pix, nside)
+    np.testing.assert_equal(np.sort(ring), pix)
+
+    np.testing.assert_allclose(_nest2lonlat(pix, nside), _ring2lonlat(ring, nside))
+
+    # the pixels have equal area
+    lon, lat = _ring2lonlat(pix, nside)
+    np.testing.assert_allclose(np.sin(np.deg2rad(lat)).mean(), 0, atol=1e-12)
+
+
+def test_healpix_base_pixels() -> None:
+
+    lon, lat = _nest2lonlat(np.arange(12), 1)
+
+    expected_lon = [45, 135, 225, 315, 0, 90, 180, 270, 45, 135, 225, 315]
+    expected_lat = np.rad2deg(np.arcsin(2 / 3)) * np.repeat([1, 0, -1], 4)
+
+    np.testing.assert_allclose(lon, expected_lon)
+    np.testing.assert_allclose(lat, expected_lat, atol=1e-12)
+
+
+def test_parse_healpix() -> None:
+
+    attrs = {"grid_mapping_name": "healpix", "healpix_nside": 8}
+    assert _parse_healpix(attrs) == (8, True)
+    assert _parse_healpix(attrs | {"healpix_order": "ring"}) == (8, False)
+    assert _parse_healpix(xr.DataArray(0, attrs=attrs)) == (8, True)
+
+    # xdggs
+    attrs = {"grid_name": "healpix", "level": 3, "indexing_scheme": "nested"}
+    assert _parse_healpix(attrs) == (8, True)
+
+    assert _parse_healpix({"grid_mapping_name": "latitude_longitude"}) is None
+    assert _parse_healpix("EPSG:4326") is None
+
+    with pytest.raises(ValueError, match="Unknown HEALPix order"):
+        _parse_healpix({"grid_name": "healpix", "level": 3, "indexing_scheme": "a"})
+
+    with pytest.raises(ValueError, match="The HEALPix grid has no 'level'"):
+        _parse_healpix({"grid_name": "healpix"})
+
+
+def test_get_healpix_grid() -> None:
+
+    ds = _healpix_ds(8, nest=False)
+
+    nside, nest, cell_ids = _get_healpix_grid(ds, ds.lon, ds.lat)
+    assert nside == 8
+    assert not nest
+    np.testing.assert_equal(cell_ids, np.arange(768))
+
+    # no grid mapping
+    ds_ = _drop_grid_mapping(ds)
+    assert _get_healpix_grid(ds_, ds_.lon, ds_.lat) is None
+
+    # not the centers of the grid - only raises if passed explicitly
+    ds_ = ds.assign_coords(lon=ds.lon + 1)
+    assert _get_healpix_grid(ds_, ds_.lon, ds_.lat) is None
+
+    with pytest.raises(ValueError, match="not the centers of the HEALPix grid"):
+        _get_healpix_grid(ds_, ds_.lon, ds_.lat, grid=(8, False))
+
+    with pytest.raises(ValueError, match="Expected 3072 HEALPix cells"):
+        _get_healpix_grid(None, ds.lon, ds.lat, grid=(16, False))
+
+    with pytest.raises(ValueError, match="require 1D ``lon`` and ``lat`` DataArrays"):
+        _get_healpix_grid(None, ds.lon.values, ds.lat.values, grid=(8, False))
+
+    # nside is not a power of 2
+    ds = _healpix_ds(6, nest=False)
+    assert _get_healpix_grid(ds, ds.lon, ds.lat) is None
+
+
+@pytest.mark.parametrize("nside", [1, 4, 64])
+@pytest.mark.parametrize("nest", [True, False])
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("mask", {}),
+        ("mask_3D", {}),
+        pytest.param("mask_3D", {"output": "sparse"}, marks=requires_sparse),
+    ],
+)
+def test_mask_healpix(nside, nest, method, kwargs, monkeypatch) -> None:
+
+    ds = _healpix_ds(nside, nest=nest)
+    regions = regionmask.Regions(POLYGONS, overlap=method == "mask_3D")
+
+    expected = getattr(regions, method)(_drop_grid_mapping(ds), **kwargs)
+
+    monkeypatch.setattr("regionmask.core.mask._query_contains", _raise)
+
+    result = getattr(regions, method)(ds, **kwargs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@pytest.mark.parametrize("nest", [True, False])
+def test_mask_healpix_subset(nest, monkeypatch) -> None:
+
+    rng = np.random.default_rng(0)
+    cell_ids = rng.choice(12 * 32 * 32, 5000, replace=False)
+
+    ds = _healpix_ds(32, nest=nest, cell_ids=cell_ids)
+    regions = regionmask.Regions(POLYGONS, overlap=True)
+
+    expected = regions.mask_3D(_drop_grid_mapping(ds))
+
+    monkeypatch.setattr("regionmask.core.mask._query_contains", _raise)
+
+    result = regions.mask_3D(ds)
+
+    xr.testing.assert_equal(result, expected)
+
+
+def test_mask_healpix_lon_360(monkeypatch) -> None:
+
+    ds = _healpix_ds(32)
+    polygons = [shapely.box(170, -30, 200, 30), shapely.box(0, 80, 360, 90)]
+    regions = regionmask.Regions(polygons, overlap=True)
+
+    expected = regions.mask_3D(_drop_grid_mapping(ds))
+
+    monkeypatch.setattr("regionmask.core.mask._query_contains", _raise)
+
+    result = regions.mask_3D(ds)
+
+    xr.testing.assert_equal(result, expected)
+
+
+def test_mask_healpix_crs(monkeypatch) -> None:
+
+    ds = _healpix_ds(32, nest=False)
+    regions = regionmask.Regions(POLYGONS, overlap=True)
+    crs = ds["crs"].attrs
+
+    expected = regions.mask_3D(_drop_grid_mapping(ds))
+
+    monkeypatch.setattr("regionmask.core.mask._query_contains", _raise)
+
+    result = regions.mask_3D(_drop_grid_mapping(ds), crs=crs)
+    xr.testing.assert_equal(result, expected)
+
+    result = regions.mask_3D(ds.lon, ds.lat, crs=ds["crs"])
+    xr.testing.assert_equal(result, expected)
+
+    with pytest.raises(ValueError, match="not the centers of the HEALPix grid"):
+        regions.mask_3D(ds.lon + 1, ds.lat, crs=crs)
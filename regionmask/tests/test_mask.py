@@ -1,23 +1,40 @@
 import copy
-from collections.abc import Callable
+import logging
 
 import numpy as np
 import pytest
+import shapely
 import xarray as xr
-from affine import Affine
 from shapely.geometry import Polygon, box
 
-from regionmask import Regions
+from regionmask import Regions, set_options
 from regionmask.core.mask import (
+    _choose_shapely_strategy,
     _determine_method,
+    _edgepoints_contained,
     _inject_mask_docstring,
+    _is_permuted_equally_spaced,
+    _mask_numpy,
+    _mask_quadtree,
     _mask_rasterize,
     _mask_rasterize_no_offset,
+    _mask_scanline,
+    _mask_scanline_pairs,
     _mask_shapely,
+    _query_contains,
+    _query_contains_numba,
+    _rasterize_window_bounds,
+    _separable_axes,
     _transform_from_latlon,
+    _use_rasterize_windows,
 )
 from regionmask.core.utils import _wrapAngle, create_lon_lat_dataarray_from_bounds
-from regionmask.tests import assert_no_warnings
+from regionmask.tests import (
+    assert_no_warnings,
+    requires_numba,
+    requires_rasterio,
+    requires_sparse,
+)
 from regionmask.tests.utils import (
     dummy_ds,
     dummy_region,
@@ -27,8 +44,10 @@ from regionmask.tests.utils import (
     expected_mask_3D,
 )
 
-MASK_FUNCS: list[Callable] = [
-    _mask_rasterize,
+MASK_FUNCS: list = [
+    pytest.param(_mask_rasterize, marks=requires_rasterio),
+    _mask_quadtree,
+    _mask_scanline,
     _mask_shapely,
 ]
 
@@ -473,7 +492,7 @@ lon_2D = [[0.5, 1.5], [0.5, 1.5]]
 lat_2D = [[0.5, 0.5], [1.5, 1.5]]
 
 
-@pytest.mark.parametrize("method", MASK_METHODS_IRREGULAR)
+@pytest.mark.parametrize("method", MASK_METHODS)
 def test_mask_2D(method) -> None:
 
     dims = ("lat_idx", "lon_idx")
@@ -486,8 +505,59 @@ def test_mask_2D(method) -> None:
     xr.testing.assert_equal(result, expected)
 
 
-@pytest.mark.parametrize("lon", [lon_2D, [0, 1, 3], 0])
-@pytest.mark.parametrize("lat", [lat_2D, [0, 1, 3], 0])
+@pytest.mark.parametrize("transpose", [True, False])
+@pytest.mark.parametrize("as_3D", [True, False])
+def test_mask_separable_2D(transpose, as_3D, monkeypatch) -> None:
+
+    lon = np.arange(-179, 180, 2.0)
+    lat = np.arange(89, -90, -2.0)
+    LON, LAT = np.meshgrid(lon, lat)
+
+    if transpose:
+        LON, LAT = LON.T, LAT.T
+
+    polygons = [box(-100, -50, 60, 70), box(-180, -90, -170, -80)]
+    numbers = [0, 1]
+
+    kwargs = {"wrap_lon": 180, "edgepoints": True, "as_3D": as_3D}
+
+    expected = _mask_numpy(polygons, numbers, LON, LAT, method="shapely", **kwargs)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("shapely was used")
+
+    monkeypatch.setattr("regionmask.core.mask._mask_shapely", _raise)
+
+    result = _mask_numpy(polygons, numbers, LON, LAT, **kwargs)
+
+    assert result.flags["C_CONTIGUOUS"]
+    np.testing.assert_equal(result, expected)
+
+
+def test_separable_axes() -> None:
+
+    lon = np.arange(3.0)
+    lat = np.arange(2.0)
+    LON, LAT = np.meshgrid(lon, lat)
+
+    result = _separable_axes(LON, LAT)
+    np.testing.assert_equal(result, (lon, lat, False))
+
+    result = _separable_axes(LON.T, LAT.T)
+    np.testing.assert_equal(result, (lon, lat, True))
+
+    assert _separable_axes(lon_2D_irregular, lat_2D_irregular) is None
+    assert _separable_axes(lon, lat) is None
+    assert _separable_axes(LON, LAT.T) is None
+
+
+# curvilinear
+lon_2D_irregular = [[0.5, 1.5], [0.6, 1.5]]
+lat_2D_irregular = [[0.5, 0.5], [1.5, 1.6]]
+
+
+@pytest.mark.parametrize("lon", [lon_2D_irregular, [0, 1, 3], 0])
+@pytest.mark.parametrize("lat", [lat_2D_irregular, [0, 1, 3], 0])
 def test_mask_rasterize_irregular(lon, lat) -> None:
 
     with pytest.raises(ValueError, match="`lat` and `lon` must be equally spaced"):
@@ -515,12 +585,15 @@ def test_mask_xarray_in_out_2D(method) -> None:
     xr.testing.assert_equal(result, expected)
 
 
+@requires_rasterio
 @pytest.mark.parametrize("lon_start", [0, 1, -5])
 @pytest.mark.parametrize("dlon", [1, 2])
 @pytest.mark.parametrize("lat_start", [0, 1, -5])
 @pytest.mark.parametrize("dlat", [1, 2])
 def test_transform_from_latlon(lon_start, dlon, lat_start, dlat) -> None:
 
+    from affine import Affine
+
     lon = np.arange(lon_start, 20, dlon)
     lat = np.arange(lat_start, 20, dlat)
 
@@ -535,6 +608,7 @@ def test_transform_from_latlon(lon_start, dlon, lat_start, dlat) -> None:
     assert np.allclose(np.array(r), expected)
 
 
+@requires_rasterio
 @pytest.mark.parametrize("a, b", [(0, 1), (4, 5)])
 @pytest.mark.parametrize("fill", [np.nan, 3])
 def test_rasterize(a, b, fill) -> None:
@@ -748,6 +822,7 @@ def test_mask_interior_and_edge(method, regions, ds_US, is_360) -> None:
     xr.testing.assert_equal(result, expected)
 
 
+@requires_rasterio
 @pytest.mark.xfail(
     raises=AssertionError, reason="https://github.com/mapbox/rasterio/issues/1844"
 )
@@ -781,6 +856,222 @@ def test_deg45_rasterize_shapely_equal(regions) -> None:
     xr.testing.assert_equal(shapely, rasterize)
 
 
+@pytest.mark.parametrize("as_3D", [True, False])
+def test_mask_scanline_shapely_equal(as_3D) -> None:
+
+    # Gaussian grid, unsorted lon and descending lat
+    lat = np.rad2deg(np.arcsin(np.polynomial.legendre.leggauss(48)[0]))[::-1]
+    lon = np.roll(np.arange(-180, 180, 3.75), 10)
+
+    polygons = [
+        box(-100, -50, 60, 70).difference(box(-60, -20, 20, 30)),  # with hole
+        shapely.MultiPolygon([box(120, -80, 179, -10), box(-179, 10, -150, 80)]),
+        shapely.Point(0, 0).buffer(40),  # overlaps
+        shapely.Polygon([(0, -90), (90, 20), (170, -60), (90, -30)]),
+        Polygon(),
+    ]
+    numbers = [0, 1, 2, 3, 4]
+
+    result = _mask_scanline(lon, lat, polygons, numbers, as_3D=as_3D)
+    expected = _mask_shapely(lon, lat, polygons, numbers, as_3D=as_3D)
+
+    np.testing.assert_equal(result, expected)
+
+    result = _mask_scanline_pairs(lon, lat, polygons)
+    expected = _query_contains(lon, lat, polygons)
+
+    np.testing.assert_equal(result, expected)
+
+
+@pytest.mark.parametrize("as_3D", [True, False])
+@pytest.mark.parametrize("leaf_size", [1, 16, 1024])
+@pytest.mark.parametrize("desc", [True, False])
+def test_mask_quadtree_shapely_equal(as_3D, leaf_size, desc) -> None:
+
+    lat = np.rad2deg(np.arcsin(np.polynomial.legendre.leggauss(96)[0]))
+    lon = np.arange(-180, 180, 1.875)
+
+    if desc:
+        lon, lat = lon[::-1], lat[::-1]
+
+    t = np.linspace(0, 2 * np.pi, 500, endpoint=False)
+    rough = np.c_[80 * np.cos(t), (50 + 5 * np.sin(23 * t)) * np.sin(t)]
+
+    polygons = [
+        box(-100, -50, 60, 70).difference(box(-60, -20, 20, 30)),  # with hole
+        shapely.MultiPolygon([box(120, -80, 179, -10), box(-179, 10, -150, 80)]),
+        shapely.Polygon(rough),  # overlaps
+        box(0.1, 0.1, 0.2, 0.2),  # contains no gridpoint
+        Polygon(),
+    ]
+    numbers = [0, 1, 2, 3, 4]
+
+    result = _mask_quadtree(
+        lon, lat, polygons, numbers, as_3D=as_3D, leaf_size=leaf_size
+    )
+    expected = _mask_shapely(lon, lat, polygons, numbers, as_3D=as_3D)
+
+    np.testing.assert_equal(result, expected)
+
+
+def test_mask_quadtree_used(monkeypatch) -> None:
+
+    lon = np.arange(-179.5, 180, 5.0)
+    lat = np.arange(89.5, -90, -5.0)
+    # with overlap=None a 3D mask is created
+    regions = Regions([box(-100, -50, 60, 70), box(0, -90, 10, -60)], overlap=False)
+
+    expected = regions.mask(lon, lat)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("quadtree was not used")
+
+    monkeypatch.setattr("regionmask.core.mask._QUADTREE_MIN_CELLS", 0)
+    monkeypatch.setattr("regionmask.core.mask._mask_rasterize", _raise)
+    monkeypatch.setattr("regionmask.core.mask._mask_scanline", _raise)
+
+    result = regions.mask(lon, lat)
+
+    xr.testing.assert_identical(result, expected)
+
+
+def test_mask_quadtree_not_used_3D(monkeypatch) -> None:
+
+    lon = np.arange(-179.5, 180, 5.0)
+    lat = np.arange(89.5, -90, -5.0)
+    regions = Regions([box(-100, -50, 60, 70), box(0, -90, 10, 0)], overlap=True)
+
+    expected = regions.mask_3D(lon, lat)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("quadtree was used")
+
+    monkeypatch.setattr("regionmask.core.mask._QUADTREE_MIN_CELLS", 0)
+    monkeypatch.setattr("regionmask.core.mask._mask_quadtree", _raise)
+
+    result = regions.mask_3D(lon, lat)
+
+    xr.testing.assert_identical(result, expected)
+
+
+def _query_contains_points(LON, LAT, polygons):
+    # reference implementation using an STRtree over Point objects
+
+    points = shapely.points(LON.ravel() - 1 * 10**-8, LAT.ravel() - 1 * 10**-10)
+    a, b = shapely.STRtree(points).query(polygons, predicate="contains")
+
+    order = np.lexsort((b, a))
+    return a[order], b[order]
+
+
+@requires_numba
+def test_query_contains_numba() -> None:
+
+    geoms = [
+        box(-100, -50, 60, 70).difference(box(-60, -20, 20, 30)),  # with hole
+        shapely.MultiPolygon([box(120, -80, 179, -10), box(-179, 10, -150, 80)]),
+        shapely.Point(0, 0).buffer(40),  # overlaps
+        shapely.Polygon([(0, -90), (90, 20), (170, -60), (90, -30)]),
+        Polygon(),
+    ]
+    polygons = np.array(geoms, dtype=object)
+
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-180, 180, 20_000)
+    lat = rng.uniform(-90, 90, 20_000)
+    # gridpoints on the edges and NaN
+    lon[:4] = [-100, 0, 60, np.nan]
+    lat[:4] = [0, 70, 0, 0]
+
+    result = _query_contains_numba(lon, lat, polygons)
+    expected = _query_contains(lon, lat, polygons, is_unstructured=True)
+
+    np.testing.assert_equal(result, expected)
+
+    # only empty polygons
+    result = _query_contains_numba(lon, lat, polygons[-1:])
+    assert result[0].size == 0
+
+
+@requires_numba
+def test_mask_unstructured_numba(monkeypatch) -> None:
+
+    lon = np.arange(-179.5, 180, 5.0)
+    lat = np.arange(-89.5, 90, 5.0)
+    LON, LAT = np.meshgrid(lon, lat)
+    LON = xr.DataArray(LON.ravel(), dims="cell")
+    LAT = xr.DataArray(LAT.ravel(), dims="cell")
+
+    regions = Regions([box(-100, -50, 60, 70), box(0, -90, 10, 0)], overlap=True)
+
+    expected = regions.mask_3D(LON, LAT)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("numba was not used")
+
+    monkeypatch.setattr("regionmask.core.mask._NUMBA_MIN_POINTS", 0)
+    monkeypatch.setattr("regionmask.core.mask._contains_bbox", _raise)
+
+    result = regions.mask_3D(LON, LAT)
+
+    xr.testing.assert_identical(result, expected)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 100, 2**18])
+@pytest.mark.parametrize("num_threads", [1, 3])
+@pytest.mark.parametrize("kind", ["1D", "2D", "unstructured"])
+@pytest.mark.parametrize("strategy", ["bbox", "index_polygons", "index_points"])
+def test_query_contains_chunks(
+    chunk_size, num_threads, kind, strategy, monkeypatch
+) -> None:
+
+    monkeypatch.setattr(
+        "regionmask.core.mask._choose_shapely_strategy",
+        lambda *args, **kwargs: strategy,
+    )
+
+    polygons = [box(-10, -10, 10, 10), box(0, 0, 30, 20), Polygon()]
+
+    lon = np.arange(-20.0, 40, 1.5)
+    lat = np.arange(25.0, -25, -1.5)
+    LON, LAT = np.meshgrid(lon, lat)
+
+    if kind == "2D":
+        lon, lat = LON + 0.1 * np.sin(LAT), LAT
+        LON, LAT = lon, lat
+    elif kind == "unstructured":
+        lon, lat = LON.ravel(), LAT.ravel()
+
+    expected = _query_contains_points(LON, LAT, polygons)
+
+    with set_options(mask_num_threads=num_threads):
+        result = _query_contains(
+            lon,
+            lat,
+            polygons,
+            is_unstructured=kind == "unstructured",
+            chunk_size=chunk_size,
+        )
+
+    np.testing.assert_equal(result, expected)
+
+
+def test_choose_shapely_strategy(caplog) -> None:
+
+    # few large regions
+    assert _choose_shapely_strategy(50, 100_000, 10**7) == "bbox"
+    # many small regions
+    assert _choose_shapely_strategy(100_000, 1_000_000, 10**6) == "index_polygons"
+    # many complex regions
+    assert _choose_shapely_strategy(100_000, 10**7, 10**6) == "index_points"
+
+    with caplog.at_level(logging.DEBUG, logger="regionmask.core.mask"):
+        _choose_shapely_strategy(50, 100_000, 10**7)
+
+    assert "using strategy 'bbox' for 50 polygons" in caplog.text
+
+
+@requires_rasterio
 @pytest.mark.parametrize("regions", [r_45_deg_ccw, r_45_deg_cw])
 def test_deg45_rasterize_offset_equal(regions) -> None:
     # https://github.com/regionmask/regionmask/issues/80
@@ -795,6 +1086,74 @@ def test_deg45_rasterize_offset_equal(regions) -> None:
     np.testing.assert_equal(result_no_offset, result_offset)
 
 
+# =============================================================================
+
+_polygons_windows = np.array(
+    [
+        box(-10, -10, 10, 10),
+        # partly outside of the grid
+        box(170, 50, 200, 100),
+        # outside of the grid
+        box(200, 0, 210, 10),
+        # with a hole
+        box(-60, -60, 60, 60).difference(box(-20, -20, 20, 20)),
+        Polygon([(0, 0), (30, 5), (0, 10)]),
+    ]
+)
+
+
+@requires_rasterio
+@pytest.mark.parametrize("lat", [np.arange(89, -90, -2), np.arange(-89.5, 90)])
+@pytest.mark.parametrize("as_3D", [True, False])
+def test_rasterize_windows_equal_batches(monkeypatch, lat, as_3D) -> None:
+
+    import regionmask.core.mask
+
+    lon = np.arange(-179, 180, 2)
+    numbers = list(range(len(_polygons_windows)))
+
+    monkeypatch.setattr(
+        regionmask.core.mask, "_use_rasterize_windows", lambda *_: False
+    )
+    expected = _mask_rasterize(lon, lat, _polygons_windows, numbers, as_3D=True)
+
+    monkeypatch.setattr(regionmask.core.mask, "_use_rasterize_windows", lambda *_: True)
+    result = _mask_rasterize(lon, lat, _polygons_windows, numbers, as_3D=True)
+
+    np.testing.assert_equal(result, expected)
+
+    # the outside polygon is empty
+    assert not result[2].any()
+
+
+@requires_rasterio
+def test_rasterize_window_bounds() -> None:
+
+    lon = np.arange(0.5, 10)
+    lat = np.arange(9.5, 0, -1)
+
+    polygons = [box(2, 3, 4, 5), box(-10, -10, 20, 20), box(20, 20, 30, 30)]
+    result = _rasterize_window_bounds(lon, lat, polygons)
+
+    # rows are flipped (lat is decreasing), one extra cell on each side
+    expected = [[4, 8, 1, 5], [0, 10, 0, 10], [0, 0, 10, 10]]
+    np.testing.assert_equal(result, expected)
+
+
+@requires_rasterio
+def test_use_rasterize_windows() -> None:
+
+    lon = np.arange(0.05, 360, 0.1)
+    lat = np.arange(89.95, -90, -0.1)
+
+    small = [box(x, 0, x + 1, 1) for x in range(100)]
+    assert _use_rasterize_windows(lon, lat, small)
+
+    # many large polygons
+    large = [box(0, -90, 360, 90)] * 40
+    assert not _use_rasterize_windows(lon, lat, large)
+
+
 # =============================================================================
 
 # the whole globe -> can be re-arranged (_mask_rasterize_flip)
@@ -838,13 +1197,15 @@ METHODS = {
     0: "rasterize",
     1: "rasterize_flip",
     2: "rasterize_split",
-    3: "shapely",  # METHOD_IRREGULAR
+    3: "scanline",  # 1D, not equally spaced (or shuffled)
+    4: "shapely",  # METHOD_IRREGULAR
 }
 
 equal = np.arange(0.5, 360)
 grid_2D = np.arange(10).reshape(2, 5)
 un_equal = [0, 1, 2, 4, 5, 6.1]
 close_to_equal = equal + np.random.randn(*equal.shape) * 10**-6
+shuffled = np.random.default_rng(0).permutation(equal)
 
 
 @pytest.mark.parametrize(
@@ -854,14 +1215,22 @@ close_to_equal = equal + np.random.randn(*equal.shape) * 10**-6
         (close_to_equal, 0),
         (_wrapAngle(equal), 1),
         (_wrapAngle(equal)[:-1], 2),
+        (shuffled, 3),
         ([1], 3),
-        (grid_2D, 3),
+        (grid_2D, 4),
         (un_equal, 3),
     ],
 )
 @pytest.mark.parametrize(
     "lat, m_lat",
-    [(equal, 0), (close_to_equal, 0), ([1], 3), (grid_2D, 3), (un_equal, 3)],
+    [
+        (equal, 0),
+        (close_to_equal, 0),
+        (shuffled, 3),
+        ([1], 3),
+        (grid_2D, 4),
+        (un_equal, 3),
+    ],
 )
 def test_determine_method(lon, m_lon, lat, m_lat) -> None:
 
@@ -870,6 +1239,89 @@ def test_determine_method(lon, m_lon, lat, m_lat) -> None:
     assert _determine_method(lon, lat) == expected
 
 
+@pytest.mark.parametrize(
+    "lon",
+    [
+        np.arange(-179, 180, 2.0),  # rasterize
+        np.arange(1, 360, 2.0),  # rasterize_flip
+        np.arange(1, 300, 2.0),  # rasterize_split
+    ],
+)
+@pytest.mark.parametrize("as_3D", [True, False])
+def test_mask_without_rasterio(lon, as_3D, monkeypatch) -> None:
+
+    lat = np.arange(89, -90, -2.0)
+    regions = Regions([box(-90, -45, 90, 45), box(-170, -90, -100, 10)])
+
+    expected = regions.mask_3D(lon, lat) if as_3D else regions.mask(lon, lat)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("rasterio was used")
+
+    monkeypatch.setattr("regionmask.core.mask.has_rasterio", False)
+    monkeypatch.setattr("regionmask.core.mask._mask_rasterize", _raise)
+    monkeypatch.setattr("regionmask.core.mask._mask_rasterize_pairs", _raise)
+
+    result = regions.mask_3D(lon, lat) if as_3D else regions.mask(lon, lat)
+
+    xr.testing.assert_identical(result, expected)
+
+
+@requires_rasterio
+@pytest.mark.parametrize(
+    "lon",
+    [
+        np.random.default_rng(1).permutation(np.arange(-179, 180, 2.0)),
+        np.arange(179, -180, -2.0),  # descending
+        # two split points
+        np.r_[
+            np.arange(0, 100, 2.0), np.arange(-180, 0, 2.0), np.arange(100, 180, 2.0)
+        ],
+    ],
+)
+@pytest.mark.parametrize(
+    "as_3D, as_sparse",
+    [(False, False), (True, False), pytest.param(True, True, marks=requires_sparse)],
+)
+def test_mask_rasterize_permuted(lon, as_3D, as_sparse, monkeypatch) -> None:
+
+    lat = np.random.default_rng(2).permutation(np.arange(89, -90, -2.0))
+    polygons = [box(-90, -45, 90, 45), box(-170, -90, -100, 10)]
+    kwargs = {"wrap_lon": 180, "edgepoints": True, "as_3D": as_3D}
+    kwargs["as_sparse"] = as_sparse
+
+    expected = _mask_numpy(polygons, [0, 1], lon, lat, method="shapely", **kwargs)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("scanline was used")
+
+    monkeypatch.setattr("regionmask.core.mask._mask_scanline", _raise)
+    monkeypatch.setattr("regionmask.core.mask._mask_scanline_pairs", _raise)
+
+    result = _mask_numpy(polygons, [0, 1], lon, lat, method="rasterize", **kwargs)
+
+    if as_sparse:
+        result, expected = result.todense(), expected.todense()
+
+    np.testing.assert_equal(result, expected)
+
+
+def test_is_permuted_equally_spaced() -> None:
+
+    assert _is_permuted_equally_spaced(shuffled)
+    assert _is_permuted_equally_spaced(shuffled, equal[::-1])
+
+    assert not _is_permuted_equally_spaced(un_equal)
+    assert not _is_permuted_equally_spaced(shuffled, [1, 1])
+    assert not _is_permuted_equally_spaced(_wrapAngle(equal)[:-1])
+
+
+def test_determine_method_unstructured_nan() -> None:
+
+    assert _determine_method(un_equal, un_equal, is_unstructured=True) == "shapely"
+    assert _determine_method([0, 1, np.nan], un_equal) == "shapely"
+
+
 # =============================================================================
 # =============================================================================
 # =============================================================================
@@ -906,6 +1358,43 @@ def test_mask_whole_grid(method, regions, lon) -> None:
     assert mask.sel(lat=-90).isnull().all()
 
 
+@pytest.mark.parametrize("lon", [lon180, lon360])
+def test_edgepoints_contained(lon) -> None:
+
+    lat = np.arange(90, -91, -10)
+    LON, LAT = np.meshgrid(lon, lat)
+
+    lon_min = lon.min()
+    polygons = [
+        box(lon_min + 170, -90, lon_min + 360, -50),
+        box(lon_min + 10, -60, lon_min + 100, 0),  # not at the edge
+        box(lon_min + 300, 30, lon_min + 360, 60),
+    ]
+
+    edge = np.isclose(LON.ravel(), lon_min) | (LAT.ravel() == -90)
+    LON_ = np.where(np.isclose(LON, lon_min), LON + 360, LON).ravel() - 1 * 10**-8
+    LAT_ = np.where(LAT == -90, -90 + 1 * 10**-10, LAT - 1 * 10**-10).ravel()
+    inside = shapely.contains_xy(np.array(polygons)[:, None], LON_, LAT_) & edge
+    expected = np.nonzero(inside)
+
+    for lon_, lat_, is_unstructured in (
+        (lon, lat, False),
+        (LON, LAT, False),
+        (LON.ravel(), LAT.ravel(), True),
+    ):
+        result = _edgepoints_contained(
+            lon_, lat_, polygons, lon_min, is_unstructured=is_unstructured
+        )
+        order = np.lexsort(result[::-1])
+        np.testing.assert_equal((result[0][order], result[1][order]), expected)
+
+    # only unassigned gridpoints are considered
+    mask = np.full(LON.size, np.nan)
+    mask[expected[1][:3]] = 1
+    region, cell = _edgepoints_contained(lon, lat, polygons, lon_min, mask=mask)
+    np.testing.assert_equal(np.sort(cell), np.sort(expected[1][3:]))
+
+
 @pytest.mark.parametrize("method", MASK_METHODS)
 @pytest.mark.parametrize("regions", [r_GLOB_180, r_GLOB_360])
 @pytest.mark.parametrize("lon", [lon180, lon360])
@@ -988,6 +1477,19 @@ def test_inject_mask_docstring() -> None:
 
     assert "3D" in result
     assert "fractional" in result
+    assert "n_samples" in result
+    assert "float" in result
+    assert "drop :" in result
+    assert "geodataframe" not in result
+    assert "overlap" not in result
+    assert "flag" not in result
+
+    result = _inject_mask_docstring(which="frac_exact", is_gpd=False)
+
+    assert "3D" in result
+    assert "exact fractional" in result
+    assert "n_samples" not in result
+    assert "lon_bounds" in result
     assert "float" in result
     assert "drop :" in result
     assert "geodataframe" not in result
@@ -0,0 +1,462 @@
+from typing import Any, Literal, TypedDict
+
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.mask import InvalidCoordsError
+from regionmask.core.utils import _infer_bounds
+from regionmask.tests import requires_dask, requires_sparse
+from regionmask.tests.utils import dummy_region
+
+
+def _brute_force(polygons, lon, lat, lon_bounds=None, lat_bounds=None):
+    # intersect every polygon (shifted by 360°) with every grid cell
+
+    if lon_bounds is None:
+        lon_bounds = _infer_bounds(lon)
+        lon_bounds = np.stack([lon_bounds[:-1], lon_bounds[1:]], axis=-1)
+
+        lat_bounds = np.clip(_infer_bounds(lat), -90, 90)
+        lat_bounds = np.stack([lat_bounds[:-1], lat_bounds[1:]], axis=-1)
+
+    X0, Y0 = np.meshgrid(lon_bounds.min(axis=1), lat_bounds.min(axis=1))
+    X1, Y1 = np.meshgrid(lon_bounds.max(axis=1), lat_bounds.max(axis=1))
+    cells = shapely.box(X0, Y0, X1, Y1)
+
+    out = [
+        sum(
+            shapely.area(
+                shapely.intersection(shapely.transform(p, lambda x: x + [s, 0]), cells)
+            )
+            for s in (-360, 0, 360)
+        )
+        for p in polygons
+    ]
+    return np.stack(out) / shapely.area(cells)
+
+
+@pytest.mark.parametrize("dim", ["lon_or_obj", "lat"])
+@pytest.mark.parametrize("invalid_coords", ([0, 1, 0.5], [[0, 1, 2]], [0]))
+def test_mask_3D_frac_wrong_coords(
+    dim: Literal["lon_or_obj", "lat"], invalid_coords
+) -> None:
+
+    class LATLON(TypedDict):
+        lon_or_obj: Any
+        lat: Any
+
+    valid_coords = [0, 1, 2]
+    latlon: LATLON = {"lon_or_obj": valid_coords, "lat": valid_coords}
+    latlon[dim] = invalid_coords
+
+    with pytest.raises(InvalidCoordsError, match="'lon' and 'lat' must be 1D and mono"):
+        dummy_region.mask_3D_frac(**latlon)
+
+
+@pytest.mark.parametrize("lat", ((-91, 90), (-90, 92), (-91, 92)))
+def test_mask_3D_frac_lat_beyond_90(lat) -> None:
+
+    lat = np.arange(*lat)
+    lon = np.arange(0, 360, 10)
+
+    with pytest.raises(InvalidCoordsError, match=r"lat must be between \-90 and \+90"):
+        dummy_region.mask_3D_frac(lon, lat)
+
+
+def test_mask_3D_frac() -> None:
+
+    lon = np.array([15, 30])
+    lat = np.array([15, 30])
+
+    # the center of the region is at 15°
+    r = shapely.geometry.box(0, 0, 30, 30)
+    r = regionmask.Regions([r])
+
+    result = r.mask_3D_frac(lon, lat)
+
+    expected_ = [[[1, 0.5], [0.5, 0.25]]]
+    expected = xr.DataArray(
+        expected_,
+        dims=("region", "lat", "lon"),
+        coords={
+            "lat": lat,
+            "lon": lon,
+            "abbrevs": ("region", ["r0"]),
+            "region": [0],
+            "names": ("region", ["Region0"]),
+        },
+    )
+
+    xr.testing.assert_allclose(result, expected)
+
+
+def test_mask_3D_frac_poly() -> None:
+
+    lon = np.array([10, 20])
+    lat = np.array([10, 20])
+
+    p = [[5, 5], [15, 15], [25, 20], [25, 15], [22.5, 15], [22.5, 5]]
+    r = regionmask.Regions([shapely.geometry.Polygon(p)])
+
+    result = r.mask_3D_frac(lon, lat)
+
+    # mask_3D_frac_approx returns [[0.45, 0.8], [0.0, 0.25]]
+    expected = [[[0.5, 0.75], [0.0, 0.25]]]
+    np.testing.assert_allclose(result.values, expected)
+
+
+@pytest.mark.parametrize("lat_decreasing", (True, False))
+@pytest.mark.parametrize(
+    "lon", (np.arange(0, 360, 7.5), np.arange(-180, 180, 7.5), np.arange(0, 90, 7.5))
+)
+def test_mask_3D_frac_brute_force(lon, lat_decreasing) -> None:
+
+    lat = np.arange(-60, 60.1, 5)
+    lat = lat[::-1] if lat_decreasing else lat
+
+    polygons = [
+        shapely.Polygon([(3, -48), (61, -20), (40, 33), (12, 52), (-20, 5)]),
+        shapely.box(11, 12, 31.3, 23.1),
+        shapely.Point(40, 0).buffer(17.3),
+    ]
+    r = regionmask.Regions(polygons, overlap=True)
+
+    result = r.mask_3D_frac(lon, lat, drop=False)
+
+    expected = _brute_force(polygons, lon, lat)
+
+    np.testing.assert_allclose(result.values, expected, atol=1e-10)
+
+
+def test_mask_3D_frac_irregular_grid() -> None:
+
+    lon = np.array([0, 1, 3, 6, 10, 15, 21.0])
+    lat = np.array([-10, -5, -3, 0, 4, 9.5])
+
+    polygons = [shapely.Polygon([(1.3, -8.1), (17.2, -2.5), (8.1, 7.7)])]
+    r = regionmask.Regions(polygons)
+
+    result = r.mask_3D_frac(lon, lat)
+    expected = _brute_force(polygons, lon, lat)
+
+    np.testing.assert_allclose(result.values, expected, atol=1e-10)
+
+
+def test_mask_3D_frac_across_dateline() -> None:
+
+    lon = np.arange(-180, 180, 5)
+    lat = np.arange(-30, 31, 5)
+
+    # region defined on 0..360 crossing the dateline
+    polygons = [shapely.box(170, -12.5, 190, 10)]
+    r = regionmask.Regions(polygons)
+
+    result = r.mask_3D_frac(lon, lat)
+
+    sel = result.sel(lat=slice(-10, 5))
+    assert (sel.sel(lon=[175, -180, -175]) == 1).all()
+    np.testing.assert_allclose(sel.sel(lon=[170, -170]), 0.5)
+    np.testing.assert_allclose(result.sel(lat=10, lon=[175, -180, -175]), 0.5)
+    np.testing.assert_allclose(result.sel(lat=10, lon=[170, -170]), 0.25)
+
+    np.testing.assert_allclose(result.sum(), (20 * 22.5) / 25)
+
+
+def test_mask_3D_frac_wrap_lon_false() -> None:
+
+    lon = np.arange(-180, 180, 5)
+    lat = np.arange(-30, 31, 5)
+
+    polygons = [shapely.box(170, -12.5, 190, 12.5)]
+    r = regionmask.Regions(polygons)
+
+    result = r.mask_3D_frac(lon, lat, wrap_lon=False, drop=False)
+
+    # the part beyond the last grid cell (177.5°E) is not considered
+    np.testing.assert_allclose(result.sum(), (7.5 * 25) / 25)
+
+
+def test_mask_3D_frac_poles() -> None:
+    # all points should be 1 for a global mask
+
+    lat = np.arange(90, -91, -5)
+    lon = np.arange(0, 360, 5)
+
+    r = regionmask.Regions([shapely.geometry.box(0, -90, 360, 90)])
+
+    result = r.mask_3D_frac(lon, lat)
+    assert (result == 1).all()
+
+    # no gaps or overlaps between the cells and at the poles
+    r = regionmask.Regions([shapely.geometry.box(0, 80, 360, 90)])
+    result = r.mask_3D_frac(lon, lat)
+
+    np.testing.assert_allclose(result.isel(lat=[0, 1]), 1)
+    np.testing.assert_allclose(result.isel(lat=2), 0.5)
+
+
+def test_mask_3D_frac_close_to_approx() -> None:
+
+    lon = np.arange(0.5, 360, 1)
+    lat = np.arange(89.5, -90, -1)
+
+    r = regionmask.defined_regions.srex
+
+    result = r.mask_3D_frac(lon, lat)
+    approx = r.mask_3D_frac_approx(lon, lat)
+
+    xr.testing.assert_allclose(result, approx, atol=0.06)
+
+
+@requires_sparse
+def test_mask_3D_frac_sparse() -> None:
+
+    lon = np.arange(0, 360, 2)
+    lat = np.arange(90, -91, -2)
+
+    r = regionmask.defined_regions.srex
+
+    expected = r.mask_3D_frac(lon, lat, drop=False)
+    result = r.mask_3D_frac(lon, lat, drop=False, output="sparse")
+
+    assert result.data.fill_value == 0
+    assert result.dtype == float
+    xr.testing.assert_equal(result.copy(data=result.data.todense()), expected)
+
+
+@requires_dask
+def test_mask_3D_frac_dask() -> None:
+
+    lon = np.arange(0, 360, 2)
+    lat = np.arange(90, -91, -2)
+    ds = xr.Dataset(
+        {"data": (("lat", "lon"), np.zeros((lat.size, lon.size)))},
+        coords={"lon": lon, "lat": lat},
+    ).chunk(lat=20, lon=50)
+
+    r = regionmask.defined_regions.srex
+
+    result = r.mask_3D_frac(ds, drop=False)
+    expected = r.mask_3D_frac(ds.lon, ds.lat, drop=False)
+
+    assert result.chunks is not None
+    # the cells are clipped per chunk which can lead to round-off differences
+    xr.testing.assert_allclose(result.compute(), expected)
+
+
+def _curvilinear(lon, lat):
+    # regular grid as curvilinear grid with (y, x, 4) bounds
+
+    lon_bounds = _infer_bounds(lon)
+    lat_bounds = np.clip(_infer_bounds(lat), -90, 90)
+
+    LON, LAT = np.meshgrid(lon, lat)
+
+    LON_B0, LAT_B0 = np.meshgrid(lon_bounds[:-1], lat_bounds[:-1])
+    LON_B1, LAT_B1 = np.meshgrid(lon_bounds[1:], lat_bounds[1:])
+
+    lon_v = np.stack([LON_B0, LON_B1, LON_B1, LON_B0], axis=-1)
+    lat_v = np.stack([LAT_B0, LAT_B0, LAT_B1, LAT_B1], axis=-1)
+
+    ds = xr.Dataset(
+        {
+            "lon_bnds": (("y", "x", "nv"), lon_v),
+            "lat_bnds": (("y", "x", "nv"), lat_v),
+        },
+        coords={
+            "lon": (("y", "x"), LON, {"bounds": "lon_bnds"}),
+            "lat": (("y", "x"), LAT, {"bounds": "lat_bnds"}),
+        },
+    )
+
+    return ds
+
+
+LON_CURV = np.arange(1, 360, 6.0)
+LAT_CURV = np.arange(87, -90, -6.0)
+
+
+@pytest.mark.parametrize("wrap_lon", (None, False))
+def test_mask_3D_frac_cells_as_rectilinear(wrap_lon) -> None:
+
+    r = regionmask.defined_regions.srex
+
+    ds = _curvilinear(LON_CURV, LAT_CURV)
+
+    expected = r.mask_3D_frac(LON_CURV, LAT_CURV, drop=False, wrap_lon=wrap_lon)
+
+    # bounds from the CF attributes
+    result = r.mask_3D_frac(ds, drop=False, wrap_lon=wrap_lon)
+
+    assert result.dims == ("region", "y", "x")
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-12)
+
+    # bounds passed explicitly
+    result = r.mask_3D_frac(
+        ds.lon.values,
+        ds.lat.values,
+        lon_bounds=ds.lon_bnds,
+        lat_bounds=ds.lat_bnds,
+        drop=False,
+        wrap_lon=wrap_lon,
+    )
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-12)
+
+
+def test_mask_3D_frac_cells_across_dateline() -> None:
+
+    r = regionmask.defined_regions.srex
+
+    ds = _curvilinear(LON_CURV, LAT_CURV)
+    expected = r.mask_3D_frac(ds, drop=False)
+
+    # the vertices of some cells are on both sides of the dateline
+    ds["lon_bnds"] = (ds.lon_bnds + 180) % 360 - 180
+    ds["lon"] = (ds.lon + 180) % 360 - 180
+    result = r.mask_3D_frac(ds, drop=False)
+
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-12)
+
+
+def test_mask_3D_frac_cells_brute_force() -> None:
+
+    # rotated cells
+    x = np.linspace(-30, 60, 21)
+    y = np.linspace(-40, 40, 17)
+    X, Y = np.meshgrid(x, y)
+    XR, YR = X + 0.3 * Y, Y - 0.2 * X
+
+    def _vertices(A):
+        return np.stack([A[:-1, :-1], A[:-1, 1:], A[1:, 1:], A[1:, :-1]], axis=-1)
+
+    lon_v, lat_v = _vertices(XR), _vertices(YR)
+    lon, lat = lon_v.mean(axis=-1), lat_v.mean(axis=-1)
+
+    polygons = [
+        shapely.Polygon([(3, -48), (61, -20), (40, 33), (12, 52), (-20, 5)]),
+        shapely.Point(10, 0).buffer(17.3),
+    ]
+    r = regionmask.Regions(polygons, overlap=True)
+
+    result = r.mask_3D_frac(lon, lat, lon_bounds=lon_v, lat_bounds=lat_v, drop=False)
+
+    cells = shapely.polygons(np.stack([lon_v, lat_v], axis=-1))
+    expected = [
+        shapely.area(shapely.intersection(p, cells)) / shapely.area(cells)
+        for p in polygons
+    ]
+
+    assert result.dims == ("region", "lat_idx", "lon_idx")
+    np.testing.assert_allclose(result.values, expected, atol=1e-12)
+
+
+def test_mask_3D_frac_cells_unstructured() -> None:
+
+    # two triangles per square
+    lon = xr.DataArray([0.25, 0.75], dims="cell")
+    lat = xr.DataArray([0.75, 0.25], dims="cell")
+
+    lon_v = [[0, 0, 1], [0, 1, 1]]
+    lat_v = [[0, 1, 1], [0, 0, 1]]
+
+    r = regionmask.Regions([shapely.box(0, 0, 0.5, 1)])
+    result = r.mask_3D_frac(lon, lat, lon_bounds=lon_v, lat_bounds=lat_v)
+
+    assert result.dims == ("region", "cell")
+    np.testing.assert_allclose(result.values, [[0.75, 0.25]])
+
+
+def test_mask_3D_frac_bounds_1D() -> None:
+
+    r = regionmask.defined_regions.srex
+
+    lon = np.arange(1, 360, 2.0)
+    lat = np.arange(89, -90, -2.0)
+
+    expected = r.mask_3D_frac(lon, lat, drop=False)
+
+    lon_bounds = np.stack([lon - 1, lon + 1], axis=-1)
+    lat_bounds = np.stack([lat + 1, lat - 1], axis=-1)
+
+    result = r.mask_3D_frac(
+        lon, lat, lon_bounds=lon_bounds, lat_bounds=lat_bounds, drop=False
+    )
+    xr.testing.assert_equal(result, expected)
+
+    # non-contiguous bounds
+    lon_bounds = np.stack([lon - 0.5, lon + 0.5], axis=-1)
+
+    result = r.mask_3D_frac(
+        lon, lat, lon_bounds=lon_bounds, lat_bounds=lat_bounds, drop=False
+    )
+    expected = _brute_force(r.polygons, lon, lat, lon_bounds, lat_bounds)
+    np.testing.assert_allclose(result.values, expected, atol=1e-12)
+
+
+def test_mask_3D_frac_bounds_errors() -> None:
+
+    lon = np.arange(0.5, 2)
+    lat = np.arange(0.5, 2)
+
+    lon_bounds = np.stack([lon - 0.5, lon + 0.5], axis=-1)
+
+    with pytest.raises(ValueError, match="Either pass both 'lon_bounds' and 'lat_b"):
+        dummy_region.mask_3D_frac(lon, lat, lon_bounds=lon_bounds)
+
+    with pytest.raises(InvalidCoordsError, match="must have shape \\(n, 2\\)"):
+        dummy_region.mask_3D_frac(
+            lon, lat, lon_bounds=lon_bounds[:, :1], lat_bounds=lon_bounds
+        )
+
+    LON, LAT = np.meshgrid(lon, lat)
+    bounds = np.zeros(LON.shape + (4,))
+
+    with pytest.raises(InvalidCoordsError, match="'lon_bounds' must have the shape"):
+        dummy_region.mask_3D_frac(LON, LAT, lon_bounds=bounds[:, :1], lat_bounds=bounds)
+
+    with pytest.raises(InvalidCoordsError, match="'lat_bounds' must have the shape"):
+        dummy_region.mask_3D_frac(
+            LON, LAT, lon_bounds=bounds, lat_bounds=bounds[..., :2]
+        )
+
+
+def test_mask_3D_frac_cells_threads() -> None:
+
+    r = regionmask.defined_regions.srex
+    ds = _curvilinear(LON_CURV, LAT_CURV)
+
+    expected = r.mask_3D_frac(ds, drop=False)
+
+    with regionmask.set_options(mask_num_threads=3):
+        result = r.mask_3D_frac(ds, drop=False)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@requires_sparse
+def test_mask_3D_frac_cells_sparse() -> None:
+
+    r = regionmask.defined_regions.srex
+    ds = _curvilinear(LON_CURV, LAT_CURV)
+
+    expected = r.mask_3D_frac(ds, drop=False)
+    result = r.mask_3D_frac(ds, drop=False, output="sparse")
+
+    assert result.data.fill_value == 0
+    xr.testing.assert_equal(result.copy(data=result.data.todense()), expected)
+
+
+@requires_dask
+def test_mask_3D_frac_cells_dask() -> None:
+
+    r = regionmask.defined_regions.srex
+    ds = _curvilinear(LON_CURV, LAT_CURV)
+
+    expected = r.mask_3D_frac(ds, drop=False)
+    result = r.mask_3D_frac(ds.chunk(y=7, x=20), drop=False)
+
+    assert result.chunks is not None
+    xr.testing.assert_allclose(result.compute(), expected)
@@ -6,8 +6,14 @@ import shapely
 import xarray as xr
 
 import regionmask
-from regionmask.core.mask import InvalidCoordsError
+import regionmask.core.mask
+from regionmask.core.mask import (
+    InvalidCoordsError,
+    _frac_approx_band_size,
+    _use_sampled_grid,
+)
 from regionmask.core.utils import _sample_coords
+from regionmask.tests import requires_sparse
 from regionmask.tests.utils import dummy_region
 
 
@@ -21,6 +27,15 @@ def test_sample_coords() -> None:
     expected = np.arange(-0.45, 2.46, 0.1)
     np.testing.assert_allclose(actual, expected)
 
+    actual = _sample_coords([0, 10], n=4)
+    expected = np.arange(-3.75, 14, 2.5)
+    np.testing.assert_allclose(actual, expected)
+
+    # wrapped longitude
+    actual = _sample_coords([170, -170], n=2)
+    expected = np.array([165, 175, -175, -165])
+    np.testing.assert_allclose(actual, expected)
+
 
 @pytest.mark.parametrize("dim", ["lon_or_obj", "lat"])
 @pytest.mark.parametrize("invalid_coords", ([0, 1, 3], [[0, 1, 2]]))
@@ -254,3 +269,196 @@ def test_mask_percentage_maybe_flip(lon_range: tuple[int, int]) -> None:
     result = r.mask_3D_frac_approx(lon, lat)
 
     xr.testing.assert_equal(result, expected)
+
+
+def test_use_sampled_grid() -> None:
+
+    assert _use_sampled_grid(300, 1, 1000)
+    assert not _use_sampled_grid(10, 1, 1000)
+    assert not _use_sampled_grid(100, 40, 1000)
+
+
+def _mask_frac_approx_full_and_refined(monkeypatch, r, lon, lat, **kwargs):
+
+    with monkeypatch.context() as m:
+        m.setattr(regionmask.core.mask, "_use_sampled_grid", lambda *args: True)
+        full = r.mask_3D_frac_approx(lon, lat, **kwargs)
+
+    with monkeypatch.context() as m:
+        m.setattr(regionmask.core.mask, "_use_sampled_grid", lambda *args: False)
+        refined = r.mask_3D_frac_approx(lon, lat, **kwargs)
+
+    return full, refined
+
+
+@pytest.mark.parametrize("lon_start", (1, -180))
+@pytest.mark.parametrize("wrap_lon", (None, False))
+def test_mask_percentage_boundary_cells(monkeypatch, lon_start, wrap_lon) -> None:
+    # only sampling the boundary cells yields the same result as sampling all cells
+
+    lon = np.arange(lon_start, lon_start + 360, 2)
+    lat = np.arange(90, -91, -2)
+
+    r = regionmask.defined_regions.srex
+
+    full, refined = _mask_frac_approx_full_and_refined(
+        monkeypatch, r, lon, lat, wrap_lon=wrap_lon, drop=False
+    )
+
+    xr.testing.assert_equal(full, refined)
+
+
+@pytest.mark.parametrize("wrap_lon", (None, False))
+def test_mask_percentage_boundary_cells_flipped(monkeypatch, wrap_lon) -> None:
+    # lon is not monotonic (0..178, -180..-2)
+
+    lon = np.concatenate([np.arange(0, 180, 2), np.arange(-180, 0, 2)])
+    lat = np.arange(-88, 89, 2)
+
+    r = regionmask.defined_regions.srex
+
+    full, refined = _mask_frac_approx_full_and_refined(
+        monkeypatch, r, lon, lat, wrap_lon=wrap_lon, drop=False
+    )
+
+    xr.testing.assert_equal(full, refined)
+    assert refined.sel(region=r.map_keys("SAH"), lon=40, lat=30) == 0.25
+
+
+def test_mask_percentage_boundary_cells_poles(monkeypatch) -> None:
+
+    lat = np.arange(90, -91, -5)
+    lon = np.arange(0, 360, 5)
+
+    polygons = [shapely.box(0, -90, 360, 90), shapely.box(0, 85, 360, 90)]
+    r = regionmask.Regions(polygons, overlap=True)
+
+    full, refined = _mask_frac_approx_full_and_refined(monkeypatch, r, lon, lat)
+
+    xr.testing.assert_equal(full, refined)
+    assert (refined.isel(region=0) == 1).all()
+    assert (refined.isel(region=1, lat=0) == 1).all()
+
+
+@requires_sparse
+def test_mask_percentage_boundary_cells_sparse(monkeypatch) -> None:
+
+    lon = np.arange(1, 360, 2)
+    lat = np.arange(90, -91, -2)
+
+    r = regionmask.defined_regions.srex
+
+    full, refined = _mask_frac_approx_full_and_refined(
+        monkeypatch, r, lon, lat, output="sparse"
+    )
+
+    assert refined.data.fill_value == 0
+    np.testing.assert_equal(full.data.todense(), refined.data.todense())
+
+
+def test_frac_approx_band_size() -> None:
+
+    # 2**26 bytes per band
+    assert _frac_approx_band_size(1, 2**10, 8) == 2**10
+    assert _frac_approx_band_size(4, 2**10, 8) == 2**8
+    assert _frac_approx_band_size(2**20, 2**10, 8) == 1
+
+
+@pytest.mark.parametrize("band_size", (1, 7, 1000))
+@pytest.mark.parametrize("num_threads", (1, 3))
+@pytest.mark.parametrize(
+    "output", ("dense", pytest.param("sparse", marks=requires_sparse))
+)
+def test_mask_percentage_bands(monkeypatch, band_size, num_threads, output) -> None:
+
+    monkeypatch.setattr(regionmask.core.mask, "_use_sampled_grid", lambda *args: True)
+
+    lon = np.arange(1, 360, 4)
+    lat = np.arange(90, -91, -4)
+
+    r = regionmask.defined_regions.srex
+
+    expected = r.mask_3D_frac_approx(lon, lat, output=output)
+
+    with regionmask.set_options(
+        frac_approx_band_size=band_size, mask_num_threads=num_threads
+    ):
+        result = r.mask_3D_frac_approx(lon, lat, output=output)
+
+    xr.testing.assert_identical(result, expected)
+
+
+@pytest.mark.parametrize("n_samples", (0, -1, 2.5, None))
+def test_mask_percentage_n_samples_errors(n_samples) -> None:
+
+    with pytest.raises(ValueError, match="'n_samples' must be a positive integer"):
+        dummy_region.mask_3D_frac_approx([0, 1], [0, 1], n_samples=n_samples)
+
+
+@pytest.mark.parametrize("n_samples", (2, 4, 20))
+def test_mask_percentage_n_samples(n_samples) -> None:
+
+    lon = np.array([10, 20])
+    lat = np.array([10, 20])
+
+    p = [[5, 5], [15, 15], [25, 20], [25, 15], [22.5, 15], [22.5, 5]]
+    r = regionmask.Regions([shapely.geometry.Polygon(p)])
+
+    result = r.mask_3D_frac_approx(lon, lat, n_samples=n_samples)
+
+    # the exact fractions
+    expected = np.array([[[0.5, 0.75], [0.0, 0.25]]])
+    np.testing.assert_allclose(result.values, expected, atol=1 / n_samples)
+
+    # cells fully within the region
+    r = regionmask.Regions([shapely.geometry.box(0, 0, 30, 30)])
+    result = r.mask_3D_frac_approx(lon, lat, n_samples=n_samples)
+
+    expected = np.array([[[1, 1], [1, 1]]])
+    np.testing.assert_allclose(result.values, expected)
+
+
+@pytest.mark.parametrize("dtype", ("int", "float16", bool))
+def test_mask_percentage_dtype_errors(dtype) -> None:
+
+    with pytest.raises(ValueError, match="'dtype' must be one of 'float64', 'float32'"):
+        dummy_region.mask_3D_frac_approx([0, 1], [0, 1], dtype=dtype)
+
+
+@pytest.mark.parametrize(
+    "output", ("dense", pytest.param("sparse", marks=requires_sparse))
+)
+def test_mask_percentage_dtype(output) -> None:
+
+    lon = np.array([15, 30])
+    lat = np.array([15, 30])
+
+    r = regionmask.Regions([shapely.geometry.box(0, 0, 30, 30)])
+
+    def _values(mask):
+        return mask.data.todense() if output == "sparse" else mask.values
+
+    result = r.mask_3D_frac_approx(lon, lat, dtype="float32", output=output)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(_values(result), [[[1, 0.5], [0.5, 0.25]]])
+
+    result = r.mask_3D_frac_approx(lon, lat, dtype="uint8", output=output)
+    assert result.dtype == np.uint8
+    np.testing.assert_equal(_values(result), [[[100, 50], [50, 25]]])
+
+
+@requires_sparse
+def test_mask_percentage_dtype_sparse_rounded_to_zero() -> None:
+
+    lon = np.array([0.5, 1.5])
+    lat = np.array([0.5, 1.5])
+
+    # covers 0.25 % of the first cell
+    r = regionmask.Regions([shapely.geometry.box(0, 0, 0.05, 0.05)])
+
+    with pytest.warns(UserWarning, match="No gridpoint belongs to any region"):
+        result = r.mask_3D_frac_approx(
+            lon, lat, dtype="uint8", output="sparse", n_samples=20, drop=False
+        )
+
+    assert result.data.nnz == 0
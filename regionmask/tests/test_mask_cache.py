@@ -0,0 +1,302 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+import regionmask
+from regionmask.core.cache import (
+    _fingerprint,
+    _fingerprint_polygons,
+    _load_array,
+    _LRUCache,
+    _save_array,
+)
+from regionmask.core.mask import _MASK_CACHE, _MASK_DISK_CACHE
+from regionmask.tests.utils import (
+    dummy_ds,
+    dummy_region,
+    expected_mask_2D,
+    expected_mask_3D,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_mask_cache():
+    _MASK_CACHE.clear()
+    yield
+    _MASK_CACHE.clear()
+
+
+def test_fingerprint() -> None:
+
+    arr = np.arange(5.0)
+
+    assert _fingerprint(arr) == _fingerprint(arr.copy())
+    assert _fingerprint(arr) != _fingerprint(arr[::-1])
+    assert _fingerprint(arr) != _fingerprint(arr.astype(np.float32))
+    assert _fingerprint(arr) != _fingerprint(arr.reshape(1, 5))
+
+    assert _fingerprint(arr, None) != _fingerprint(arr, False)
+    assert _fingerprint(arr, 180) != _fingerprint(arr, 360)
+
+
+def test_fingerprint_polygons() -> None:
+
+    polygons = dummy_region.polygons
+
+    expected = _fingerprint_polygons(polygons, [0, 1, 2])
+    assert _fingerprint_polygons(list(polygons), [0, 1, 2]) == expected
+
+    assert _fingerprint_polygons(polygons, [0, 1, 3]) != expected
+    assert _fingerprint_polygons(polygons[::-1], [0, 1, 2]) != expected
+    assert _fingerprint_polygons(polygons[:2], [0, 1]) != expected
+
+
+def test_lru_cache_max_entries() -> None:
+
+    cache = _LRUCache("mask_cache_max_entries", "mask_cache_max_bytes")
+
+    with regionmask.set_options(mask_cache_max_entries=2):
+        cache.put("a", np.zeros(3))
+        cache.put("b", np.zeros(3))
+
+        # "a" is now the most recently used
+        assert cache.get("a") is not None
+
+        cache.put("c", np.zeros(3))
+
+        assert len(cache) == 2
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+
+def test_lru_cache_max_bytes() -> None:
+
+    cache = _LRUCache("mask_cache_max_entries", "mask_cache_max_bytes")
+
+    with regionmask.set_options(mask_cache_max_entries=10, mask_cache_max_bytes=100):
+        cache.put("a", np.zeros(5))
+        cache.put("b", np.zeros(5))
+        assert len(cache) == 2
+        assert cache.nbytes == 80
+
+        cache.put("c", np.zeros(5))
+        assert len(cache) == 2
+        assert "a" not in cache
+
+        # too large to be cached
+        cache.put("d", np.zeros(20))
+        assert "d" not in cache
+        assert len(cache) == 2
+
+
+def test_lru_cache_disabled() -> None:
+
+    cache = _LRUCache("mask_cache_max_entries", "mask_cache_max_bytes")
+
+    with regionmask.set_options(mask_cache_max_entries=1):
+        cache.put("a", np.zeros(3))
+        assert len(cache) == 1
+
+    assert not cache.enabled
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_read_only() -> None:
+
+    cache = _LRUCache("mask_cache_max_entries", "mask_cache_max_bytes")
+
+    with regionmask.set_options(mask_cache_max_entries=1):
+        result = cache.put("a", np.zeros(3))
+
+    assert not result.flags.writeable
+
+    # values that are not stored remain writeable
+    result = cache.put("b", np.zeros(3))
+    assert result.flags.writeable
+
+    with regionmask.set_options(mask_cache_max_entries=1, mask_cache_max_bytes=8):
+        result = cache.put("c", np.zeros(3))
+
+    assert result.flags.writeable
+
+
+def test_mask_cache_disabled_by_default() -> None:
+
+    dummy_region.mask(dummy_ds)
+    assert len(_MASK_CACHE) == 0
+
+
+@pytest.mark.parametrize("meth", ["mask", "mask_3D"])
+def test_mask_cache_hit(meth) -> None:
+
+    with regionmask.set_options(mask_cache_max_entries=5):
+        first = getattr(dummy_region, meth)(dummy_ds)
+        assert len(_MASK_CACHE) == 1
+
+        second = getattr(dummy_region, meth)(dummy_ds)
+        assert len(_MASK_CACHE) == 1
+
+    xr.testing.assert_identical(first, second)
+
+
+def test_mask_cache_results() -> None:
+
+    with regionmask.set_options(mask_cache_max_entries=5):
+        for __ in range(2):
+            result = dummy_region.mask(dummy_ds)
+            xr.testing.assert_identical(result, expected_mask_2D())
+
+            result = dummy_region.mask_3D(dummy_ds, drop=False)
+            xr.testing.assert_identical(result, expected_mask_3D(drop=False))
+
+
+def test_mask_cache_read_only() -> None:
+
+    with regionmask.set_options(mask_cache_max_entries=5):
+        result = dummy_region.mask_3D(dummy_ds, drop=False)
+
+    with pytest.raises(ValueError, match="read-only"):
+        result.values[0, 0, 0] = False
+
+
+def test_mask_cache_keys() -> None:
+
+    lon = np.array([0.5, 1.5])
+
+    with regionmask.set_options(mask_cache_max_entries=10):
+        dummy_region.mask(lon, [0.5, 1.5])
+        dummy_region.mask(lon, [0.5, 1.5], wrap_lon=False)
+        dummy_region.mask(lon + 360, [0.5, 1.5], wrap_lon=180)
+        dummy_region.mask(lon, [0.5, 2.5])
+        dummy_region[[0, 1]].mask(lon, [0.5, 1.5])
+        assert len(_MASK_CACHE) == 5
+
+        # same input -> no additional entry (mask also creates a 3D mask internally)
+        dummy_region.mask(lon.tolist(), [0.5, 1.5])
+        dummy_region.mask_3D(lon, [0.5, 1.5])
+        assert len(_MASK_CACHE) == 5
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    with regionmask.set_options(cache_dir=tmp_path, mask_disk_cache=True):
+        yield _MASK_DISK_CACHE
+
+
+@pytest.mark.parametrize(
+    "arr",
+    [
+        np.array([[True, False, True], [False, False, True]]),
+        np.zeros((3, 0, 2), dtype=bool),
+        np.array([[0, np.nan], [1, 2]]),
+        np.arange(7, dtype=np.float32),
+    ],
+)
+def test_save_load_array(tmp_path, arr) -> None:
+
+    fN = tmp_path / "arr.npz"
+    _save_array(fN, arr)
+    result = _load_array(fN)
+
+    assert result.dtype == arr.dtype
+    np.testing.assert_equal(result, arr)
+
+
+def test_disk_cache_disabled_by_default(tmp_path) -> None:
+
+    with regionmask.set_options(cache_dir=tmp_path):
+        dummy_region.mask(dummy_ds)
+        assert not _MASK_DISK_CACHE.enabled
+        assert not _MASK_DISK_CACHE.path.exists()
+
+
+def test_disk_cache_location(tmp_path, disk_cache) -> None:
+
+    assert disk_cache.path == tmp_path / "masks"
+
+
+def test_disk_cache_put_get(disk_cache) -> None:
+
+    arr = np.array([[True, False], [False, True]])
+    disk_cache.put("a", arr)
+
+    assert len(disk_cache) == 1
+    result = disk_cache.get("a")
+    np.testing.assert_equal(result, arr)
+    assert not result.flags.writeable
+
+    assert disk_cache.get("b") is None
+
+    disk_cache.clear()
+    assert len(disk_cache) == 0
+
+
+def test_disk_cache_corrupted_file(disk_cache) -> None:
+
+    disk_cache.put("a", np.zeros(3))
+    (disk_cache.path / "a.npz").write_bytes(b"no npz")
+
+    assert disk_cache.get("a") is None
+
+
+def test_disk_cache_eviction(disk_cache) -> None:
+
+    import os
+
+    rng = np.random.default_rng(0)
+    arrays = {key: rng.random(100) for key in "abc"}
+
+    for i, (key, arr) in enumerate(arrays.items()):
+        disk_cache.put(key, arr)
+        # ensure distinct access times
+        os.utime(disk_cache.path / f"{key}.npz", (i, i))
+
+    size = (disk_cache.path / "a.npz").stat().st_size
+
+    # "a" is now the most recently used
+    assert disk_cache.get("a") is not None
+
+    with regionmask.set_options(mask_disk_cache_max_bytes=int(size * 3.5)):
+        disk_cache.put("d", rng.random(100))
+
+    assert len(disk_cache) == 3
+    assert disk_cache.get("b") is None
+    assert disk_cache.get("a") is not None
+    assert disk_cache.get("d") is not None
+
+
+def test_disk_cache_too_large(disk_cache) -> None:
+
+    with regionmask.set_options(mask_disk_cache_max_bytes=10):
+        disk_cache.put("a", np.arange(100.0))
+
+    assert len(disk_cache) == 0
+
+
+@pytest.mark.parametrize("meth", ["mask", "mask_3D"])
+def test_mask_disk_cache(disk_cache, meth) -> None:
+
+    first = getattr(dummy_region, meth)(dummy_ds)
+    assert len(disk_cache) == 1
+
+    # ensure the result is read from disk
+    _MASK_CACHE.clear()
+    second = getattr(dummy_region, meth)(dummy_ds)
+    assert len(disk_cache) == 1
+
+    xr.testing.assert_identical(first, second)
+
+
+def test_mask_disk_cache_results(disk_cache) -> None:
+
+    with regionmask.set_options(mask_cache_max_entries=5):
+        for __ in range(2):
+            result = dummy_region.mask(dummy_ds)
+            xr.testing.assert_identical(result, expected_mask_2D())
+
+            result = dummy_region.mask_3D(dummy_ds, drop=False)
+            xr.testing.assert_identical(result, expected_mask_3D(drop=False))
+
+            _MASK_CACHE.clear()
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.tests import requires_dask
+
+pytestmark = requires_dask
+
+# 20° boxes and a box touching the south pole (to test the edge points)
+_polygons = [
+    shapely.box(x, y, x + 20, y + 20)
+    for x in range(-180, 180, 40)
+    for y in range(-60, 60, 40)
+]
+_polygons.append(shapely.box(-180, -90, 180, -80))
+
+regions = regionmask.Regions(_polygons)
+
+
+def _ds(lon, lat, chunks):
+
+    data = np.zeros((lat.size, lon.size))
+    ds = xr.Dataset({"data": (("lat", "lon"), data)}, coords={"lon": lon, "lat": lat})
+
+    return ds.chunk(chunks)
+
+
+LON_360 = np.arange(0, 360, 2.0)
+LON_180 = np.arange(-180, 180, 2.0)
+LAT = np.arange(90, -91, -2.0)
+
+
+def _assert_lazy_equal(lazy, expected):
+
+    assert lazy.chunks is not None
+    xr.testing.assert_equal(lazy.compute(), expected)
+
+
+@pytest.mark.parametrize("lon", (LON_360, LON_180))
+@pytest.mark.parametrize("wrap_lon", (None, False))
+def test_mask_2D_dask(lon, wrap_lon) -> None:
+
+    ds = _ds(lon, LAT, {"lat": 20, "lon": 50})
+
+    result = regions.mask(ds, wrap_lon=wrap_lon)
+    expected = regions.mask(ds.lon, ds.lat, wrap_lon=wrap_lon)
+
+    assert result.chunks == ((20, 20, 20, 20, 11), (50, 50, 50, lon.size - 150))
+    _assert_lazy_equal(result, expected)
+
+
+@pytest.mark.parametrize("lon", (LON_360, LON_180))
+@pytest.mark.parametrize("drop", (True, False))
+def test_mask_3D_dask(lon, drop) -> None:
+
+    ds = _ds(lon, LAT, {"lat": 20, "lon": 50})
+
+    result = regions.mask_3D(ds, drop=drop)
+    expected = regions.mask_3D(ds.lon, ds.lat, drop=drop)
+
+    assert result.chunks is not None
+    assert result.chunks[1:] == ((20, 20, 20, 20, 11), (50, 50, 50, lon.size - 150))
+    _assert_lazy_equal(result, expected)
+
+
+def test_mask_lazy_chunked_coords() -> None:
+
+    lon = xr.DataArray(LON_360, dims="lon", name="lon").chunk(lon=50)
+    lat = xr.DataArray(LAT, dims="lat", name="lat").chunk(lat=20)
+
+    result = regions.mask(lon, lat)
+    expected = regions.mask(lon.compute(), lat.compute())
+
+    _assert_lazy_equal(result, expected)
+
+
+def test_mask_dask_2D_coords() -> None:
+
+    LON, LAT_ = np.meshgrid(LON_360, LAT)
+    dims = ("y", "x")
+    lon = xr.DataArray(LON, dims=dims)
+    lat = xr.DataArray(LAT_, dims=dims)
+
+    result = regions.mask_3D(lon.chunk(y=30), lat.chunk(y=30), drop=False)
+    expected = regions.mask_3D(lon, lat, drop=False)
+
+    _assert_lazy_equal(result, expected)
+
+
+def test_mask_dask_unstructured() -> None:
+
+    ds = xr.Dataset(coords={"lon": LON_360, "lat": LAT})
+    ds = ds.stack(cell=("lat", "lon")).reset_index("cell")
+
+    ds_chunked = ds.chunk(cell=1000)
+
+    result = regions.mask(ds_chunked.lon, ds_chunked.lat)
+    expected = regions.mask(ds.lon, ds.lat)
+
+    assert result.chunks is not None
+    assert result.chunks[0][0] == 1000
+    _assert_lazy_equal(result, expected)
+
+
+@pytest.mark.parametrize("wrap_lon", (None, True))
+def test_mask_3D_frac_approx_dask(wrap_lon) -> None:
+
+    lon = np.arange(1, 360, 2.0)
+    ds = _ds(lon, LAT, {"lat": 20, "lon": 50})
+
+    result = regions.mask_3D_frac_approx(ds, drop=False, wrap_lon=wrap_lon)
+    expected = regions.mask_3D_frac_approx(
+        ds.lon, ds.lat, drop=False, wrap_lon=wrap_lon
+    )
+
+    _assert_lazy_equal(result, expected)
+
+
+def test_mask_dask_method_rasterize() -> None:
+
+    ds = _ds(LON_360, LAT, {"lat": 20, "lon": 50})
+
+    result = regions.mask(ds, method="rasterize")
+    expected = regions.mask(ds.lon, ds.lat, method="rasterize")
+
+    _assert_lazy_equal(result, expected)
+
+    lat = np.array([0, 1, 3, 4, 10.0])
+    ds = _ds(LON_360, lat, {"lat": 2, "lon": 50})
+
+    with pytest.raises(ValueError, match="must be equally spaced"):
+        regions.mask(ds, method="rasterize")
+
+
+def test_mask_dask_is_lazy(monkeypatch) -> None:
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("mask was computed")
+
+    monkeypatch.setattr(regionmask.core.mask, "_mask_numpy", _raise)
+
+    ds = _ds(LON_360, LAT, {"lat": 20, "lon": 50})
+
+    regions.mask(ds)
+    regions.mask_3D(ds, drop=False)
+    regions.mask_3D_frac_approx(ds, drop=False)
+
+    with pytest.raises(AssertionError, match="mask was computed"):
+        regions.mask(ds).compute()
+
+
+def test_mask_dask_flags() -> None:
+
+    # all regions are added to the flags of lazy masks
+    ds = _ds(LON_360, LAT, {"lat": 20, "lon": 50})
+
+    result = regions.mask(ds, wrap_lon=False)
+
+    np.testing.assert_equal(result.flag_values, regions.numbers)
+    assert result.flag_meanings == " ".join(regions.abbrevs)
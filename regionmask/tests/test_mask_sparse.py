@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.mask import _determine_method
+from regionmask.core.utils import _wrapAngle
+from regionmask.tests import requires_sparse
+
+pytestmark = requires_sparse
+
+# 20° boxes, a box touching the south pole (to test the edge points), and a box
+# overlapping some of the other regions
+_polygons = [
+    shapely.box(x, y, x + 20, y + 20)
+    for x in range(-180, 180, 40)
+    for y in range(-60, 60, 40)
+]
+_polygons.append(shapely.box(-180, -90, 180, -80))
+
+regions = regionmask.Regions(_polygons)
+regions_overlap = regionmask.Regions(
+    _polygons + [shapely.box(-10, -10, 30, 30)], overlap=True
+)
+
+LAT = np.arange(90, -91, -2.0)
+
+LONS = {
+    "rasterize": np.arange(-180, 180, 2.0),
+    "rasterize_flip": np.arange(0, 360, 2.0),
+    "rasterize_split": np.arange(0, 300, 2.0),
+    "scanline": np.r_[0, np.arange(3, 360, 2.0)],
+}
+
+
+def _assert_sparse_equal(result, expected):
+
+    import sparse
+
+    assert isinstance(result.data, sparse.COO)
+
+    result = result.copy(data=result.data.todense())
+    xr.testing.assert_identical(result, expected)
+
+
+@pytest.mark.parametrize("method", LONS)
+@pytest.mark.parametrize("drop", (True, False))
+@pytest.mark.parametrize("regs", (regions, regions_overlap))
+def test_mask_3D_sparse(method, drop, regs) -> None:
+
+    lon = LONS[method]
+    assert _determine_method(_wrapAngle(lon, 180), LAT) == method
+
+    result = regs.mask_3D(lon, LAT, drop=drop, output="sparse")
+    expected = regs.mask_3D(lon, LAT, drop=drop)
+
+    _assert_sparse_equal(result, expected)
+
+
+def test_mask_3D_sparse_memory() -> None:
+
+    lon = LONS["rasterize"]
+    result = regions.mask_3D(lon, LAT, drop=False, output="sparse")
+
+    # only the gridpoints in a region are stored
+    assert result.data.nnz == result.data.sum()
+    assert result.data.nnz < result.size / 10
+
+
+def test_mask_3D_sparse_2D_coords() -> None:
+
+    LON, LAT_ = np.meshgrid(LONS["rasterize_flip"], LAT)
+
+    result = regions_overlap.mask_3D(LON, LAT_, output="sparse")
+    expected = regions_overlap.mask_3D(LON, LAT_)
+
+    _assert_sparse_equal(result, expected)
+
+
+def test_mask_3D_sparse_unstructured() -> None:
+
+    ds = xr.Dataset(coords={"lon": LONS["rasterize_flip"], "lat": LAT})
+    ds = ds.stack(cell=("lat", "lon")).reset_index("cell")
+
+    result = regions_overlap.mask_3D(ds.lon, ds.lat, output="sparse")
+    expected = regions_overlap.mask_3D(ds.lon, ds.lat)
+
+    _assert_sparse_equal(result, expected)
+
+
+@pytest.mark.parametrize("overlap", (None, False, True))
+@pytest.mark.parametrize("drop", (True, False))
+def test_mask_3D_geopandas_sparse(overlap, drop) -> None:
+
+    gdf = regions.to_geodataframe()
+    lon = LONS["rasterize_flip"]
+
+    result = regionmask.mask_3D_geopandas(
+        gdf, lon, LAT, drop=drop, overlap=overlap, output="sparse"
+    )
+    expected = regionmask.mask_3D_geopandas(gdf, lon, LAT, drop=drop, overlap=overlap)
+
+    _assert_sparse_equal(result, expected)
+
+
+@pytest.mark.filterwarnings("ignore:No gridpoint belongs to any region.")
+@pytest.mark.parametrize("overlap", (False, True))
+def test_mask_3D_sparse_empty(overlap) -> None:
+
+    gdf = regions.to_geodataframe()
+    lon = np.arange(200, 210)
+    lat = np.arange(0, 10)
+
+    result = regionmask.mask_3D_geopandas(
+        gdf, lon, lat, wrap_lon=False, overlap=overlap, output="sparse"
+    )
+
+    assert result.shape == (0, 10, 10)
+    assert result.data.nnz == 0
+
+
+@pytest.mark.parametrize("lon", (np.arange(0, 360, 2.0), np.arange(-179, 180, 2.0)))
+@pytest.mark.parametrize("wrap_lon", (None, False))
+@pytest.mark.parametrize("drop", (True, False))
+def test_mask_3D_frac_approx_sparse(lon, wrap_lon, drop) -> None:
+
+    import sparse
+
+    result = regions_overlap.mask_3D_frac_approx(
+        lon, LAT, drop=drop, wrap_lon=wrap_lon, output="sparse"
+    )
+    expected = regions_overlap.mask_3D_frac_approx(
+        lon, LAT, drop=drop, wrap_lon=wrap_lon
+    )
+
+    assert isinstance(result.data, sparse.COO)
+    assert result.data.fill_value == 0
+
+    result = result.copy(data=result.data.todense())
+    xr.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize("method", ("mask_3D", "mask_3D_frac_approx"))
+def test_mask_3D_output_wrong(method) -> None:
+
+    lon, lat = LONS["rasterize"], LAT
+
+    with pytest.raises(ValueError, match="'output' must be one of"):
+        getattr(regions, method)(lon, lat, output="foo")
@@ -0,0 +1,284 @@
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.mask import _MASK_CACHE
+from regionmask.core.mesh import (
+    _continuous_vertices,
+    _fill_vertices,
+    _get_face_coords,
+    _get_face_vertices,
+    _get_mesh,
+)
+from regionmask.tests import requires_cf_xarray, requires_sparse
+
+POLYGONS = [
+    shapely.box(-30, -20, 25.3, 10.7),
+    shapely.Point(122.4, 47.3).buffer(0.7),
+    shapely.box(170.5, -50.5, 180, -30).union(shapely.box(-180, -50.5, -165.5, -30)),
+]
+
+LON = np.arange(-180, 180, 5.0)
+LAT = np.arange(-90, 90, 5.0)
+
+
+def _mesh_ds(face_coordinates=True, start_index=0, triangles=False):
+    """UGRID mesh of the cells of a regular 5° grid (quads or triangles)"""
+
+    lon_n, lat_n = np.meshgrid(np.append(LON, 180) - 2.5, np.append(LAT, 90) - 2.5)
+    lat_n = np.clip(lat_n, -90, 90)
+    n_lon = LON.size + 1
+
+    j, i = np.meshgrid(np.arange(LAT.size), np.arange(LON.size), indexing="ij")
+    ll = (j * n_lon + i).ravel()
+    lr, ur, ul = ll + 1, ll + n_lon + 1, ll + n_lon
+
+    if triangles:
+        # the faces have a variable number of nodes
+        tri_1 = np.stack([ll, lr, ur, np.full_like(ll, -1)], axis=1)
+        tri_2 = np.stack([ll, ur, ul, np.full_like(ll, -1)], axis=1)
+        nodes = np.stack([tri_1, tri_2], axis=1).reshape(-1, 4)
+    else:
+        nodes = np.stack([ll, lr, ur, ul], axis=1)
+
+    valid = nodes >= 0
+    nodes = np.where(valid, nodes + start_index, -1)
+
+    conn_attrs = {"cf_role": "face_node_connectivity", "start_index": start_index}
+    if triangles:
+        conn_attrs["_FillValue"] = -1
+
+    mesh_attrs = {
+        "cf_role": "mesh_topology",
+        "topology_dimension": 2,
+        "node_coordinates": "node_lat node_lon",
+        "face_node_connectivity": "face_nodes",
+        "face_dimension": "face",
+    }
+
+    lon_n_attrs = {"standard_name": "longitude", "units": "degrees_east"}
+    lat_n_attrs = {"standard_name": "latitude", "units": "degrees_north"}
+
+    ds = xr.Dataset(
+        {"face_nodes": (("face", "n_max_face_nodes"), nodes, conn_attrs)},
+        coords={
+            "node_lon": ("node", lon_n.ravel(), lon_n_attrs),
+            "node_lat": ("node", lat_n.ravel(), lat_n_attrs),
+            "mesh": ((), 0, mesh_attrs),
+        },
+    )
+
+    if face_coordinates:
+        lon_v, lat_v, _ = _get_face_vertices(ds, mesh_attrs)
+        lon_f, lat_f = _fill_vertices(lon_v, lat_v)
+        ds = ds.assign_coords(
+            face_lon=("face", lon_f.mean(axis=1), {"standard_name": "longitude"}),
+            face_lat=("face", lat_f.mean(axis=1), {"standard_name": "latitude"}),
+        )
+        ds["mesh"].attrs["face_coordinates"] = "face_lon face_lat"
+
+    return ds
+
+
+def test_get_mesh() -> None:
+
+    ds = _mesh_ds()
+
+    mesh = _get_mesh(ds)
+    assert mesh is not None
+    assert mesh["face_node_connectivity"] == "face_nodes"
+
+    assert _get_mesh(ds.face_nodes) is None
+    assert _get_mesh(ds.drop_vars("mesh")) is None
+
+
+@pytest.mark.parametrize("start_index", [0, 1])
+def test_get_face_vertices(start_index) -> None:
+
+    ds = _mesh_ds(start_index=start_index)
+
+    lon_v, lat_v, face_dim = _get_face_vertices(ds, _get_mesh(ds))
+
+    assert face_dim == "face"
+    assert lon_v.shape == (LON.size * LAT.size, 4)
+
+    np.testing.assert_equal(lon_v[0], [-182.5, -177.5, -177.5, -182.5])
+    np.testing.assert_equal(lat_v[0], [-90, -90, -87.5, -87.5])
+
+
+def test_get_face_vertices_fill_value() -> None:
+
+    ds = _mesh_ds(triangles=True)
+
+    lon_v, lat_v, _ = _get_face_vertices(ds, _get_mesh(ds))
+    assert np.isnan(lon_v[:, -1]).all()
+
+    # decoded fill values
+    ds["face_nodes"] = ds.face_nodes.where(ds.face_nodes != -1)
+    del ds["face_nodes"].attrs["_FillValue"]
+
+    lon_v, lat_v, _ = _get_face_vertices(ds, _get_mesh(ds))
+    assert np.isnan(lon_v[:, -1]).all()
+
+
+def test_get_face_coords() -> None:
+
+    ds = _mesh_ds()
+    lon, lat = _get_face_coords(ds, _get_mesh(ds))
+
+    assert lon.name == "face_lon"
+    assert lat.name == "face_lat"
+
+    # computed from the vertices
+    ds = _mesh_ds(face_coordinates=False)
+    lon, lat = _get_face_coords(ds, _get_mesh(ds))
+
+    assert lon.dims == ("face",)
+    expected_lon, expected_lat = np.meshgrid(LON, LAT)
+    np.testing.assert_allclose(lon, expected_lon.ravel(), atol=1e-10)
+
+    # the center on the sphere is close to the center in lon/ lat (the cells of the
+    # first row are clipped at -90°)
+    np.testing.assert_allclose(
+        lat[LON.size :], expected_lat.ravel()[LON.size :], atol=0.05
+    )
+
+
+def test_fill_vertices() -> None:
+
+    lon_v = np.array([[0.0, 1, 1, np.nan], [0, 1, 1, 0]])
+    lat_v = np.array([[0.0, 0, 1, np.nan], [0, 0, 1, 1]])
+
+    lon_v, lat_v = _fill_vertices(lon_v, lat_v)
+
+    np.testing.assert_equal(lon_v, [[0, 1, 1, 1], [0, 1, 1, 0]])
+    np.testing.assert_equal(lat_v, [[0, 0, 1, 1], [0, 0, 1, 1]])
+
+
+def test_continuous_vertices() -> None:
+
+    # across the dateline and around the north and south pole
+    lon_v = np.array([[170.0, -170, -170, 170], [0, 90, 180, 270], [0, -90, 180, 90]])
+    lat_v = np.array([[0.0, 0, 10, 10], [85, 85, 85, 85], [-85, -85, -85, -85]])
+
+    lon_v, lat_v = _continuous_vertices(lon_v, lat_v)
+    cells = shapely.polygons(np.stack([lon_v, lat_v], axis=-1))
+
+    np.testing.assert_allclose(shapely.area(cells), [200, 1800, 1800])
+    assert shapely.is_valid(cells).all()
+
+    # the pole cells are closed along the pole
+    assert lat_v[1].max() == 90
+    assert lat_v[2].min() == -90
+
+
+@pytest.mark.parametrize("method", ["mask", "mask_3D"])
+@pytest.mark.parametrize("face_coordinates", [True, False])
+def test_mask_ugrid(method, face_coordinates) -> None:
+
+    ds = _mesh_ds(face_coordinates=face_coordinates)
+    regions = regionmask.Regions(POLYGONS)
+
+    result = getattr(regions, method)(ds)
+
+    lon, lat = np.meshgrid(LON, LAT)
+    expected = getattr(regions, method)(lon, lat)
+
+    assert result.dims[-1] == "face"
+    np.testing.assert_equal(result.values, expected.values.reshape(result.shape))
+
+
+@pytest.mark.parametrize(
+    "use_cf", [None, False, pytest.param(True, marks=requires_cf_xarray)]
+)
+def test_mask_ugrid_lon_lat(use_cf) -> None:
+
+    # lon and lat coords on the Dataset are used instead of the faces of the mesh
+    lon = xr.DataArray(LON, dims="lon", attrs={"standard_name": "longitude"})
+    lat = xr.DataArray(LAT, dims="lat", attrs={"standard_name": "latitude"})
+    ds = _mesh_ds().assign_coords(lon=lon, lat=lat)
+    regions = regionmask.Regions(POLYGONS)
+
+    result = regions.mask(ds, use_cf=use_cf)
+    expected = regions.mask(LON, LAT)
+
+    assert result.dims == ("lat", "lon")
+    np.testing.assert_equal(result.values, expected.values)
+
+    result = regions.mask_3D_frac(ds, use_cf=use_cf)
+    expected = regions.mask_3D_frac(LON, LAT)
+
+    np.testing.assert_equal(result.values, expected.values)
+
+
+def test_mask_ugrid_cache_key() -> None:
+
+    ds = _mesh_ds()
+    regions = regionmask.Regions(POLYGONS)
+
+    _MASK_CACHE.clear()
+    with regionmask.set_options(mask_cache_max_entries=10):
+        regions.mask(ds)
+        regions.mask(ds)
+        assert len(_MASK_CACHE) == 1
+
+        # the same lon and lat without the mesh
+        regions.mask(ds.face_lon, ds.face_lat)
+        assert len(_MASK_CACHE) == 2
+
+    _MASK_CACHE.clear()
+
+
+@pytest.mark.parametrize("start_index", [0, 1])
+@pytest.mark.parametrize(
+    "output", ["dense", pytest.param("sparse", marks=requires_sparse)]
+)
+def test_mask_3D_frac_ugrid(start_index, output) -> None:
+
+    ds = _mesh_ds(start_index=start_index)
+    regions = regionmask.Regions(POLYGONS)
+
+    result = regions.mask_3D_frac(ds, drop=False, output=output)
+    expected = regions.mask_3D_frac(LON, LAT, drop=False)
+
+    assert result.dims == ("region", "face")
+
+    values = result.data.todense() if output == "sparse" else result.values
+    np.testing.assert_allclose(values, expected.values.reshape(3, -1), atol=1e-12)
+
+    # the small region is not found by the cell centers
+    assert not regions.mask_3D(ds, drop=False).isel(region=1).any()
+    assert values[1].sum() > 0
+
+
+def test_mask_3D_frac_ugrid_fill_value() -> None:
+
+    ds = _mesh_ds(triangles=True)
+    regions = regionmask.Regions(POLYGONS)
+
+    result = regions.mask_3D_frac(ds, drop=False)
+    expected = regions.mask_3D_frac(LON, LAT, drop=False)
+
+    # the two triangles of each cell have the same area
+    result = result.values.reshape(3, -1, 2).mean(axis=-1)
+    np.testing.assert_allclose(result, expected.values.reshape(3, -1), atol=1e-12)
+
+
+def test_mask_3D_frac_pole_cell() -> None:
+
+    # cells around the north pole
+    lon_b = np.array([[0.0, 120, 240], [0.0, 10, 10]])
+    lat_b = np.array([[85.0, 85, 85], [0.0, 0, 10]])
+
+    lon = xr.DataArray([0.0, 7.0], dims="cell", name="lon")
+    lat = xr.DataArray([90.0, 5.0], dims="cell", name="lat")
+
+    regions = regionmask.Regions([shapely.box(-180, 80, 180, 90), POLYGONS[0]])
+
+    result = regions.mask_3D_frac(
+        lon, lat, lon_bounds=lon_b, lat_bounds=lat_b, drop=False
+    )
+
+    np.testing.assert_allclose(result.isel(region=0), [1, 0])
@@ -43,6 +43,41 @@ def test_options_display_max_rows(n, expected) -> None:
         assert n_rows == expected + 6 + 1
 
 
+@pytest.mark.parametrize("value", [-1, 3.5, None, True, False])
+def test_options_mask_cache_max_entries_errors(value) -> None:
+
+    with pytest.raises(ValueError, match="'mask_cache_max_entries' must be a non-neg"):
+        regionmask.set_options(mask_cache_max_entries=value)
+
+
+@pytest.mark.parametrize("value", [0, -1, 3.5, True])
+def test_options_mask_cache_max_bytes_errors(value) -> None:
+
+    with pytest.raises(ValueError, match="'mask_cache_max_bytes' must be a positive"):
+        regionmask.set_options(mask_cache_max_bytes=value)
+
+
+@pytest.mark.parametrize("value", [0, 1, None, "True"])
+def test_options_mask_disk_cache_errors(value) -> None:
+
+    with pytest.raises(ValueError, match="'mask_disk_cache' must be a boolean"):
+        regionmask.set_options(mask_disk_cache=value)
+
+
+@pytest.mark.parametrize("value", [0, -1, 3.5])
+def test_options_frac_approx_band_size_errors(value) -> None:
+
+    with pytest.raises(ValueError, match="'frac_approx_band_size' must be a positive"):
+        regionmask.set_options(frac_approx_band_size=value)
+
+
+@pytest.mark.parametrize("value", [0, -1, 3.5, None, True])
+def test_options_mask_num_threads_errors(value) -> None:
+
+    with pytest.raises(ValueError, match="'mask_num_threads' must be a positive"):
+        regionmask.set_options(mask_num_threads=value)
+
+
 class A:
     pass
 
@@ -78,4 +113,13 @@ def test_get_options() -> None:
 
     assert isinstance(options, dict)
 
-    assert options == {"display_max_rows": 10, "cache_dir": None}
+    assert options == {
+        "display_max_rows": 10,
+        "cache_dir": None,
+        "mask_cache_max_entries": 0,
+        "mask_cache_max_bytes": 2**28,
+        "mask_disk_cache": False,
+        "mask_disk_cache_max_bytes": 2**30,
+        "frac_approx_band_size": None,
+        "mask_num_threads": 1,
+    }
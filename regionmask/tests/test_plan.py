@@ -0,0 +1,198 @@
+import pickle
+
+import numpy as np
+import pytest
+import xarray as xr
+from shapely.geometry import Polygon
+
+import regionmask
+from regionmask import MaskPlan, Regions
+from regionmask.tests import requires_sparse
+
+outl1 = ((0, 0), (0, 1), (1, 1.0), (1, 0))
+outl2 = ((0, 1), (0, 2), (1, 2.0), (1, 1))
+dummy_region = Regions([Polygon(outl1), Polygon(outl2)])
+
+lon = np.arange(-0.5, 2, 0.25)
+lat = np.arange(-0.5, 3, 0.25)
+
+ds = xr.Dataset(
+    {"data": (("lat", "lon"), np.random.default_rng(0).random((lat.size, lon.size)))},
+    coords={"lon": lon, "lat": lat},
+)
+
+
+@pytest.mark.parametrize(
+    "kind, method", [("2D", "mask"), ("3D", "mask_3D"), ("frac", "mask_3D_frac")]
+)
+def test_plan_mask(kind, method) -> None:
+
+    plan = dummy_region.plan_mask(ds, kind=kind)
+    expected = getattr(dummy_region, method)(ds)
+
+    assert isinstance(plan, MaskPlan)
+    assert plan.kind == kind
+
+    xr.testing.assert_identical(plan.mask, expected)
+    xr.testing.assert_identical(plan.apply(ds), expected)
+
+
+def test_plan_mask_kwargs() -> None:
+
+    plan = dummy_region.plan_mask(lon, lat, kind="3D", drop=False, wrap_lon=False)
+    expected = dummy_region.mask_3D(lon, lat, drop=False, wrap_lon=False)
+
+    xr.testing.assert_identical(plan.apply(lon, lat), expected)
+
+
+def test_plan_mask_wrong_kind() -> None:
+
+    with pytest.raises(ValueError, match="'kind' must be one of"):
+        dummy_region.plan_mask(ds, kind="4D")  # type: ignore[arg-type]
+
+
+def test_plan_mask_matches() -> None:
+
+    plan = dummy_region.plan_mask(ds)
+
+    assert plan.matches(ds)
+    assert plan.matches(ds.data)
+    assert plan.matches(ds.copy(deep=True))
+    assert plan.matches(lon, lat) is False
+
+    # different values
+    assert not plan.matches(ds.assign_coords(lon=lon + 0.1))
+    assert not plan.matches(ds.isel(lat=slice(1, None)))
+
+    # same values, different dims
+    renamed = ds.rename(lon="x", lat="y").assign_coords(lon=("x", lon), lat=("y", lat))
+    assert not plan.matches(renamed)
+
+
+def test_plan_mask_matches_bounds() -> None:
+
+    lon_b = np.stack([lon - 0.125, lon + 0.125], axis=-1)
+    lat_b = np.stack([lat - 0.125, lat + 0.125], axis=-1)
+
+    plan = dummy_region.plan_mask(
+        lon, lat, kind="frac", lon_bounds=lon_b, lat_bounds=lat_b
+    )
+    expected = dummy_region.mask_3D_frac(lon, lat, lon_bounds=lon_b, lat_bounds=lat_b)
+
+    assert plan.matches(lon, lat, lon_bounds=lon_b, lat_bounds=lat_b)
+    result = plan.apply(lon, lat, lon_bounds=lon_b, lat_bounds=lat_b)
+    xr.testing.assert_identical(result, expected)
+
+    # same centers, different bounds
+    assert not plan.matches(lon, lat, lon_bounds=lon_b * 0.9, lat_bounds=lat_b)
+    assert not plan.matches(lon, lat)
+
+    with pytest.raises(ValueError, match="does not match the grid of the MaskPlan"):
+        plan.apply(lon, lat, lon_bounds=lon_b * 0.9, lat_bounds=lat_b)
+
+    # the bounds are not compared for the other kinds
+    plan = dummy_region.plan_mask(lon, lat, kind="3D")
+    assert plan.matches(lon, lat, lon_bounds=lon_b * 0.9, lat_bounds=lat_b)
+
+
+def test_plan_mask_matches_cf_bounds() -> None:
+
+    lon_bnds = np.stack([lon - 0.125, lon + 0.125], axis=-1)
+    lat_bnds = np.stack([lat - 0.125, lat + 0.125], axis=-1)
+
+    ds_bounds = xr.Dataset(
+        coords={
+            "lon": ("lon", lon, {"bounds": "lon_bnds"}),
+            "lat": ("lat", lat, {"bounds": "lat_bnds"}),
+            "lon_bnds": (("lon", "bnds"), lon_bnds),
+            "lat_bnds": (("lat", "bnds"), lat_bnds),
+        }
+    )
+
+    plan = dummy_region.plan_mask(ds_bounds, kind="frac")
+    assert plan.matches(ds_bounds)
+
+    # same centers, different bounds
+    other = ds_bounds.assign_coords(lon_bnds=(("lon", "bnds"), lon_bnds * 0.9))
+    assert not plan.matches(other)
+
+    with pytest.raises(ValueError, match="does not match the grid of the MaskPlan"):
+        plan.apply(other)
+
+
+def test_plan_mask_apply_check() -> None:
+
+    plan = dummy_region.plan_mask(ds)
+    other = ds.assign_coords(lon=lon + 0.1)
+
+    with pytest.raises(ValueError, match="does not match the grid of the MaskPlan"):
+        plan.apply(other)
+
+    # no check
+    xr.testing.assert_identical(plan.apply(other, check=False), plan.mask)
+
+
+def test_plan_mask_apply_readonly() -> None:
+
+    plan = dummy_region.plan_mask(ds)
+
+    mask = plan.apply(ds)
+    with pytest.raises(ValueError, match="read-only"):
+        mask.values[:] = False
+
+    # attrs of the returned mask are not shared
+    mask.attrs["new"] = 1
+    assert "new" not in plan.mask.attrs
+
+
+def test_plan_mask_apply_data() -> None:
+
+    plan = dummy_region.plan_mask(ds)
+
+    result = ds.data.where(plan.apply(ds))
+    expected = ds.data.where(dummy_region.mask_3D(ds))
+
+    xr.testing.assert_identical(result, expected)
+
+
+@pytest.mark.parametrize("kind", ["2D", "3D", "frac"])
+def test_plan_mask_pickle(kind) -> None:
+
+    plan = dummy_region.plan_mask(ds, kind=kind)
+
+    result = pickle.loads(pickle.dumps(plan))
+
+    assert result.kind == plan.kind
+    assert result.grid_key == plan.grid_key
+    assert result.matches(ds)
+
+    xr.testing.assert_identical(result.mask, plan.mask)
+
+
+def test_plan_mask_pickle_packed() -> None:
+
+    lon = np.arange(0, 360, 1.0)
+    lat = np.arange(-90, 90, 1.0)
+
+    plan = regionmask.Regions([Polygon(outl1)]).plan_mask(lon, lat, drop=False)
+
+    # the boolean mask is stored as bits
+    assert len(pickle.dumps(plan)) < plan.mask.nbytes / 4
+
+
+@requires_sparse
+def test_plan_mask_pickle_sparse() -> None:
+
+    plan = dummy_region.plan_mask(ds, output="sparse")
+    result = pickle.loads(pickle.dumps(plan))
+
+    np.testing.assert_equal(result.mask.data.todense(), plan.mask.data.todense())
+    assert result.matches(ds)
+
+
+def test_plan_mask_repr() -> None:
+
+    plan = dummy_region.plan_mask(ds)
+
+    expected = "<regionmask.MaskPlan (kind='3D', region: 2, lat: 14, lon: 10)>"
+    assert repr(plan) == expected
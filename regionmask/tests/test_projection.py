@@ -0,0 +1,431 @@
+import geopandas as gp
+import numpy as np
+import pyproj
+import pytest
+import shapely
+import xarray as xr
+
+import regionmask
+from regionmask.core.mask import _MASK_CACHE
+from regionmask.core.projection import (
+    _get_projected_grid,
+    _get_rotated_grid,
+    _parse_crs,
+    _rotate_pole,
+    _transform_polygons,
+)
+from regionmask.tests import requires_dask, requires_sparse
+
+# EUR-44 like rotated-pole grid
+POLE = {"grid_north_pole_longitude": -162.0, "grid_north_pole_latitude": 39.25}
+RLON = np.arange(-28.21, 18.3, 0.44)
+RLAT = np.arange(-23.21, 21.3, 0.44)
+
+
+def _rotated_ds(rlon=RLON, rlat=RLAT, transpose=False, **pole):
+
+    pole = pole or POLE
+
+    crs = pyproj.CRS.from_cf(
+        {"grid_mapping_name": "rotated_latitude_longitude", **pole}
+    )
+    transformer = pyproj.Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+
+    RLON_, RLAT_ = np.meshgrid(rlon, rlat)
+    dims = ("rlat", "rlon")
+
+    if transpose:
+        RLON_, RLAT_, dims = RLON_.T, RLAT_.T, dims[::-1]
+
+    LON, LAT = transformer.transform(RLON_, RLAT_)
+
+    coords = {
+        "rlon": ("rlon", rlon, {"standard_name": "grid_longitude"}),
+        "rlat": ("rlat", rlat, {"standard_name": "grid_latitude"}),
+        "lon": (dims, LON, {"standard_name": "longitude"}),
+        "lat": (dims, LAT, {"standard_name": "latitude"}),
+        "rotated_pole": ((), 0, {"grid_mapping_name": "rotated_latitude_longitude"}),
+    }
+    coords["rotated_pole"][2].update(pole)
+
+    return xr.Dataset(coords=coords)
+
+
+def _drop_grid_mapping(ds):
+
+    ds = ds.copy()
+    ds["rotated_pole"].attrs = {}
+
+    return ds
+
+
+@pytest.mark.parametrize("north_pole_grid_lon", [0.0, 30.0, -45.0])
+def test_rotate_pole(north_pole_grid_lon) -> None:
+
+    pole = POLE | {"north_pole_grid_longitude": north_pole_grid_lon}
+
+    crs = pyproj.CRS.from_cf(
+        {"grid_mapping_name": "rotated_latitude_longitude", **pole}
+    )
+    transformer = pyproj.Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+
+    lon = np.array([10.0, -20.0, 40.0, 170.0, 0.0, 300.0])
+    lat = np.array([50.0, 30.0, 70.0, -60.0, 89.0, 10.0])
+
+    result = _rotate_pole(
+        lon,
+        lat,
+        pole_lon=pole["grid_north_pole_longitude"],
+        pole_lat=pole["grid_north_pole_latitude"],
+        north_pole_grid_lon=north_pole_grid_lon,
+    )
+    expected = transformer.transform(lon, lat)
+
+    np.testing.assert_allclose(result, expected, atol=1e-8)
+
+
+def test_get_rotated_grid() -> None:
+
+    ds = _rotated_ds()
+
+    rlon, rlat, pole, transpose = _get_rotated_grid(ds, ds.lon, ds.lat)
+
+    xr.testing.assert_identical(rlon, ds.rlon)
+    xr.testing.assert_identical(rlat, ds.rlat)
+    assert pole == {"pole_lon": -162.0, "pole_lat": 39.25, "north_pole_grid_lon": 0.0}
+    assert not transpose
+
+    ds = _rotated_ds(transpose=True)
+    assert _get_rotated_grid(ds, ds.lon, ds.lat)[-1]
+
+    # no grid mapping
+    ds_ = ds.drop_vars("rotated_pole")
+    assert _get_rotated_grid(ds_, ds_.lon, ds_.lat) is None
+
+    # no rotated coords
+    ds_ = ds.drop_vars("rlon")
+    assert _get_rotated_grid(ds_, ds_.lon, ds_.lat) is None
+
+    # not an xarray object
+    assert _get_rotated_grid(ds.lon.values, ds.lon, ds.lat) is None
+
+
+def test_transform_polygons_periodic() -> None:
+
+    def shift(x, y):
+        return (x + 180 + 90) % 360 - 180, y
+
+    polygon = shapely.Polygon(
+        [(80, 0), (100, 0), (100, 10), (80, 10)],
+        holes=[[(85, 2), (95, 2), (95, 8), (85, 8)]],
+    )
+
+    (result,) = _transform_polygons([polygon], shift, max_segment_length=1, period=360)
+
+    # the polygon crosses the dateline in the target coords
+    assert shapely.contains_xy(result, [175, -175], [1, 1]).all()
+    assert not shapely.contains_xy(result, [-180, 180], [5, 5]).any()
+    area = shapely.intersection(result, shapely.box(-180, -90, 180, 90)).area
+    assert np.isclose(area, polygon.area)
+
+
+def test_transform_polygons_pole() -> None:
+
+    def rotate(x, y):
+        return _rotate_pole(x, y, pole_lon=-162.0, pole_lat=39.25)
+
+    # a polygon around the rotated pole can not be unwrapped
+    polygon = shapely.box(-170, 30, -150, 50)
+
+    result = _transform_polygons([polygon], rotate, max_segment_length=1, period=360)
+    assert result is None
+
+    polygon = shapely.box(0, 30, 40, 50)
+
+    result = _transform_polygons([polygon], rotate, max_segment_length=1, period=360)
+    assert result is not None
+
+
+@pytest.mark.parametrize("transpose", [True, False])
+@pytest.mark.parametrize("method", ["mask", "mask_3D"])
+def test_mask_rotated(method, transpose, monkeypatch) -> None:
+
+    ds = _rotated_ds(transpose=transpose)
+    prudence = regionmask.defined_regions.prudence
+    regions = regionmask.Regions(prudence.polygons, overlap=method == "mask_3D")
+
+    expected = getattr(regions, method)(_drop_grid_mapping(ds))
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("shapely was used")
+
+    monkeypatch.setattr("regionmask.core.mask._mask_shapely", _raise)
+
+    result = getattr(regions, method)(ds)
+
+    xr.testing.assert_equal(result, expected)
+
+
+def test_mask_rotated_cache_key() -> None:
+
+    ds = _rotated_ds()
+    regions = regionmask.defined_regions.prudence
+
+    _MASK_CACHE.clear()
+    with regionmask.set_options(mask_cache_max_entries=10):
+        regions.mask_3D(ds)
+        regions.mask_3D(ds)
+        assert len(_MASK_CACHE) == 1
+
+        # the same lon and lat are masked differently without the grid mapping
+        regions.mask_3D(_drop_grid_mapping(ds))
+        assert len(_MASK_CACHE) == 2
+
+    _MASK_CACHE.clear()
+
+
+def test_mask_rotated_pole_in_region() -> None:
+
+    ds = _rotated_ds()
+
+    # the first region contains the rotated north pole (-162 °E, 39.25 °N)
+    polygons = [shapely.box(-170, 30, -150, 50), shapely.box(0, 40, 20, 60)]
+    regions = regionmask.Regions(polygons)
+
+    expected = regions.mask_3D(_drop_grid_mapping(ds))
+    result = regions.mask_3D(ds)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("mask", {}),
+        ("mask_3D", {}),
+        pytest.param("mask_3D", {"output": "sparse"}, marks=requires_sparse),
+    ],
+)
+def test_mask_rotated_antimeridian(method, kwargs) -> None:
+
+    # the rotated prime meridian is the antimeridian
+    rlon = rlat = np.arange(-10, 10.1, 0.5)
+    pole = {"grid_north_pole_longitude": 180.0, "grid_north_pole_latitude": -45.0}
+    ds = _rotated_ds(rlon, rlat, **pole)
+
+    # gridpoints at exactly -180°E on the boundary of both regions
+    at_180 = np.isclose(np.abs(ds.lon), 180, rtol=0, atol=1e-9)
+    ds["lon"] = ds.lon.where(~at_180, -180.0)
+    assert at_180.any()
+
+    polygons = [
+        shapely.box(170, 30, 180, 60),
+        shapely.box(-180, 30, -170, 60),
+        shapely.box(-180, -90, 180, -60),
+    ]
+    regions = regionmask.Regions(polygons, overlap=method == "mask_3D")
+
+    expected = getattr(regions, method)(_drop_grid_mapping(ds), **kwargs)
+    result = getattr(regions, method)(ds, **kwargs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+# NSIDC polar stereographic north grid (100 km)
+X = np.arange(-3800e3, 3750e3, 100e3)
+Y = np.arange(5800e3, -5350e3, -100e3)
+
+# regions crossing the antimeridian and including the north pole
+POLYGONS = [
+    shapely.box(-180, 60, 180, 90),
+    shapely.MultiPolygon(
+        [shapely.box(100, 40, 180, 70), shapely.box(-180, 40, -120, 70)]
+    ),
+    shapely.box(-60, 50, 0, 80),
+    shapely.box(-180, -90, 180, -60),
+]
+
+
+def _projected_ds(crs="EPSG:3413", x=X, y=Y, units="m"):
+
+    transformer = pyproj.Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+    LON, LAT = transformer.transform(*np.meshgrid(x, y))
+
+    factor = 1e-3 if units == "km" else 1
+
+    x_attrs = {"standard_name": "projection_x_coordinate", "units": units}
+    y_attrs = {"standard_name": "projection_y_coordinate", "units": units}
+
+    coords = {
+        "x": ("x", x * factor, x_attrs),
+        "y": ("y", y * factor, y_attrs),
+        "lon": (("y", "x"), LON),
+        "lat": (("y", "x"), LAT),
+    }
+
+    return xr.Dataset(coords=coords)
+
+
+def test_parse_crs() -> None:
+
+    expected = pyproj.CRS.from_epsg(3413)
+
+    assert _parse_crs("EPSG:3413") == expected
+    assert _parse_crs(3413) == expected
+
+    attrs = expected.to_cf()
+    assert _parse_crs(attrs) == expected
+    assert _parse_crs(xr.DataArray(0, attrs=attrs)) == expected
+
+
+@pytest.mark.parametrize("units", ["m", "km"])
+def test_get_projected_grid(units) -> None:
+
+    ds = _projected_ds(units=units)
+    crs = pyproj.CRS.from_epsg(3413)
+
+    x, y, transpose, _, period = _get_projected_grid(ds, ds.lon, ds.lat, crs)
+
+    np.testing.assert_allclose(x, X)
+    np.testing.assert_allclose(y, Y)
+    assert not transpose
+    assert period is None
+
+    # inferred from lon and lat
+    x, y, transpose, _, period = _get_projected_grid(None, ds.lon, ds.lat, crs)
+
+    np.testing.assert_allclose(x, X, atol=1e-3)
+    np.testing.assert_allclose(y, Y, atol=1e-3)
+    assert not transpose
+
+    x, y, transpose, _, period = _get_projected_grid(None, ds.lon.T, ds.lat.T, crs)
+    assert transpose
+
+
+def test_get_projected_grid_errors() -> None:
+
+    ds = _projected_ds()
+
+    with pytest.raises(ValueError, match="do not form a regular grid"):
+        _get_projected_grid(ds, ds.lon, ds.lat, pyproj.CRS.from_epsg(3031))
+
+    with pytest.raises(ValueError, match="do not form a regular grid"):
+        _get_projected_grid(None, ds.lon, ds.lat, pyproj.CRS.from_epsg(3031))
+
+    with pytest.raises(ValueError, match="can only be used for 2D"):
+        _get_projected_grid(None, X, Y, pyproj.CRS.from_epsg(3413))
+
+
+@pytest.mark.parametrize(
+    "crs, x, y",
+    [
+        ("EPSG:3413", X, Y),
+        # LAEA Europe
+        ("EPSG:3035", np.arange(2.02e6, 7e6, 50e3), np.arange(5.52e6, 1.3e6, -50e3)),
+    ],
+)
+@pytest.mark.parametrize("units", ["m", "km"])
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("mask", {}),
+        ("mask_3D", {}),
+        pytest.param("mask_3D", {"output": "sparse"}, marks=requires_sparse),
+    ],
+)
+def test_mask_projected(crs, x, y, units, method, kwargs, monkeypatch) -> None:
+
+    ds = _projected_ds(crs, x, y, units=units)
+    regions = regionmask.Regions(POLYGONS, overlap=method == "mask_3D")
+
+    expected = getattr(regions, method)(ds, **kwargs)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("shapely was used")
+
+    monkeypatch.setattr("regionmask.core.mask._mask_shapely", _raise)
+    monkeypatch.setattr("regionmask.core.mask._mask_shapely_pairs", _raise)
+
+    result = getattr(regions, method)(ds, crs=crs, **kwargs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("mask", {}),
+        ("mask_3D", {}),
+        pytest.param("mask_3D", {"output": "sparse"}, marks=requires_sparse),
+    ],
+)
+def test_mask_projected_antimeridian(method, kwargs) -> None:
+
+    ds = _projected_ds()
+
+    # gridpoints at exactly -180°E on the boundary of both regions
+    assert (ds.lon == -180).any()
+
+    polygons = [shapely.box(170, 55, 180, 70), shapely.box(-180, 55, -170, 70)]
+    regions = regionmask.Regions(polygons, overlap=method == "mask_3D")
+
+    expected = getattr(regions, method)(ds, **kwargs)
+    result = getattr(regions, method)(ds, crs="EPSG:3413", **kwargs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+@pytest.mark.parametrize("method", ["mask", "mask_3D"])
+def test_mask_projected_cut(method) -> None:
+
+    # the projection is cut at 0°E, which crosses the first region
+    crs = "+proj=merc +lon_0=180"
+    x = np.arange(-20e6, 20e6, 200e3)
+    y = np.arange(-7.95e6, 12e6, 200e3)
+    ds = _projected_ds(crs, x, y)
+
+    polygons = [shapely.box(-30, -20, 25.3, 10.7), POLYGONS[1]]
+    regions = regionmask.Regions(polygons)
+
+    expected = getattr(regions, method)(ds)
+    result = getattr(regions, method)(ds, crs=crs)
+
+    xr.testing.assert_equal(result, expected)
+
+
+def test_mask_projected_numpy() -> None:
+
+    # the inferred x and y are not exact - avoid points on the region boundaries
+    ds = _projected_ds(x=X + 30e3)
+    regions = regionmask.Regions(POLYGONS, overlap=True)
+
+    expected = regions.mask_3D(ds.lon.values, ds.lat.values)
+    result = regions.mask_3D(ds.lon.values, ds.lat.values, crs="EPSG:3413")
+
+    xr.testing.assert_equal(result, expected)
+
+
+def test_mask_projected_geopandas() -> None:
+
+    ds = _projected_ds()
+    geodataframe = gp.GeoDataFrame(geometry=POLYGONS[1:3])
+
+    expected = regionmask.mask_geopandas(geodataframe, ds)
+    result = regionmask.mask_geopandas(geodataframe, ds, crs="EPSG:3413")
+
+    xr.testing.assert_equal(result, expected)
+
+    expected = regionmask.mask_3D_geopandas(geodataframe, ds)
+    result = regionmask.mask_3D_geopandas(geodataframe, ds, crs="EPSG:3413")
+
+    xr.testing.assert_equal(result, expected)
+
+
+@requires_dask
+def test_mask_projected_chunked_error() -> None:
+
+    ds = _projected_ds().chunk()
+    regions = regionmask.Regions(POLYGONS, overlap=True)
+
+    with pytest.raises(ValueError, match="``crs`` is not supported for chunked"):
+        regions.mask_3D(ds, crs="EPSG:3413")
@@ -7,7 +7,9 @@ from regionmask.core.utils import (
     _create_dict_of_numbered_string,
     _equally_spaced_on_split_lon,
     _find_splitpoint,
+    _infer_bounds,
     _is_180,
+    _is_monotonic,
     _is_numeric,
     _maybe_to_dict,
     _sanitize_names_abbrevs,
@@ -160,6 +162,27 @@ def test_equally_spaced() -> None:
     assert equally_spaced(close_to_equal, close_to_equal)
 
 
+def test_is_monotonic() -> None:
+
+    assert _is_monotonic([0, 1, 3])
+    assert _is_monotonic([3, 1, 0])
+    assert _is_monotonic([0, 1, 3], [5, 4])
+
+    assert not _is_monotonic([0, 1, 1])
+    assert not _is_monotonic([0, 2, 1])
+    assert not _is_monotonic([0])
+    assert not _is_monotonic(1)
+    assert not _is_monotonic(np.arange(10).reshape(2, 5))
+    assert not _is_monotonic([0, 1, 3], [0, 2, 1])
+
+
+def test_infer_bounds() -> None:
+
+    np.testing.assert_allclose(_infer_bounds([0, 1, 2]), [-0.5, 0.5, 1.5, 2.5])
+    np.testing.assert_allclose(_infer_bounds([0, 1, 3]), [-0.5, 0.5, 2, 4])
+    np.testing.assert_allclose(_infer_bounds([2, 0]), [3, 1, -1])
+
+
 def test__equally_spaced_on_split_lon() -> None:
     np.random.seed(0)
 